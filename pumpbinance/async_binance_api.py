@@ -0,0 +1,92 @@
+from multiprocessing.pool import ThreadPool
+import logging
+
+class async_binance_api(object):
+    '''
+    Non-blocking front for a binance_api. Calls run on a pool of threads sharing the
+    api's keep-alive connections, so independent requests (e.g. cancelling an order
+    while selling) go out at the same time and the caller never waits on the network.
+    
+    Every method has the same parameters as binance_api's plus an optional callback,
+    which is called from a pool thread with the API response. They return a
+    multiprocessing.pool.AsyncResult whose get() waits for the response.
+    
+    Work that takes several requests, like entering a pump, is run on the same pool with submit.
+    '''
+    
+    def __init__(self, api, workers=4):
+        '''
+        :param api: required
+        :type api: binance_api
+        :param workers: The number of requests that can be in flight at once.
+        '''
+        self.api = api
+        self._pool = ThreadPool(workers)
+    
+    def close(self):
+        self._pool.close()
+    
+    def submit(self, function, args=(), callback=None, on_error=None):
+        '''
+        Runs function(*args) on the pool.
+        
+        :param callback: optional, called from a pool thread with what the function returned.
+        :param on_error: optional, called from a pool thread with the exception if the function raised one.
+        :returns: A multiprocessing.pool.AsyncResult whose get() waits for what the function returned.
+        '''
+        return self._run(function, args, {}, callback, on_error)
+    
+    def _call(self, method, callback, *args, **params):
+        return self._run(method, args, params, callback, None)
+    
+    def _run(self, function, args, params, callback, on_error):
+        def call():
+            try:
+                response = function(*args, **params)
+            except Exception as e:
+                # AsyncResult.get() raises the exception again, logging it makes
+                # failures of calls nobody waits for visible.
+                logging.debug("Asynchronous "+getattr(function, '__name__', 'call')+" failed: "+str(e))
+                if on_error is not None:
+                    on_error(e)
+                raise
+            if callback is not None:
+                callback(response)
+            return response
+        return self._pool.apply_async(call)
+    
+    # Market Endpoints
+    
+    def get_ticker(self, callback=None, **params):
+        return self._call(self.api.get_ticker, callback, **params)
+    
+    def get_order_book(self, callback=None, **params):
+        return self._call(self.api.get_order_book, callback, **params)
+    
+    # Account Endpoints
+    
+    def create_order(self, callback=None, **params):
+        return self._call(self.api.create_order, callback, **params)
+    
+    def get_order(self, callback=None, **params):
+        return self._call(self.api.get_order, callback, **params)
+    
+    def cancel_order(self, callback=None, **params):
+        return self._call(self.api.cancel_order, callback, **params)
+    
+    def get_btc_balance(self, callback=None, **params):
+        return self._call(self.api.get_btc_balance, callback, **params)
+    
+    def market_sell(self, pumper, use_bnb, template=None, callback=None):
+        return self._call(self.api.market_sell, callback, pumper, use_bnb, template)
+    
+    #  User Stream Endpoints
+    
+    def stream_get_listen_key(self, callback=None):
+        return self._call(self.api.stream_get_listen_key, callback)
+    
+    def stream_keepalive(self, callback=None, **params):
+        return self._call(self.api.stream_keepalive, callback, **params)
+    
+    def stream_close(self, callback=None, **params):
+        return self._call(self.api.stream_close, callback, **params)
@@ -0,0 +1,238 @@
+'''
+Sweeps pump parameters over tick_recorder recordings and reports the P&L of every combination of
+target profit, stop loss, entry type and BTC size.
+
+Uses pumper's decisions: a pump sells at the target once the bids at or above the target can take
+all of its alt (pumper.can_sell), and at market once the highest bid falls to the stop loss. The
+slices pump_session sells as the bids allow are not modelled, every exit sells the whole position
+at once. Each recording is one pump of the symbol starting at its first tick. With a trailing stop
+the target only arms it, and the pump sells at market once the highest bid falls trailing_stop
+from its peak (pumper.trailing_stop).
+
+The books are loaded into NumPy arrays once. For one entry, the highest price at which the whole
+position can be sold is known at every tick, so the first tick each target is reached is a search
+over its running maximum, and every target and stop loss is evaluated at once. The
+(recording, entry type, BTC size) groups are spread over a process pool.
+
+Usage: python backtest.py symbol recording [recording ...] [--targets 10:100:10] [--stop-losses=-50:-5:5]
+                          [--btc-sizes 0.01,0.05] [--entries market,limit] [--trailing 10] [--output surface.npy]
+'''
+from multiprocessing import Pool, cpu_count
+import argparse
+import numpy
+from binance_api import post_binance_fee
+from tick_replay import tick_replay
+
+MARKET = 0
+LIMIT = 1
+entry_names = {"market": MARKET, "limit": LIMIT}
+
+default_depth = 50 # Bid and ask levels kept per tick
+satoshi = 1e-8
+fee = float(post_binance_fee)
+
+class book_series(object):
+    '''
+    The top levels of a symbol's book at every tick of a recording, in BTC and alt units.
+    Missing levels have a price and quantity of zero.
+    '''
+    
+    def __init__(self, bid_prices, bid_quantities, ask_prices, ask_quantities):
+        self.bid_prices = bid_prices # ticks x depth, highest first
+        self.bid_quantities = bid_quantities
+        self.ask_prices = ask_prices # ticks x depth, lowest first
+        self.ask_quantities = ask_quantities
+        self.cumulative_bids = numpy.cumsum(bid_quantities, axis=1)
+    
+    @property
+    def best_bids(self):
+        return self.bid_prices[:, 0]
+    
+    @property
+    def best_asks(self):
+        return self.ask_prices[:, 0]
+
+def load_series(filename, symbol, depth=default_depth):
+    '''
+    :returns: A book_series of the symbol's book from its first tick with both bids and asks.
+    '''
+    rows = []
+    
+    def on_book(symbol, book):
+        if book["bids"] and book["asks"] or rows:
+            rows.append((book["bids"][:depth], book["asks"][:depth]))
+    
+    tick_replay(filename, symbol).run(on_book=on_book)
+    arrays = numpy.zeros((4, len(rows), depth))
+    for tick, (bids, asks) in enumerate(rows):
+        for level, bid in enumerate(bids):
+            arrays[0, tick, level] = float(bid[0])
+            arrays[1, tick, level] = float(bid[1])
+        for level, ask in enumerate(asks):
+            arrays[2, tick, level] = float(ask[0])
+            arrays[3, tick, level] = float(ask[1])
+    return book_series(*arrays)
+
+def sell_price_for(series, quantity):
+    '''
+    :returns: The lowest bid a market sell of quantity reaches at every tick, which is the highest
+              target at which pumper.can_sell is true. Zero when the book is too thin.
+    '''
+    deep_enough = series.cumulative_bids >= quantity
+    level = deep_enough.argmax(axis=1)
+    prices = series.bid_prices[numpy.arange(len(level)), level]
+    return numpy.where(deep_enough.any(axis=1), prices, 0.0)
+
+def market_sell_btc(series, ticks, quantity):
+    '''
+    :param ticks: The tick each sell happens at
+    :returns: The BTC received by selling quantity into the bids at each tick, before fees.
+    '''
+    prices = series.bid_prices[ticks]
+    quantities = series.bid_quantities[ticks]
+    sold_before = series.cumulative_bids[ticks] - quantities
+    sold = numpy.clip(quantity - sold_before, 0, quantities)
+    return (sold * prices).sum(axis=1)
+
+def enter(series, entry, btc_to_use):
+    '''
+    :returns: The starting alt value, the alt bought after fees and the tick it was bought at,
+              or None as the tick if a limit entry is never filled.
+    '''
+    best_bid = series.best_bids[0]
+    best_ask = series.best_asks[0]
+    if entry == MARKET:
+        notional = numpy.cumsum(series.ask_prices[0] * series.ask_quantities[0])
+        spent_before = notional - series.ask_prices[0] * series.ask_quantities[0]
+        spent = numpy.clip(btc_to_use - spent_before, 0, series.ask_prices[0] * series.ask_quantities[0])
+        levels = series.ask_prices[0] > 0
+        alt = (spent[levels] / series.ask_prices[0][levels]).sum()
+        return best_ask, alt * fee, 0
+    
+    # Bid between the highest bid and the lowest ask like pump_session.enter, filled once an ask reaches it.
+    to_bid = round(((best_ask - best_bid) / satoshi) // 2 * satoshi + best_bid, 8)
+    reached = (series.best_asks > 0) & (series.best_asks <= to_bid)
+    filled_at = int(reached.argmax()) if reached.any() else None
+    alt = numpy.floor(btc_to_use / to_bid * 10**4) / 10**4
+    return to_bid, alt * fee, filled_at
+
+def first_tick(running, thresholds):
+    '''
+    :param running: A non-decreasing series
+    :returns: The first tick each threshold is reached at, len(running) if it never is.
+    '''
+    return numpy.searchsorted(running, thresholds, side='left')
+
+def trailing_exit_tick(series, bid_thresholds, trailing_stop):
+    '''
+    :returns: The first tick each threshold's trailing stop sells at, len(series.best_bids) if it never does.
+    '''
+    ticks = len(series.best_bids)
+    peaks = numpy.maximum.accumulate(series.best_bids)
+    # Compared in whole satoshis like pumper, which also rounds the distance from the peak down.
+    bids = numpy.round(series.best_bids / satoshi)
+    peak_bids = numpy.round(peaks / satoshi)
+    exit_bids = peak_bids - numpy.floor(numpy.round(peak_bids * trailing_stop, 4))
+    # Whether the bid is down trailing_stop from its peak does not depend on the target, only whether it is armed does.
+    fallen_at = numpy.where(bids <= exit_bids, numpy.arange(ticks), ticks)
+    next_fall = numpy.append(numpy.minimum.accumulate(fallen_at[::-1])[::-1], ticks)
+    armed_at = first_tick(peaks, bid_thresholds)
+    return next_fall[armed_at]
+
+def evaluate(series, entry, btc_to_use, targets, stop_losses, trailing_stop=None):
+    '''
+    :param trailing_stop: optional, see pumper.trailing_stop
+    :returns: The P&L in BTC of every (target, stop loss) as a len(targets) x len(stop_losses) array.
+              Pumps still open at the end of the recording are sold at its last tick.
+    '''
+    ticks = len(series.best_bids)
+    starting_alt_value, alt, filled_at = enter(series, entry, btc_to_use)
+    
+    # Same rounding as pumper: bids are whole satoshis and the threshold is rounded up.
+    bid_thresholds = numpy.ceil(numpy.round((targets * starting_alt_value + starting_alt_value) / satoshi, 4)) * satoshi
+    stop_loss_bids = numpy.floor(numpy.round((stop_losses * starting_alt_value + starting_alt_value) / satoshi, 4)) * satoshi
+    
+    if trailing_stop:
+        profit_at = trailing_exit_tick(series, bid_thresholds, trailing_stop)
+    else:
+        profit_at = first_tick(numpy.maximum.accumulate(sell_price_for(series, alt)), bid_thresholds)
+    # The running minimum of the highest bid, negated so it is non-decreasing.
+    stop_at = first_tick(numpy.maximum.accumulate(-series.best_bids), -stop_loss_bids)
+    
+    exit_at = numpy.minimum(profit_at[:, None], stop_at[None, :])
+    btc_received = market_sell_btc(series, numpy.minimum(exit_at, ticks - 1).ravel(), alt).reshape(exit_at.shape) * fee
+    pnl = btc_received - btc_to_use
+    if filled_at is None:
+        return numpy.zeros(exit_at.shape)
+    # A limit order that was not filled before the exit is cancelled, nothing was spent.
+    return numpy.where(exit_at < filled_at, 0.0, pnl)
+
+_series = {} # Filename -> book_series, loaded once per worker process
+
+def _evaluate_group(arguments):
+    filename, symbol, depth, entry, btc_to_use, targets, stop_losses, trailing_stop = arguments
+    series = _series.get(filename)
+    if series is None:
+        series = _series[filename] = load_series(filename, symbol, depth)
+    return entry, btc_to_use, evaluate(series, entry, btc_to_use, targets, stop_losses, trailing_stop)
+
+def sweep(filenames, symbol, targets, stop_losses, entries, btc_sizes, depth=default_depth, processes=None, trailing_stop=None):
+    '''
+    :param targets: Target profit percentages, e.g. 0.5 for 50%
+    :param stop_losses: Negative stop loss percentages
+    :param entries: MARKET and/or LIMIT
+    :param trailing_stop: optional, the fraction the bid can fall from its peak once a target is reached
+    :returns: The P&L surface summed over the recordings, indexed by
+              [target, stop loss, entry, BTC size].
+    '''
+    targets = numpy.asarray(targets, dtype=float)
+    stop_losses = numpy.asarray(stop_losses, dtype=float)
+    surface = numpy.zeros((len(targets), len(stop_losses), len(entries), len(btc_sizes)))
+    groups = [(filename, symbol, depth, entry, btc_to_use, targets, stop_losses, trailing_stop)
+              for filename in filenames for entry in entries for btc_to_use in btc_sizes]
+    
+    pool = Pool(processes or cpu_count())
+    try:
+        for entry, btc_to_use, pnl in pool.imap_unordered(_evaluate_group, groups):
+            surface[:, :, entries.index(entry), btc_sizes.index(btc_to_use)] += pnl
+    finally:
+        pool.close()
+        pool.join()
+    return surface
+
+def parse_range(text, scale=100.0):
+    '''
+    :param text: "start:stop:step" inclusive of stop, or comma separated values, in percent.
+    '''
+    if ':' in text:
+        start, stop, step = [float(part) for part in text.split(':')]
+        return list(numpy.arange(start, stop + step / 2.0, step) / scale)
+    return [float(value) / scale for value in text.split(',')]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweeps pump parameters over tick recordings.")
+    parser.add_argument("symbol")
+    parser.add_argument("recordings", nargs="+")
+    parser.add_argument("--targets", default="10:100:10", help="Target profit percentages")
+    parser.add_argument("--stop-losses", default="-50:-5:5", help="Stop loss percentages, written as --stop-losses=-50:-5:5 since they are negative")
+    parser.add_argument("--btc-sizes", default="0.01", help="Comma separated BTC to use")
+    parser.add_argument("--entries", default="market,limit")
+    parser.add_argument("--trailing", type=float, default=None, help="Once the target is reached, sells when the bid falls this percentage from its peak")
+    parser.add_argument("--depth", type=int, default=default_depth)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--output", default=None, help="Saves the surface with numpy.save")
+    args = parser.parse_args()
+    
+    targets = parse_range(args.targets)
+    stop_losses = parse_range(args.stop_losses)
+    btc_sizes = parse_range(args.btc_sizes, scale=1.0)
+    entries = [entry_names[entry] for entry in args.entries.split(',')]
+    trailing_stop = args.trailing / 100.0 if args.trailing is not None else None
+    surface = sweep(args.recordings, args.symbol, targets, stop_losses, entries, btc_sizes, args.depth, args.processes, trailing_stop)
+    if args.output:
+        numpy.save(args.output, surface)
+    
+    best = numpy.unravel_index(surface.argmax(), surface.shape)
+    print("%d combinations over %d recordings" % (surface.size, len(args.recordings)))
+    print("Best: target %.1f%%, stop loss %.1f%%, %s entry, %s BTC, P&L %.8f BTC" % (
+          targets[best[0]] * 100, stop_losses[best[1]] * 100, args.entries.split(',')[best[2]], btc_sizes[best[3]], surface[best]))
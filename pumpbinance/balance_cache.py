@@ -0,0 +1,117 @@
+from decimal import Decimal
+from threading import Event, Lock, Thread
+import logging
+import warnings
+import fixed_point
+
+reconcile_interval = 5 * 60 # Measured in seconds
+
+class balance_cache(object):
+    '''
+    The account's free balances by asset, so reading one does not download the whole account.
+    
+    Seeded from get_account on the first read, then kept up to date from order responses and
+    the user data stream's balance updates. The account is only downloaded again to reconcile
+    every reconcile_interval seconds once start_reconciling is called.
+    
+    Every update carries the server time it happened at, so an order response that arrives
+    after the stream already reported its balances is not counted twice, and an update older
+    than what is already known, like a slow account download, does not undo it.
+    '''
+    
+    def __init__(self, api):
+        '''
+        :type api: binance_api
+        '''
+        self.api = api
+        self._free = None # Asset -> fixed-point free balance, None until seeded
+        self._updated_at = {} # Asset -> server time in milliseconds of the last update
+        self._lock = Lock()
+        self._stopped = Event()
+    
+    def get(self, asset, default=Decimal(0)):
+        '''
+        :returns: The free balance of the asset as a Decimal, or default if the account has none.
+        '''
+        if self._free is None:
+            self.reconcile()
+        free = self._free.get(asset)
+        if free is None:
+            return default
+        return fixed_point.to_decimal(free)
+    
+    def reconcile(self):
+        ''' Replaces the balances with the ones from get_account, except those updated after the account was. '''
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            account = self.api.get_account()
+        updated_at = account.get("updateTime", 0)
+        free = {}
+        for asset_balances in account["balances"]:
+            free[asset_balances["asset"]] = fixed_point.parse(asset_balances["free"])
+        with self._lock:
+            if self._free is not None:
+                for asset, asset_updated_at in self._updated_at.items():
+                    if asset_updated_at > updated_at:
+                        free[asset] = self._free[asset]
+            self._updated_at = dict((asset, max(updated_at, self._updated_at.get(asset, 0))) for asset in free)
+            self._free = free
+    
+    def update(self, balances, updated_at):
+        '''
+        :param balances: Asset -> free Decimal balance, e.g. from the user data stream.
+        :param updated_at: Server time in milliseconds
+        '''
+        with self._lock:
+            if self._free is None:
+                # Seeded on the next read, which will already include these.
+                return
+            for asset, free in balances.items():
+                if updated_at >= self._updated_at.get(asset, 0):
+                    self._free[asset] = fixed_point.from_decimal(free)
+                    self._updated_at[asset] = updated_at
+    
+    def apply_order(self, order, base_asset, quote_asset="BTC"):
+        '''
+        Applies what a filled order traded and paid in commission.
+        
+        :type order: create_order response with newOrderRespType=FULL
+        '''
+        base_traded = fixed_point.parse(order["executedQty"])
+        quote_traded = fixed_point.parse(order["cummulativeQuoteQty"])
+        if order["side"] == "SELL":
+            base_traded = -base_traded
+        else:
+            quote_traded = -quote_traded
+        changes = {base_asset: base_traded, quote_asset: quote_traded}
+        for fill in order.get("fills", ()):
+            asset = fill["commissionAsset"]
+            changes[asset] = changes.get(asset, 0) - fixed_point.parse(fill["commission"])
+        
+        transact_time = order.get("transactTime", 0)
+        with self._lock:
+            if self._free is None:
+                return
+            for asset, change in changes.items():
+                if self._updated_at.get(asset, 0) < transact_time:
+                    self._free[asset] = self._free.get(asset, 0) + change
+                    self._updated_at[asset] = transact_time
+    
+    def start_reconciling(self, interval=reconcile_interval):
+        '''
+        Downloads the account every interval seconds until stop_reconciling is called.
+        '''
+        self._stopped.clear()
+        def run():
+            while not self._stopped.wait(interval):
+                try:
+                    self.reconcile()
+                except Exception as e:
+                    logging.debug("Could not reconcile balances: "+str(e))
+        reconcile_thread = Thread(target=run)
+        reconcile_thread.daemon = True
+        reconcile_thread.start()
+        return reconcile_thread
+    
+    def stop_reconciling(self):
+        self._stopped.set()
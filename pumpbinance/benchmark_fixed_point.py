@@ -0,0 +1,65 @@
+'''
+Compares the fixed-point tick loop with the Decimal one it replaced.
+
+Usage: python benchmark_fixed_point.py [levels]
+'''
+from decimal import Decimal
+from random import Random
+from timeit import default_timer
+import sys
+import fixed_point
+from pumper import pumper
+
+def synthetic_bids(levels, seed=0):
+    '''
+    :returns: A descending list of [price, quantity] strings like the ones in a depth response.
+    '''
+    random = Random(seed)
+    price = 100000
+    bids = []
+    for _ in range(levels):
+        bids.append([fixed_point.to_string(price), fixed_point.to_string(random.randint(1, 10**12))])
+        price -= random.randint(1, 5)
+    return bids
+
+def decimal_update_bids(bid_threshold, bids):
+    # The Decimal implementation of pumper.update_bids before fixed-point was introduced.
+    highest_bid = Decimal(0)
+    usable_sell_quantity = Decimal(0)
+    for bid in bids:
+        price = Decimal(bid[0])
+        quantity = Decimal(bid[1])
+        if highest_bid < price:
+            highest_bid = price
+        if price >= bid_threshold:
+            usable_sell_quantity += quantity
+        else:
+            break
+    return highest_bid, usable_sell_quantity
+
+def time_per_call(function, repeat):
+    start = default_timer()
+    for _ in range(repeat):
+        function()
+    return (default_timer() - start) / repeat
+
+def run(levels=1000, repeat=200):
+    '''
+    :returns: The microseconds per tick of the Decimal and the fixed-point paths.
+    '''
+    bids = synthetic_bids(levels)
+    bid_threshold = Decimal(bids[-1][0]) # Every level is usable, so neither path stops early.
+    
+    bot = pumper()
+    bot.set_up(Decimal(1), Decimal(0), bid_threshold, "BENCH")
+    
+    decimal_time = time_per_call(lambda: decimal_update_bids(bid_threshold, bids), repeat)
+    fixed_time = time_per_call(lambda: bot.update_bids(bids), repeat)
+    return decimal_time * 10**6, fixed_time * 10**6
+
+if __name__ == "__main__":
+    levels = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    decimal_us, fixed_us = run(levels)
+    print("update_bids over %d levels" % levels)
+    print("Decimal:     %10.1fus" % decimal_us)
+    print("Fixed-point: %10.1fus (%.1fx faster)" % (fixed_us, decimal_us / fixed_us))
@@ -0,0 +1,34 @@
+'''
+Measures the microseconds between asking for a market sell and its bytes being handed to
+the socket, for the original signing path and for a prepared order_template.
+Nothing is sent, offline_binance stops the requests at the socket.
+
+Usage: python benchmark_order_signing.py [repeat]
+'''
+import sys
+from offline_binance import offline_api
+
+def average_preparation_us(send, api, repeat):
+    total = 0
+    for _ in range(repeat):
+        send()
+        total += api.last_preparation_us
+    return total / float(repeat)
+
+def run(repeat=2000):
+    '''
+    :returns: The average microseconds before and after orders were prepared ahead of time.
+    '''
+    api = offline_api()
+    template = api.prepare_market_sell("BNBBTC")
+    
+    before = average_preparation_us(lambda: api._order_market_sell(symbol="BNBBTC", quantity="12.00"), api, repeat)
+    after = average_preparation_us(lambda: api.send_order(template, "12.00"), api, repeat)
+    return before, after
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    before, after = run(repeat)
+    print("Decision to socket, averaged over %d orders" % repeat)
+    print("create_order:   %8.1fus" % before)
+    print("order_template: %8.1fus" % after)
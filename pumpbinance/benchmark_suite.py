@@ -0,0 +1,206 @@
+'''
+Times the code between receiving a depth payload and sending an order, over books of
+5, 100, 1000 and 5000 levels, and compares the results with a saved baseline.
+
+The books are synthetic, plus the deepest snapshot of a tick_recorder recording when one is given.
+Every case is run a few times and the fastest run is kept, since slower runs are caused by
+the machine rather than the code.
+
+Usage: python benchmark_suite.py [--recording ticks.bin.gz] [--output results.json]
+                                 [--baseline benchmark_baseline.json] [--save-baseline] [--tolerance 0.2]
+Exits with 1 when a case got slower than the baseline by more than the tolerance.
+
+The committed benchmark_baseline.json was measured on the machine and Python it names. Timings
+only compare on the same machine, so save a baseline of your own with --save-baseline first.
+'''
+from decimal import Decimal
+from timeit import default_timer
+import argparse
+import json
+import platform
+import sys
+import time
+import fixed_point
+from benchmark_fixed_point import synthetic_bids
+from offline_binance import offline_api
+from helper_methods import readable_alt_balance, readable_btc_balance
+from pumper import pumper
+from symbol_filters import symbol_filters
+from tick_recorder import read_ticks, DEPTH_SNAPSHOT
+
+BASELINE_FILENAME = 'benchmark_baseline.json'
+LEVELS = (5, 100, 1000, 5000)
+SYMBOL = "BNBBTC"
+runs = 5
+min_run_seconds = 0.05 # Each run calls the case enough times to take at least this long
+
+def synthetic_book(levels, seed=0):
+    '''
+    :returns: A book in the format of binance_api.get_order_book with levels on each side.
+    '''
+    bids = synthetic_bids(levels, seed)
+    best_ask = fixed_point.parse(bids[0][0]) + 1
+    asks = [[fixed_point.to_string(best_ask + (best_ask - fixed_point.parse(bid[0]))), bid[1]] for bid in bids]
+    return {"lastUpdateId": 1, "bids": bids, "asks": asks}
+
+def recorded_book(filename):
+    '''
+    :returns: The deepest depth snapshot of a recording in the format of binance_api.get_order_book, None if it has none.
+    '''
+    deepest = None
+    for kind, recorded_at, symbol, data in read_ticks(filename):
+        if kind == DEPTH_SNAPSHOT and (deepest is None or len(data[0]) > len(deepest["bids"])):
+            bids, asks, last_update_id = data
+            deepest = {"lastUpdateId": last_update_id, "bids": bids, "asks": asks}
+    return deepest
+
+def books(recording=None):
+    '''
+    Yields (source, levels, book) for every size, recorded books are skipped when the recording is not deep enough.
+    '''
+    recorded = recorded_book(recording) if recording is not None else None
+    for levels in LEVELS:
+        yield "synthetic", levels, synthetic_book(levels)
+        if recorded is not None and len(recorded["bids"]) >= levels and len(recorded["asks"]) >= levels:
+            yield "recorded", levels, {"lastUpdateId": recorded["lastUpdateId"], "bids": recorded["bids"][:levels], "asks": recorded["asks"][:levels]}
+
+def time_per_call_us(function):
+    '''
+    :returns: The microseconds per call of the fastest of runs.
+    '''
+    number = 1
+    while True:
+        elapsed = _time_calls(function, number)
+        if elapsed >= min_run_seconds:
+            break
+        number *= 2
+    best = elapsed
+    for _ in range(runs - 1):
+        best = min(best, _time_calls(function, number))
+    return best / number * 10**6
+
+def _time_calls(function, number):
+    start = default_timer()
+    for _ in range(number):
+        function()
+    return default_timer() - start
+
+def filled_order(quantity, quote_quantity):
+    # A create_order response with newOrderRespType=FULL.
+    return {"symbol": SYMBOL, "side": "BUY", "status": "FILLED", "transactTime": 0,
+            "executedQty": quantity, "cummulativeQuoteQty": quote_quantity,
+            "fills": [{"price": "0.00100000", "qty": quantity, "commission": "0.00000000", "commissionAsset": "BNB"}]}
+
+def book_cases(source, levels, book):
+    '''
+    Yields (name, function) for the cases whose cost depends on the size of the book.
+    '''
+    payload = json.dumps(book)
+    bids = book["bids"]
+    name = "[" + source + "," + str(levels) + "]"
+    
+    yield "json_decode" + name, lambda: json.loads(payload)
+    
+    # Every level is above the threshold, so the loops never stop early.
+    bot = pumper()
+    bot.set_up(Decimal(1), Decimal(0), fixed_point.to_decimal(fixed_point.parse(bids[-1][0])), "BNB")
+    yield "update_bids" + name, lambda: bot.update_bids(bids)
+    yield "update_bid_levels" + name, lambda: bot.update_bid_levels(bids, True)
+    
+    # From the payload to the decision when only the first tenth of the bids is above the threshold.
+    stopping_bot = pumper()
+    stopping_bot.set_up(Decimal(1), Decimal(0), fixed_point.to_decimal(fixed_point.parse(bids[len(bids) // 10][0])), "BNB")
+    yield "decode_and_update_bids" + name, lambda: stopping_bot.update_bids(json.loads(payload)["bids"])
+    
+    # Sizing the order by walking every ask, then validating and signing it up to the socket.
+    btc_to_spend = fixed_point.to_decimal(sum(fixed_point.multiply(fixed_point.parse(ask[0]), fixed_point.parse(ask[1])) for ask in book["asks"]))
+    api = offline_api(filled_order("1.00000000", "0.00100000"), symbol_filters(step_size=1, min_quantity=0, tick_size=1, min_price=0, min_notional=0))
+    yield "market_buy" + name, lambda: api.market_buy(btc_to_spend, SYMBOL, True, book)
+
+def fixed_cases():
+    '''
+    Yields (name, function) for the cases that do not depend on the book.
+    '''
+    api = offline_api()
+    order = {"symbol": SYMBOL, "side": "SELL", "type": "MARKET", "quantity": "12.00",
+             "newOrderRespType": "FULL", "recvWindow": 5000, "timestamp": 1500000000000}
+    yield "generate_signature", lambda: api._generate_signature(order)
+    signed_order = dict(order, signature=api._generate_signature(order))
+    yield "order_params", lambda: api._order_params(signed_order)
+    
+    bot = pumper()
+    bot.set_up(Decimal(1), Decimal(0), Decimal("0.001"), "BNB")
+    bot.alt_holdings = Decimal("1234.56789012")
+    yield "readable_btc_balance", lambda: readable_btc_balance(Decimal("0.12345678"))
+    yield "readable_alt_balance", lambda: readable_alt_balance(2, pumper=bot)
+
+def run(recording=None):
+    '''
+    :returns: Case name -> microseconds per call.
+    '''
+    results = {}
+    cases = list(fixed_cases())
+    for source, levels, book in books(recording):
+        cases.extend(book_cases(source, levels, book))
+    for name, function in cases:
+        results[name] = time_per_call_us(function)
+    return results
+
+def save(filename, results):
+    with open(filename, "w") as results_file:
+        json.dump({"savedAt": time.time(), "python": platform.python_version(), "machine": platform.platform(),
+                   "results": results}, results_file, indent=1, sort_keys=True)
+
+def load(filename):
+    with open(filename) as results_file:
+        return json.load(results_file)["results"]
+
+def compare(results, baseline, tolerance):
+    '''
+    :param tolerance: The fraction a case can get slower by before it is a regression.
+    :returns: The names of the cases that regressed.
+    '''
+    regressions = []
+    for name in sorted(results):
+        current = results[name]
+        before = baseline.get(name)
+        if before is None:
+            print("%-40s %12s %10.2fus" % (name, "new", current))
+            continue
+        change = current / before - 1
+        regressed = change > tolerance
+        if regressed:
+            regressions.append(name)
+        print("%-40s %10.2fus %10.2fus %+7.1f%%%s" % (name, before, current, change * 100, "  REGRESSION" if regressed else ""))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks the order book parsing and decision hot path.")
+    parser.add_argument("--recording", help="A tick_recorder recording whose deepest snapshot is benchmarked too")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where the results are saved")
+    parser.add_argument("--baseline", default=BASELINE_FILENAME, help="Results to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="Saves the results as the baseline instead of comparing")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="How much slower a case can get before it fails, 0.2 is 20%%")
+    args = parser.parse_args(argv)
+    
+    results = run(args.recording)
+    save(args.output, results)
+    if args.save_baseline:
+        save(args.baseline, results)
+        for name in sorted(results):
+            print("%-40s %10.2fus" % (name, results[name]))
+        return 0
+    
+    try:
+        baseline = load(args.baseline)
+    except (IOError, ValueError, KeyError):
+        print("No baseline in " + args.baseline + ", run with --save-baseline first.")
+        return 0
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print("%d of %d cases regressed by more than %d%%." % (len(regressions), len(results), args.tolerance * 100))
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
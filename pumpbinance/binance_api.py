@@ -2,118 +2,197 @@ from decimal import Decimal
 import hashlib
 import hmac
 import requests
-import time
+from timeit import default_timer
 from urllib import urlencode
 import warnings
-from math import floor, fabs
-
-post_binance_fee = Decimal(0.999)
+import logging
+import fixed_point
+from symbol_filters import symbol_filter_cache
+from balance_cache import balance_cache
+from clock_sync import clock_offset_estimator, client_time_ms
+from latency_stats import stats, monotonic, SIGNATURE, ROUND_TRIP
+from rate_limiter import request_weight_limiter, request_weight, default_ban_seconds, ORDER, MARKET_DATA
+
+post_binance_fee = Decimal("0.999")
+fixed_post_binance_fee = fixed_point.from_decimal(post_binance_fee)
 API_URL = 'https://api.binance.com/api'
 WEBSITE_URL = 'https://www.binance.com'
 PUBLIC_API_VERSION = 'v1'
 PRIVATE_API_VERSION = 'v3'
-recvWindow = 20000 # Measured in milliseconds
-
-minimum_decimals_in_quantity = {"ETHBTC": 3, "LTCBTC": 2, "BNBBTC": 0, "NEOBTC": 2, "GASBTC": 2, "BCCBTC": 3, "MCOBTC": 2,
-                    "WTCBTC": 0, "QTUMBTC": 2, "OMGBTC": 2, "ZRXBTC": 0, "STRATBTC": 2, "SNGLSBTC": 0, "BQXBTC": 0,
-                    "KNCBTC": 0, "FUNBTC": 0, "SNMBTC": 0, "LINKBTC": 0, "XVGBTC": 0, "CTRBTC": 0, "SALTBTC": 2,
-                    "IOTABTC": 2, "MDABTC": 0, "MTLBTC": 0, "SUBBTC": 0, "EOSBTC": 0, "SNTBTC": 0, "ETCBTC": 2,
-                    "MTHBTC": 0, "ENGBTC": 0, "DNTBTC": 0, "BNTBTC": 0, "ASTBTC": 0, "DASHBTC": 3, "ICNBTC": 0,
-                    "OAXBTC": 0, "BTGBTC": 2, "EVXBTC": 0, "REQBTC": 0, "LRCBTC": 0, "VIBBTC": 0, "HSRBTC": 0,
-                    "TRXBTC": 0, "POWRBTC": 0, "ARKBTC": 2, "YOYOBTC": 0, "XRPBTC": 0, "MODBTC": 0, "ENJBTC": 0,
-                    "STORJBTC": 0, "VENBTC": 0, "KMDBTC": 0, "RCNBTC": 0, "NULSBTC": 0, "RDNBTC": 0, "XMRBTC": 3,
-                    "DLTBTC": 3, "AMBBTC": 3, "BATBTC": 0, "ZECBTC": 3, "BCPTBTC": 0, "ARNBTC": 0, "GVTBTC": 2,
-                    "CDTBTC": 0, "GXSBTC": 2, "POEBTC": 0, "QSPBTC": 0, "BTSBTC": 0, "XZCBTC": 2, "LSKBTC": 2,
-                    "TNTBTC": 0,"FUELBTC": 0, "MANABTC": 0, "BCDBTC": 3, "DGDBTC": 3, "ADXBTC": 0, "ADABTC": 0,
-                    "PPTBTC": 2, "CMTBTC": 0}
-
-decimals_in_price = {"ETHBTC": 6, "BCCBTC": 6, "LTCBTC": 6, "NEOBTC": 6, "ETCBTC": 6, "DASHBTC": 6, "STRATBTC": 6,
-                             "QTUMBTC": 6, "MCOBTC": 6, "BTGBTC": 6, "OMGBTC": 6, "ZECBTC": 6, "SALTBTC": 6, "XMRBTC": 6,
-                             "ARKBTC": 7, "LSKBTC": 7, "MTLBTC": 6, "KMDBTC": 7, "HSRBTC": 6, "PPTBTC": 7, "GXSBTC": 7,
-                             "BDCBTC": 6, "XZCBTC": 6, "DGDBTC": 6, "GASBTC": 6, "GVTBTC": 7, "MODBTC": 7}
+recvWindow = 5000 # Measured in milliseconds, small since time stamps follow the server's clock
+clock_sync_timeout = 10 # Measured in seconds, how long the first signed request waits for the clock estimate
+ORDER_PATHS = ('order', 'order/oco', 'orderList') # Requests on these paths are sent with order priority
+connection_pool_size = 4 # Keep-alive connections, enough for async_binance_api's workers
 
 class binance_api(object):
     
-    def __init__(self, api_key, api_secret):
+    def __init__(self, api_key, api_secret, api_url=API_URL):
+        '''
+        :param api_url: Can point at a local server standing in for Binance.
+        '''
         self.api_key = api_key
         self.api_secret = api_secret
+        self.api_url = api_url
         
         self.session = self._init_session()
-        self.get_average_latency() # Used to generate time stamps
-        
-    def get_average_latency(self):
-        '''
-        Based on the algorithm by Zachary Booth Simpson (2000)
-        http://www.mine-control.com/zack/timesync/timesync.html
+        self.limiter = request_weight_limiter() # Shared by every request so polling cannot get the IP banned
+        self.last_preparation_us = 0 # Microseconds between asking for the last request and sending it
+        # Time stamps use an estimate of the server's clock, kept up to date in the background
+        # instead of measured with blocking requests while connecting.
+        self.clock = clock_offset_estimator()
+        self.clock.start(self._sample_server_time)
+        self.filters = symbol_filter_cache(self) # Used to validate orders before sending them
+        self.balances = balance_cache(self) # Read instead of downloading the account every time
+    
+    def close(self):
+        ''' Stops sampling the server time, requests can still be sent afterwards. '''
+        self.clock.stop()
         
-        Latency is measured in milliseconds.
-        '''
-        client_times = []
-        server_times = []
+    def _sample_server_time(self):
         with warnings.catch_warnings():
             warnings.simplefilter("ignore")
-            
-            self._get('time') # Exclude the first ping. It is abnormally long for some reason.
-            
-            i = 0
-            while i < 5: # Arbitrary, but change averages below if this is changed
-                client_times.append(round(time.time()*1000)) # seconds to milliseconds
-                server_times.append(self._get('time')["serverTime"])
-                i += 1
-        
-        # Logically, the latency should be divided by two  because the latency exists when the
-        # data is being sent there AND back. However, the program sends commands more than 1000ms
-        # ahead of Binance's server time when the latency is divided by zero so it is being removed.
-        # Secondly, the latency should not be an absolute value in other applications since it doesn't
-        # specify if the server or the client is ahead.
-        average_server_time = sum(server_times) / 5.0
-        average_client_time = sum(client_times) / 5.0
-        time_dif = fabs(average_server_time - average_client_time)
-        self.latency_between_server_and_client = int(time_dif)
-        
+            sent = client_time_ms()
+            server_time = self._get('time')["serverTime"]
+            self.clock.add_sample(sent, server_time, client_time_ms())
+    
     def full_ticker_for(self, alt):
         '''
         Pre: alt is a valid ticker for a coin. It is a String and entirely upper case.
         '''
         return alt + "BTC"
     
+    def symbol_filters(self, ticker):
+        '''
+        :returns: The ticker's LOT_SIZE, PRICE_FILTER and MIN_NOTIONAL rules as a symbol_filters object.
+        :raises: BinanceOrderUnknownSymbolException
+        '''
+        filters = self.filters.get(ticker)
+        if filters is None:
+            # The symbol may have been listed after the cache was saved.
+            self.filters.refresh()
+            filters = self.filters.get(ticker)
+            if filters is None:
+                raise BinanceOrderUnknownSymbolException(ticker)
+        return filters
+    
     def price_adjusted_for_decimals(self, price, ticker):
-        decimals = decimals_in_price.get(ticker, 6)
-        return Decimal(floor(price * Decimal(10**decimals))) / Decimal((10.0**decimals))
+        price = fixed_point.from_decimal(price)
+        return fixed_point.to_decimal(fixed_point.floor_to_step(price, self.symbol_filters(ticker).tick_size))
     
     def alt_amount_adjusted_for_decimals(self, alt_amount, ticker):
-        decimals = minimum_decimals_in_quantity.get(ticker, 0)
-        return Decimal(floor(alt_amount * Decimal(10**decimals))) / Decimal((10.0**decimals))
+        return fixed_point.to_decimal(self._fixed_alt_amount_adjusted_for_decimals(fixed_point.from_decimal(alt_amount), ticker))
+    
+    def _fixed_alt_amount_adjusted_for_decimals(self, alt_amount, ticker):
+        '''
+        Pre: alt_amount is a fixed-point integer
+        '''
+        return fixed_point.floor_to_step(alt_amount, self.symbol_filters(ticker).step_size)
+    
+    def validate_order(self, ticker, quantity=None, price=None, notional=None):
+        '''
+        Checks an order against the ticker's filters so it is not rejected by the exchange.
         
-    def market_buy(self, btc_to_spend, ticker, use_bnb):
+        Pre: quantity, price and notional are fixed-point integers that are already adjusted for decimals.
+             The notional is computed when both the quantity and the price are known.
+        :raises: BinanceOrderUnknownSymbolException, BinanceOrderMinAmountException, BinanceOrderMinPriceException, BinanceOrderMinTotalException
+        '''
+        filters = self.symbol_filters(ticker)
+        if quantity is not None:
+            if quantity < filters.min_quantity or quantity == 0:
+                raise BinanceOrderMinAmountException(fixed_point.to_string(filters.min_quantity, filters.quantity_decimals))
+            if price is not None:
+                notional = fixed_point.multiply(quantity, price)
+        if price is not None and price < filters.min_price:
+            raise BinanceOrderMinPriceException(fixed_point.to_string(filters.min_price, filters.price_decimals))
+        if notional is not None and notional < filters.min_notional:
+            raise BinanceOrderMinTotalException(fixed_point.to_string(filters.min_notional))
+    
+    def _quantity_string(self, alt_amount, ticker):
+        '''
+        Pre: alt_amount is a fixed-point integer adjusted for decimals
+        '''
+        return fixed_point.to_string(alt_amount, self.symbol_filters(ticker).quantity_decimals)
+    
+    def _fixed_after_fee(self, amount, use_bnb):
+        if use_bnb:
+            return amount
+        return fixed_point.multiply(amount, fixed_post_binance_fee)
+    
+    def _fixed_fill_totals(self, order, fee_asset):
+        '''
+        :param order: required
+        :type order: create_order response with newOrderRespType=FULL
+        :returns: The amount of the alt and BTC traded and the commission paid in fee_asset.
+                  The commission is None when the response has no fills.
         '''
+        alt_traded = fixed_point.parse(order["executedQty"])
+        btc_traded = fixed_point.parse(order["cummulativeQuoteQty"])
+        fills = order.get("fills")
+        if not fills:
+            return alt_traded, btc_traded, None
+        commission = 0
+        for fill in fills:
+            if fill["commissionAsset"] == fee_asset:
+                commission += fixed_point.parse(fill["commission"])
+        return alt_traded, btc_traded, commission
+    
+    def _fixed_alt_received(self, order, ticker, use_bnb):
+        '''
+        :returns: The alt bought by a market order after the commission was taken out of it.
+        '''
+        alt_traded, _, commission = self._fixed_fill_totals(order, ticker[:-len("BTC")])
+        if commission is None:
+            return self._fixed_after_fee(alt_traded, use_bnb)
+        return alt_traded - commission
+    
+    def _fixed_btc_received(self, order, use_bnb):
+        '''
+        :returns: The BTC received by a market sell after the commission was taken out of it.
+        '''
+        _, btc_traded, commission = self._fixed_fill_totals(order, "BTC")
+        if commission is None:
+            return self._fixed_after_fee(btc_traded, use_bnb)
+        return btc_traded - commission
+        
+    def market_buy(self, btc_to_spend, ticker, use_bnb, book=None):
+        '''
+        :param book: optional, a local copy of the ticker's order book used to size the order.
+                     Without it the order spends btc_to_spend directly, which needs no extra request.
+        :type book: dict in the format returned by get_order_book
         :returns: The amount of the alt being received after paying fees.
         '''
 
         with warnings.catch_warnings():
             warnings.simplefilter("ignore")
             
-            alt_traded = Decimal(0)
-            for ask in self.get_order_book(symbol=ticker)["asks"]:
+            btc_to_spend = fixed_point.from_decimal(btc_to_spend)
+            if book is None:
+                self.validate_order(ticker, notional=btc_to_spend)
+                order = self._order_market_buy(symbol=ticker, quoteOrderQty=fixed_point.to_string(btc_to_spend), newOrderRespType="FULL")
+                self.balances.apply_order(order, ticker[:-len("BTC")])
+                return fixed_point.to_decimal(self._fixed_alt_received(order, ticker, use_bnb))
+            
+            alt_traded = 0
+            for ask in book["asks"]:
                 if btc_to_spend == 0:
-                    alt_traded = self.alt_amount_adjusted_for_decimals(alt_traded, ticker)
-                    self._order_market_buy(symbol=ticker, quantity=alt_traded)
-                    if use_bnb:
-                        return alt_traded
-                    else:
-                        return alt_traded * post_binance_fee
+                    break
                 
-                price = Decimal(ask[0])
-                quantity = Decimal(ask[1])
+                price = fixed_point.parse(ask[0])
+                quantity = fixed_point.parse(ask[1])
                 
-                btc_that_can_be_spent = price * quantity
+                btc_that_can_be_spent = fixed_point.multiply(price, quantity)
                 if btc_that_can_be_spent > btc_to_spend:
-                    alt_to_buy = btc_to_spend / price
+                    alt_traded += fixed_point.divide(btc_to_spend, price)
                     btc_to_spend = 0
-                    alt_traded += alt_to_buy
                 else:
                     btc_to_spend -= btc_that_can_be_spent
                     alt_traded += quantity
+            
+            alt_traded = self._fixed_alt_amount_adjusted_for_decimals(alt_traded, ticker)
+            self.validate_order(ticker, alt_traded)
+            order = self._order_market_buy(symbol=ticker, quantity=self._quantity_string(alt_traded, ticker), newOrderRespType="FULL")
+            self.balances.apply_order(order, ticker[:-len("BTC")])
+            return fixed_point.to_decimal(self._fixed_alt_received(order, ticker, use_bnb))
     
     def limit_buy(self, alt_amount, pumper, ticker, price, use_bnb):
         '''
@@ -125,8 +204,7 @@ class binance_api(object):
         with warnings.catch_warnings():
             warnings.simplefilter("ignore")
             alt_amount = self.alt_amount_adjusted_for_decimals(alt_amount, ticker)
-            price = self.price_adjusted_for_decimals(price, ticker)
-            pumper.limit_order_id = self._order_limit_buy(symbol=ticker, quantity=alt_amount, price=price)["clientOrderId"]
+            pumper.limit_order_id = self._place_limit_order(self._order_limit_buy, ticker, alt_amount, price)
         if use_bnb:
             return alt_amount
         else:
@@ -139,61 +217,135 @@ class binance_api(object):
         with warnings.catch_warnings():
             warnings.simplefilter("ignore")
             ticker = self.full_ticker_for(pumper.alt_ticker)
-            price = self.price_adjusted_for_decimals(price, ticker)
-            pumper.limit_order_id = self._order_limit_sell(symbol=ticker, quantity=pumper.alt_holdings, price=price)["clientOrderId"]
+            pumper.limit_order_id = self._place_limit_order(self._order_limit_sell, ticker, pumper.alt_holdings, price)
+    
+    def _place_limit_order(self, place, ticker, alt_amount, price):
+        '''
+        Pre: alt_amount and price are Decimals
+        :param place: _order_limit_buy or _order_limit_sell
+        :returns: The order's client order id.
+        '''
+        filters = self.symbol_filters(ticker)
+        alt_amount = self._fixed_alt_amount_adjusted_for_decimals(fixed_point.from_decimal(alt_amount), ticker)
+        price = fixed_point.floor_to_step(fixed_point.from_decimal(price), filters.tick_size)
+        self.validate_order(ticker, alt_amount, price)
+        # str() of a small Decimal is in scientific notation (5E-7), which Binance rejects.
+        return place(symbol=ticker, quantity=self._quantity_string(alt_amount, ticker),
+                     price=fixed_point.to_string(price, filters.price_decimals))["clientOrderId"]
+    
+    def place_oco_sell(self, ticker, alt_amount, price, stop_price, stop_limit_price, list_client_order_id, limit_client_order_id, stop_client_order_id):
+        '''
+        Places a limit sell and a stop-limit sell of the same quantity, when one fills the other is cancelled.
+        
+        Pre: alt_amount, price, stop_price and stop_limit_price are fixed-point integers
+        :returns: API response, see create_oco_order
+        :raises: BinanceOrderException if the order does not pass the ticker's filters
+        '''
+        filters = self.symbol_filters(ticker)
+        alt_amount = self._fixed_alt_amount_adjusted_for_decimals(alt_amount, ticker)
+        # The limit is never below the price asked for, the stop is never above it.
+        price = fixed_point.floor_to_step(price + filters.tick_size - 1, filters.tick_size)
+        stop_price = fixed_point.floor_to_step(stop_price, filters.tick_size)
+        stop_limit_price = fixed_point.floor_to_step(stop_limit_price, filters.tick_size)
+        self.validate_order(ticker, alt_amount, price)
+        self.validate_order(ticker, alt_amount, stop_limit_price)
+        return self.create_oco_order(symbol=ticker, side="SELL", quantity=self._quantity_string(alt_amount, ticker),
+                                     price=fixed_point.to_string(price, filters.price_decimals),
+                                     stopPrice=fixed_point.to_string(stop_price, filters.price_decimals),
+                                     stopLimitPrice=fixed_point.to_string(stop_limit_price, filters.price_decimals),
+                                     stopLimitTimeInForce="GTC", listClientOrderId=list_client_order_id,
+                                     limitClientOrderId=limit_client_order_id, stopClientOrderId=stop_client_order_id)
+    
+    def prepare_market_sell(self, ticker):
+        '''
+        :returns: An order_template for market_sell, should be prepared when the pump starts.
+        '''
+        return self.prepare_order(symbol=ticker, side="SELL", type="MARKET", newOrderRespType="FULL")
     
-    def market_sell(self, pumper, use_bnb):
+    def market_sell(self, pumper, use_bnb, template=None):
         '''
+        :param template: optional, from prepare_market_sell
         :returns: The amount of Bitcoin being received after paying fees.
         '''
         
-        alt_amount = pumper.alt_holdings
         ticker = self.full_ticker_for(pumper.alt_ticker)
-        
+        alt_amount = self._fixed_alt_amount_adjusted_for_decimals(fixed_point.from_decimal(pumper.alt_holdings), ticker)
+        order, btc_received = self.market_sell_quantity(ticker, alt_amount, use_bnb, template)
+        return fixed_point.to_decimal(btc_received)
+    
+    def market_sell_quantity(self, ticker, alt_amount, use_bnb, template=None):
+        '''
+        Pre: alt_amount is a fixed-point integer adjusted for decimals
+        :param template: optional, from prepare_market_sell
+        :returns: The order response and the fixed-point BTC received after paying fees.
+        '''
         # Place the market order first to make sure it is received soon.
-        alt_amount = self.alt_amount_adjusted_for_decimals(alt_amount, ticker)
-        self._order_market_sell(symbol=ticker, quantity=alt_amount)
+        self.validate_order(ticker, alt_amount)
+        if template is None:
+            order = self._order_market_sell(symbol=ticker, quantity=self._quantity_string(alt_amount, ticker), newOrderRespType="FULL")
+        else:
+            order = self.send_order(template, self._quantity_string(alt_amount, ticker))
+        logging.debug("Market sell was sent "+str(self.last_preparation_us)+"us after it was requested.")
+        self.balances.apply_order(order, ticker[:-len("BTC")])
+        return order, self._fixed_btc_received(order, use_bnb)
+    
+    def prepare_order(self, **params):
+        '''
+        Encodes and signs the parameters that are known before an order has to be sent,
+        so send_order only has to add the quantity and the timestamp.
         
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore")
-            
-            btc_traded = Decimal(0)
-            for bid in self.get_order_book(symbol=ticker)["bids"]:
-                if alt_amount == 0:
-                    if use_bnb:
-                        return btc_traded
-                    else:
-                        return btc_traded * post_binance_fee
-                
-                price = Decimal(bid[0])
-                quantity = Decimal(bid[1])
-                
-                if quantity > alt_amount:
-                    btc_traded += alt_amount * price
-                    alt_amount = 0
-                else:
-                    btc_traded += quantity * price
-                    alt_amount -= quantity
+        :param params: The parameters of create_order except quantity.
+        :returns: An order_template that can be sent any number of times.
+        '''
+        params['recvWindow'] = recvWindow
+        body_prefix = urlencode(params)
+        signature_state = hmac.new(self.api_secret.encode('utf-8'), body_prefix.encode('utf-8'), hashlib.sha256)
+        request = self.session.prepare_request(requests.Request('POST', self._create_api_uri('order', True)))
+        request.headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        return order_template(request, body_prefix, signature_state)
+    
+    def send_order(self, template, quantity):
+        '''
+        :param template: required
+        :type template: order_template from prepare_order
+        :param quantity: required
+        :type quantity: str
+        :returns: API response, see create_order
+        '''
+        started = default_timer()
+        self.limiter.acquire(1, ORDER)
+        signing = monotonic()
+        signed_part = '&quantity=' + quantity + '&timestamp=' + str(self.get_timestamp())
+        signature = template.signature_state.copy()
+        signature.update(signed_part.encode('utf-8'))
+        request = template.request.copy()
+        request.prepare_body(template.body_prefix + signed_part + '&signature=' + signature.hexdigest(), None)
+        stats.record(SIGNATURE, monotonic() - signing)
+        return self._send(request, started, is_order=True)
     
     def get_timestamp(self):
         '''
-        Accounts for the difference between the client and the server time.
+        :returns: The server time in milliseconds, estimated by the clock_offset_estimator.
         '''
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore")
-            client_time = int(round(time.time() * 1000))
-            return client_time - self.latency_between_server_and_client
+        # Only waits until the first sample arrives after connecting.
+        self.clock.wait_until_synced(clock_sync_timeout)
+        return int(round(self.clock.now_ms()))
     
-    def get_btc_balance(self):
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore")
-            for asset_balances in self._get('account', True, data={"timestamp":self.get_timestamp()})["balances"]:
-                if asset_balances["asset"] == "BTC":
-                    return Decimal(asset_balances["free"])
+    def get_btc_balance(self, refresh=False):
+        '''
+        :param refresh: Downloads the account again instead of reading the balance_cache.
+        '''
+        if refresh:
+            self.balances.reconcile()
+        return self.balances.get("BTC")
 
     def _init_session(self):
 
         session = requests.session()
+        # Concurrent requests reuse open connections instead of paying for new TLS handshakes.
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=connection_pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
         session.headers.update({'Accept': 'application/json',
                                 'User-Agent': 'binance/python',
                                 'X-MBX-APIKEY': self.api_key})
@@ -201,7 +353,7 @@ class binance_api(object):
 
     def _create_api_uri(self, path, signed=True):
         v = PRIVATE_API_VERSION if signed else PUBLIC_API_VERSION
-        return API_URL + '/' + v + '/' + path
+        return self.api_url + '/' + v + '/' + path
 
     def _create_website_uri(self, path):
         return WEBSITE_URL + '/' + path
@@ -228,7 +380,9 @@ class binance_api(object):
             params.append(('signature', data['signature']))
         return params
 
-    def _request(self, method, uri, signed, force_params=False, **kwargs):
+    def _request(self, method, uri, signed, force_params=False, weight=1, priority=MARKET_DATA, **kwargs):
+        started = default_timer()
+        self.limiter.acquire(weight, priority)
 
         data = kwargs.get('data', None)
         if data and isinstance(data, dict):
@@ -237,19 +391,46 @@ class binance_api(object):
             # generate signature
             kwargs['data']['timestamp'] = self.get_timestamp()
             kwargs["data"]["recvWindow"] = recvWindow
+            signing = monotonic()
             kwargs['data']['signature'] = self._generate_signature(kwargs['data'])
+            stats.record(SIGNATURE, monotonic() - signing)
 
         if data and (method == 'get' or force_params):
             kwargs['params'] = self._order_params(kwargs['data'])
             del(kwargs['data'])
 
-        response = getattr(self.session, method)(uri, verify=False, **kwargs)
+        request = self.session.prepare_request(requests.Request(method.upper(), uri, **kwargs))
+        return self._send(request, started, is_order=priority == ORDER)
+
+    def _send(self, request, started, is_order=False):
+        '''
+        Sends a prepared request and records how long it took to get it ready.
+        
+        :param started: When the request was asked for, from timeit.default_timer
+        :param is_order: Orders are timed in latency_stats, from the event they react to until their response.
+        '''
+        self.last_preparation_us = int((default_timer() - started) * 10**6)
+        sent = client_time_ms()
+        if is_order:
+            stats.mark_sent()
+            sending = monotonic()
+        response = self.session.send(request, verify=False)
+        if is_order:
+            stats.record(ROUND_TRIP, monotonic() - sending)
+        # Every response is a rough sample of the server's clock.
+        self.clock.add_date_header(sent, response.headers.get('Date'), client_time_ms())
+        self.limiter.update_from_headers(response.headers)
+        if response.status_code == 429 or response.status_code == 418:
+            # Rate limited or banned, sending anything else before Retry-After makes the ban longer.
+            self.limiter.back_off(int(response.headers.get('Retry-After', default_ban_seconds)))
         return self._handle_response(response)
 
     def _request_api(self, method, path, signed=False, **kwargs):
         uri = self._create_api_uri(path, signed)
+        weight = request_weight(path, kwargs.get('data') or {}, method)
+        priority = ORDER if path in ORDER_PATHS else MARKET_DATA
 
-        return self._request(method, uri, signed, **kwargs)
+        return self._request(method, uri, signed, weight=weight, priority=priority, **kwargs)
 
     def _request_website(self, method, path, signed=False, **kwargs):
 
@@ -341,6 +522,34 @@ class binance_api(object):
         :raises: BinanceResponseException, BinanceAPIException
         """
         return self._get('depth', data=params)
+    
+    def get_exchange_info(self):
+        """Current exchange trading rules and symbol information
+        https://github.com/binance-exchange/binance-official-api-docs/blob/master/rest-api.md#exchange-information
+        :returns: API response
+        .. code-block:: python
+            {
+                "timezone": "UTC",
+                "serverTime": 1508631584636,
+                "rateLimits": [],
+                "exchangeFilters": [],
+                "symbols": [
+                    {
+                        "symbol": "ETHBTC",
+                        "status": "TRADING",
+                        "baseAsset": "ETH",
+                        "quoteAsset": "BTC",
+                        "filters": [
+                            {"filterType": "PRICE_FILTER", "minPrice": "0.00000100", "maxPrice": "100000.00000000", "tickSize": "0.00000100"},
+                            {"filterType": "LOT_SIZE", "minQty": "0.00100000", "maxQty": "100000.00000000", "stepSize": "0.00100000"},
+                            {"filterType": "MIN_NOTIONAL", "minNotional": "0.00100000"}
+                        ]
+                    }
+                ]
+            }
+        :raises: BinanceResponseException, BinanceAPIException
+        """
+        return self._get('exchangeInfo')
 
     # Account Endpoints
 
@@ -365,6 +574,8 @@ class binance_api(object):
         :type stopPrice: decimal
         :param icebergQty: Used with iceberg orders
         :type icebergQty: decimal
+        :param newOrderRespType: ACK, RESULT or FULL. FULL adds the fills and their commission.
+        :type newOrderRespType: enum
         :returns: API response
         .. code-block:: python
             {
@@ -377,6 +588,42 @@ class binance_api(object):
         """
         return self._post('order', True, data=params)
 
+    def create_oco_order(self, **params):
+        """Send in a new OCO order, a limit order and a stop-limit order where one cancels the other
+        https://github.com/binance-exchange/binance-official-api-docs/blob/master/rest-api.md#new-oco-trade
+        :param symbol: required
+        :type symbol: str
+        :param side: required
+        :type side: enum
+        :param quantity: required
+        :type quantity: decimal
+        :param price: required, the limit order's price
+        :type price: decimal
+        :param stopPrice: required
+        :type stopPrice: decimal
+        :param stopLimitPrice: The stop-limit order's price, it is a stop-loss order without it
+        :type stopLimitPrice: decimal
+        :param stopLimitTimeInForce: required with stopLimitPrice
+        :type stopLimitTimeInForce: enum
+        :param listClientOrderId: A unique id for the list of orders. Automatically generated if not sent.
+        :type listClientOrderId: str
+        :param limitClientOrderId: A unique id for the limit order.
+        :type limitClientOrderId: str
+        :param stopClientOrderId: A unique id for the stop-limit order.
+        :type stopClientOrderId: str
+        :returns: API response
+        .. code-block:: python
+            {
+                "orderListId": 0,
+                "listClientOrderId": "JYVpp3F0f5CAG15DhtrqLp",
+                "listOrderStatus": "EXECUTING",
+                "orders": [{"symbol": "LTCBTC", "orderId": 2, "clientOrderId": "Kk7sqHb9J6mJWTMDVW7Vos"}, ...],
+                "orderReports": [...]
+            }
+        :raises: BinanceResponseException, BinanceAPIException
+        """
+        return self._post('order/oco', True, data=params)
+    
     def _order_limit(self, timeInForce="GTC", **params):
         """Send in a new limit order
         :param symbol: required
@@ -502,8 +749,10 @@ class binance_api(object):
         """Send in a new market buy order
         :param symbol: required
         :type symbol: str
-        :param quantity: required
+        :param quantity: required unless quoteOrderQty is sent
         :type quantity: decimal
+        :param quoteOrderQty: The amount of BTC to spend instead of a quantity of the alt
+        :type quoteOrderQty: decimal
         :param newClientOrderId: A unique id for the order. Automatically generated if not sent.
         :type newClientOrderId: str
         :returns: API response
@@ -576,6 +825,32 @@ class binance_api(object):
         """
         return self._get('order', True, data=params)
 
+    def get_account(self):
+        """Get the current account information
+        https://github.com/binance-exchange/binance-official-api-docs/blob/master/rest-api.md#account-information-user_data
+        :returns: API response
+        .. code-block:: python
+            {
+                "makerCommission": 15,
+                "takerCommission": 15,
+                "buyerCommission": 0,
+                "sellerCommission": 0,
+                "canTrade": true,
+                "canWithdraw": true,
+                "canDeposit": true,
+                "updateTime": 123456789,
+                "balances": [
+                    {
+                        "asset": "BTC",
+                        "free": "4723846.89208129",
+                        "locked": "0.00000000"
+                    }
+                ]
+            }
+        :raises: BinanceResponseException, BinanceAPIException
+        """
+        return self._get('account', True, data={})
+
     def cancel_order(self, **params):
         """Cancel an active order. Either orderId or origClientOrderId must be sent.
         https://www.binance.com/restapipub.html#cancel-order-signed
@@ -601,6 +876,36 @@ class binance_api(object):
         """
         return self._delete('order', True, data=params)
     
+    def cancel_order_list(self, **params):
+        """Cancel an active OCO order. Either orderListId or listClientOrderId must be sent.
+        https://github.com/binance-exchange/binance-official-api-docs/blob/master/rest-api.md#cancel-oco-trade
+        :param symbol: required
+        :type symbol: str
+        :param orderListId: The unique order list id
+        :type orderListId: int
+        :param listClientOrderId: optional
+        :type listClientOrderId: str
+        :returns: API response
+        .. code-block:: python
+            {
+                "orderListId": 0,
+                "listClientOrderId": "C3wyj4WVEktd7u9aVBRXcN",
+                "listOrderStatus": "ALL_DONE",
+                "orderReports": [
+                    {
+                        "clientOrderId": "pO9ufTiFGg3nw2fOdgeOXa", # The id of the cancel
+                        "origClientOrderId": "Kk7sqHb9J6mJWTMDVW7Vos",
+                        "executedQty": "0.00000000",
+                        "cummulativeQuoteQty": "0.00000000",
+                        "status": "CANCELED",
+                        ...
+                    }, ...
+                ]
+            }
+        :raises: BinanceResponseException, BinanceAPIException
+        """
+        return self._delete('orderList', True, data=params)
+    
     #  User Stream Endpoints
 
     def stream_get_listen_key(self):
@@ -636,6 +941,16 @@ class binance_api(object):
         """
         return self._delete('userDataStream', False, data=params)
     
+class order_template(object):
+    '''
+    An order whose fixed parameters were encoded and signed ahead of time by binance_api.prepare_order.
+    '''
+    
+    def __init__(self, request, body_prefix, signature_state):
+        self.request = request # requests.PreparedRequest with the URL and headers but no body
+        self.body_prefix = body_prefix
+        self.signature_state = signature_state # HMAC that has already consumed body_prefix
+    
 class BinanceAPIException(Exception):
     
     LISTENKEY_NOT_EXIST = '-1125'
@@ -656,4 +971,32 @@ class BinanceRequestException(Exception):
         self.message = message
 
     def __str__(self):
-        return 'BinanceRequestException: %s' % self.message
\ No newline at end of file
+        return 'BinanceRequestException: %s' % self.message
+
+class BinanceOrderException(Exception):
+    def __init__(self, code, message):
+        self.code = code
+        self.message = message
+
+    def __str__(self):
+        return 'BinanceOrderException(code=%s): %s' % (self.code, self.message)
+
+class BinanceOrderMinAmountException(BinanceOrderException):
+    def __init__(self, value):
+        message = "Amount must be at least %s" % value
+        super(BinanceOrderMinAmountException, self).__init__(-1013, message)
+
+class BinanceOrderMinPriceException(BinanceOrderException):
+    def __init__(self, value):
+        message = "Price must be at least %s" % value
+        super(BinanceOrderMinPriceException, self).__init__(-1013, message)
+
+class BinanceOrderMinTotalException(BinanceOrderException):
+    def __init__(self, value):
+        message = "Total must be at least %s" % value
+        super(BinanceOrderMinTotalException, self).__init__(-1013, message)
+
+class BinanceOrderUnknownSymbolException(BinanceOrderException):
+    def __init__(self, value):
+        message = "Unknown symbol %s" % value
+        super(BinanceOrderUnknownSymbolException, self).__init__(-1013, message)
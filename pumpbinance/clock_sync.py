@@ -0,0 +1,86 @@
+from collections import deque
+from email.utils import parsedate_tz, mktime_tz
+from threading import Event, Lock, Thread
+import logging
+import time
+
+sample_window = 8 # Only the most recent samples are kept so the estimate follows clock drift.
+resync_interval = 30 # Measured in seconds
+date_header_uncertainty = 1000 # Measured in milliseconds, Date headers only have a resolution of one second.
+
+def client_time_ms():
+    return time.time() * 1000
+
+class clock_offset_estimator(object):
+    '''
+    Estimates how far Binance's clock is ahead of ours (negative if it is behind).
+    
+    Based on NTP: a server time received between sending a request at sent_ms and getting
+    the response at received_ms was read around the middle of the round trip, with an error
+    of at most half the round trip. The estimate is the sample with the smallest round trip
+    among the recent ones, since delays in the network can only make a sample worse.
+    
+    Exact samples and rough ones, like Date headers, are kept in separate windows so the
+    rough samples every response brings cannot push the exact ones out.
+    '''
+    
+    def __init__(self, window=sample_window):
+        self.offset_ms = 0.0
+        self.round_trip_ms = None # Of the sample the offset comes from
+        self._exact_samples = deque(maxlen=window) # (error bound, round trip, offset)
+        self._rough_samples = deque(maxlen=window)
+        self._lock = Lock()
+        self._synced = Event()
+        self._stopped = Event()
+    
+    def add_sample(self, sent_ms, server_ms, received_ms, uncertainty_ms=0):
+        '''
+        :param uncertainty_ms: How much earlier than server_ms the server may have read its clock.
+        '''
+        round_trip = received_ms - sent_ms
+        offset = server_ms - uncertainty_ms / 2.0 - (sent_ms + received_ms) / 2.0
+        with self._lock:
+            samples = self._rough_samples if uncertainty_ms else self._exact_samples
+            samples.append((round_trip + uncertainty_ms, round_trip, offset))
+            _, self.round_trip_ms, self.offset_ms = min(min(window) for window in (self._exact_samples, self._rough_samples) if window)
+        self._synced.set()
+    
+    def add_date_header(self, sent_ms, date, received_ms):
+        '''
+        :param date: The Date header of a response, e.g. "Wed, 21 Oct 2015 07:28:00 GMT"
+        '''
+        parsed = parsedate_tz(date) if date else None
+        if parsed is not None:
+            # The header is truncated to the second, so the server time is somewhere in the following second.
+            server_ms = mktime_tz(parsed) * 1000 + date_header_uncertainty
+            self.add_sample(sent_ms, server_ms, received_ms, date_header_uncertainty)
+    
+    def now_ms(self):
+        ''' :returns: The estimated server time. '''
+        return client_time_ms() + self.offset_ms
+    
+    def wait_until_synced(self, timeout=None):
+        ''' Blocks until there is at least one sample, returns immediately afterwards. '''
+        return self._synced.wait(timeout)
+    
+    def start(self, sample, interval=resync_interval):
+        '''
+        Keeps adding samples in the background until stop is called.
+        
+        :param sample: Called every interval seconds, should call add_sample.
+        '''
+        self._stopped.clear()
+        def run():
+            while not self._stopped.is_set():
+                try:
+                    sample()
+                except Exception as e:
+                    logging.debug("Could not sample the server time: "+str(e))
+                self._stopped.wait(interval)
+        sync_thread = Thread(target=run)
+        sync_thread.daemon = True
+        sync_thread.start()
+        return sync_thread
+    
+    def stop(self):
+        self._stopped.set()
@@ -0,0 +1,45 @@
+from collections import deque
+
+class console_log(object):
+    '''
+    The lines shown in the console, bounded so adding one never copies the others.
+    
+    Lines can be appended from any thread. The full history is written to the spool file when
+    flush is called, so appending never waits on the disk.
+    '''
+    
+    def __init__(self, max_lines, spool_filename=None):
+        '''
+        :param max_lines: The number of lines kept for rendering
+        :param spool_filename: optional, every line is appended to it.
+        '''
+        self._lines = deque(maxlen=max_lines)
+        self._unspooled = deque()
+        self._spool = open(spool_filename, 'a') if spool_filename is not None else None
+        self.changed = False
+    
+    def append(self, line):
+        self._lines.append(line)
+        if self._spool is not None:
+            self._unspooled.append(line)
+        self.changed = True
+    
+    def render(self):
+        ''' :returns: The kept lines as one string. '''
+        # Cleared first so a line appended while rendering is rendered next time.
+        self.changed = False
+        return "\n".join(tuple(self._lines))
+    
+    def flush(self):
+        if self._spool is None or not self._unspooled:
+            return
+        lines = []
+        while self._unspooled:
+            lines.append(self._unspooled.popleft())
+        self._spool.write("\n".join(lines) + "\n")
+        self._spool.flush()
+    
+    def close(self):
+        self.flush()
+        if self._spool is not None:
+            self._spool.close()
@@ -0,0 +1,124 @@
+'''
+Structured event log written as JSON lines by a background thread.
+
+emit only appends a tuple to a queue, so it can be called between receiving the book and
+sending an order. The writer serializes and writes the queued records in batches.
+
+Every record has the event name, "t" in seconds from a monotonic clock (for durations),
+"time" since the epoch (for matching with other logs), "pump" with the correlation id of the
+pump it belongs to, if any, and the event's fields.
+
+install also routes the logging module into the event log, so nothing logs synchronously.
+'''
+from collections import deque
+from threading import Thread, Event
+import ctypes
+import ctypes.util
+import json
+import logging
+import os
+import time
+import uuid
+
+flush_interval = 0.2 # Measured in seconds
+
+def _clock_gettime_monotonic():
+    ''' :returns: CLOCK_MONOTONIC as a function returning seconds, None if it cannot be read. '''
+    try:
+        librt = ctypes.CDLL(ctypes.util.find_library('rt') or ctypes.util.find_library('c'), use_errno=True)
+        clock_gettime = librt.clock_gettime
+    except (OSError, AttributeError, TypeError):
+        return None
+    
+    class timespec(ctypes.Structure):
+        _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+    
+    CLOCK_MONOTONIC = 1
+    def monotonic():
+        spec = timespec()
+        clock_gettime(CLOCK_MONOTONIC, ctypes.byref(spec))
+        return spec.tv_sec + spec.tv_nsec * 1e-9
+    return monotonic
+
+# time.monotonic only exists in Python 3, Linux can read the same clock directly.
+monotonic = getattr(time, 'monotonic', None) or (_clock_gettime_monotonic() if os.name == 'posix' else None) or time.time
+
+def new_pump_id():
+    ''' :returns: A correlation id for the records of one pump. '''
+    return uuid.uuid4().hex[:12]
+
+class event_log(object):
+    '''
+    A JSON lines file and the thread writing to it.
+    '''
+    
+    def __init__(self, filename, flush_interval=flush_interval):
+        self.filename = filename
+        self.flush_interval = flush_interval
+        self._records = deque() # (monotonic, epoch, event, pump id, fields)
+        self._stopped = Event()
+        self._file = open(filename, 'a')
+        self._writer = Thread(target=self._write_batches)
+        self._writer.daemon = True
+        self._writer.start()
+    
+    def emit(self, event, pump_id=None, **fields):
+        self._records.append((monotonic(), time.time(), event, pump_id, fields))
+    
+    def close(self):
+        self._stopped.set()
+        self._writer.join()
+        self._file.close()
+    
+    def _write_batches(self):
+        while not self._stopped.wait(self.flush_interval):
+            self._write_batch()
+        self._write_batch()
+    
+    def _write_batch(self):
+        records = self._records
+        if not records:
+            return
+        lines = []
+        while records:
+            t, epoch, event, pump_id, fields = records.popleft()
+            fields["event"] = event
+            fields["t"] = round(t, 6)
+            fields["time"] = round(epoch, 6)
+            if pump_id is not None:
+                fields["pump"] = pump_id
+            lines.append(json.dumps(fields, separators=(',', ':'), default=str))
+        self._file.write("\n".join(lines) + "\n")
+        self._file.flush()
+
+class event_log_handler(logging.Handler):
+    '''
+    Sends logging records to an event_log as "log" events.
+    '''
+    
+    def __init__(self, log):
+        logging.Handler.__init__(self)
+        self.log = log
+    
+    def emit(self, record):
+        self.log.emit("log", level=record.levelname, logger=record.name, message=record.getMessage())
+
+_log = None
+
+def install(filename, level=logging.DEBUG):
+    '''
+    Starts the event log used by emit and sends the logging module's records to it.
+    '''
+    global _log
+    _log = event_log(filename)
+    root = logging.getLogger()
+    root.addHandler(event_log_handler(_log))
+    root.setLevel(level)
+    return _log
+
+def emit(event, pump_id=None, **fields):
+    '''
+    Adds a record to the installed event log, does nothing if there is none.
+    '''
+    if _log is not None:
+        _log.emit(event, pump_id, **fields)
@@ -0,0 +1,67 @@
+'''
+Exact fixed-point arithmetic for prices and quantities.
+
+Binance sends every price and quantity as a string with 8 decimals, so they are
+stored as integers counting units of 1E-8 (satoshis for BTC amounts). Integer math
+is exact and much cheaper than Decimal, which is only used at the edges of the
+program when amounts are shown to the user.
+'''
+from decimal import Decimal, ROUND_FLOOR
+
+DECIMALS = 8
+ONE = 10**DECIMALS
+
+def parse(string):
+    '''
+    :param string: required
+    :type string: str in the exchange's format, e.g. "0.00012345"
+    :returns: The amount in units of 1E-8. Decimals past the eighth are truncated.
+    '''
+    whole, _, fraction = string.partition('.')
+    return int(whole + (fraction + '00000000')[:DECIMALS])
+
+def to_string(value, decimals=DECIMALS):
+    '''
+    :returns: The amount in the exchange's format, truncated to the given number of decimals.
+    '''
+    sign = '-' if value < 0 else ''
+    whole, fraction = divmod(abs(value), ONE)
+    if decimals == 0:
+        return sign + str(whole)
+    return sign + str(whole) + '.' + ('%08d' % fraction)[:decimals]
+
+def to_decimal(value):
+    return Decimal(value).scaleb(-DECIMALS)
+
+def from_decimal(value, rounding=ROUND_FLOOR):
+    '''
+    Pre: value is a Decimal
+    '''
+    return int(value.scaleb(DECIMALS).to_integral_value(rounding=rounding))
+
+def multiply(a, b):
+    ''' :returns: a * b rounded down. '''
+    return a * b // ONE
+
+def divide(a, b):
+    ''' :returns: a / b rounded down. '''
+    return a * ONE // b
+
+def floor_to_step(value, step):
+    '''
+    :param step: required, e.g. a lot size or tick size
+    :returns: The largest multiple of step that is not greater than value.
+    '''
+    return value - value % step
+
+def step_for_decimals(decimals):
+    ''' :returns: The step of an amount limited to the given number of decimals. '''
+    return 10**(DECIMALS - decimals)
+
+def decimals_in_step(step):
+    ''' :returns: The number of decimals needed to write multiples of step, e.g. 3 for a step of 0.001. '''
+    decimals = DECIMALS
+    while decimals > 0 and step % 10 == 0:
+        step //= 10
+        decimals -= 1
+    return decimals
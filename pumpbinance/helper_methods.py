@@ -1,10 +1,12 @@
-from decimal import Decimal
+import fixed_point
 
 def btc_to_alt(btc_amount, alt_value):
     '''
     Pre: btc_amount and alt_value are both Decimals
+    Returns: The amount of the alt that can be bought, rounded down to 4 decimals.
     '''
-    return Decimal(round(btc_amount / alt_value, 4))
+    alt_amount = fixed_point.divide(fixed_point.from_decimal(btc_amount), fixed_point.from_decimal(alt_value))
+    return fixed_point.to_decimal(fixed_point.floor_to_step(alt_amount, fixed_point.step_for_decimals(4)))
 
 def readable_btc_balance(decimal_amount):
     return '{0:.8f}'.format(decimal_amount)+"BTC"
@@ -0,0 +1,214 @@
+'''
+Latency histograms for each stage of the tick-to-trade path.
+
+A trace is begun when a depth event is received and every mark on the same thread records the
+time since the previous one under the stage's name, so the stages add up to the time between
+receiving the book and sending the order. Stages timed outside of a trace, like signing a
+manual sell, are recorded with record.
+
+The histograms can be read as text with summary_lines or scraped in Prometheus' text format
+from serve_metrics.
+'''
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from threading import Lock, Thread, local
+import logging
+import socket
+from event_log import monotonic
+
+# The stages in the order they happen.
+RECEIVE_TO_PARSED = "parse"
+BOOK_UPDATE = "book"
+UPDATE_BIDS = "update_bids"
+DECISION = "decision"
+SIGNATURE = "signature"
+ROUND_TRIP = "round_trip" # From sending an order request until its response is read
+TICK_TO_TRADE = "tick_to_trade" # From receiving the event until the order is sent
+STAGES = (RECEIVE_TO_PARSED, BOOK_UPDATE, UPDATE_BIDS, DECISION, SIGNATURE, ROUND_TRIP, TICK_TO_TRADE)
+
+SUB_BUCKET_BITS = 7 # Values keep 7 significant bits, so they are within 1.6% of what was recorded
+MAX_EXPONENT = 32 # Longer than about 19 hours is recorded as the highest bucket
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+class histogram(object):
+    '''
+    Counts durations in microseconds in buckets that grow with the value, like an HDR histogram,
+    so recording is O(1) and the memory does not depend on how many values were recorded.
+    
+    Values below 2**SUB_BUCKET_BITS have a bucket each, above that every power of two is split
+    into 2**(SUB_BUCKET_BITS-1) buckets.
+    '''
+    
+    def __init__(self):
+        self._half = 1 << (SUB_BUCKET_BITS - 1)
+        self._counts = [0] * ((1 << SUB_BUCKET_BITS) + MAX_EXPONENT * self._half)
+        self.count = 0
+        self.total_us = 0
+        self.max_us = 0
+        self._lock = Lock() # Stages are recorded from the stream threads and from the UI.
+    
+    def record(self, seconds):
+        # Rounded, 0.000249 * 10**6 is 248.99999999999997.
+        us = int(round(seconds * 10**6))
+        if us < 0:
+            us = 0
+        index = self._index(us)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.total_us += us
+            if us > self.max_us:
+                self.max_us = us
+    
+    def percentile(self, fraction):
+        '''
+        :param fraction: e.g. 0.99
+        :returns: The highest value in microseconds the bucket of the percentile can hold, 0 if nothing was recorded.
+        '''
+        with self._lock:
+            counts = list(self._counts)
+            count = self.count
+            max_us = self.max_us
+        if count == 0:
+            return 0
+        # The rank of the value, counted from 1.
+        rank = max(1, int(fraction * count + 0.5))
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            seen += bucket_count
+            if seen >= rank:
+                return min(self._highest_in_bucket(index), max_us)
+        return max_us
+    
+    def _index(self, us):
+        if us < (1 << SUB_BUCKET_BITS):
+            return us
+        exponent = us.bit_length() - SUB_BUCKET_BITS
+        if exponent > MAX_EXPONENT:
+            return len(self._counts) - 1
+        # us >> exponent has SUB_BUCKET_BITS bits, so its top bit is always set and is not stored.
+        return (1 << SUB_BUCKET_BITS) + (exponent - 1) * self._half + (us >> exponent) - self._half
+    
+    def _highest_in_bucket(self, index):
+        if index < (1 << SUB_BUCKET_BITS):
+            return index
+        exponent = (index - (1 << SUB_BUCKET_BITS)) // self._half + 1
+        sub_bucket = (index - (1 << SUB_BUCKET_BITS)) % self._half + self._half
+        return ((sub_bucket + 1) << exponent) - 1
+
+class latency_stats(object):
+    '''
+    A histogram per stage and the trace of the tick each thread is handling.
+    '''
+    
+    def __init__(self):
+        self.histograms = dict((stage, histogram()) for stage in STAGES)
+        self._trace = local() # started and last, the monotonic times of the trace's begin and last mark
+    
+    def begin(self, received=None):
+        '''
+        Starts the trace of an event on this thread, replacing the previous one.
+        
+        :param received: optional, monotonic time the event was received at, now by default.
+        '''
+        if received is None:
+            received = monotonic()
+        trace = self._trace
+        trace.started = received
+        trace.last = received
+    
+    def end(self):
+        self._trace.started = None
+    
+    def mark(self, stage):
+        '''
+        Records the time since the trace's previous mark under the stage, does nothing without a trace.
+        '''
+        trace = self._trace
+        if getattr(trace, 'started', None) is None:
+            return
+        now = monotonic()
+        self.histograms[stage].record(now - trace.last)
+        trace.last = now
+    
+    def mark_sent(self):
+        '''
+        Records the time from the trace's begin until now as tick to trade, called when an order is sent.
+        '''
+        trace = self._trace
+        if getattr(trace, 'started', None) is None:
+            return
+        self.histograms[TICK_TO_TRADE].record(monotonic() - trace.started)
+    
+    def record(self, stage, seconds):
+        self.histograms[stage].record(seconds)
+    
+    def summary_lines(self):
+        '''
+        :returns: A line per stage that has been recorded, with its count and percentiles in milliseconds.
+        '''
+        lines = []
+        for stage in STAGES:
+            h = self.histograms[stage]
+            if h.count == 0:
+                continue
+            percentiles = " ".join("p"+format_quantile(q)+"="+format_ms(h.percentile(q)) for q in QUANTILES)
+            lines.append(stage+" n="+str(h.count)+" "+percentiles+" max="+format_ms(h.max_us))
+        return lines
+    
+    def prometheus_text(self):
+        '''
+        :returns: The histograms as Prometheus summaries, in seconds.
+        '''
+        name = "pumpbinance_stage_latency_seconds"
+        lines = ["# HELP "+name+" Time spent in each stage of the tick-to-trade path.",
+                 "# TYPE "+name+" summary"]
+        for stage in STAGES:
+            h = self.histograms[stage]
+            label = 'stage="'+stage+'"'
+            for q in QUANTILES:
+                lines.append(name+"{"+label+',quantile="'+str(q)+'"} '+repr(h.percentile(q) / 1e6))
+            lines.append(name+"_sum{"+label+"} "+repr(h.total_us / 1e6))
+            lines.append(name+"_count{"+label+"} "+str(h.count))
+        return "\n".join(lines) + "\n"
+
+def format_ms(us):
+    return '{0:.3f}'.format(us / 1000.0)+"ms"
+
+def format_quantile(fraction):
+    # 0.5 -> 50, 0.999 -> 99.9
+    return '{0:g}'.format(fraction * 100)
+
+# Shared by the depth streams, the sessions and binance_api, like the logging module.
+stats = latency_stats()
+
+def serve_metrics(port, address="127.0.0.1"):
+    '''
+    Serves stats in Prometheus' text format at http://address:port/metrics from a background thread.
+    
+    :returns: The HTTPServer, None if the port could not be opened.
+    '''
+    class metrics_handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/', '/metrics'):
+                self.send_error(404)
+                return
+            body = stats.prometheus_text()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, format, *args):
+            # Scrapes would fill the event log.
+            pass
+    
+    try:
+        server = HTTPServer((address, port), metrics_handler)
+    except socket.error, e:
+        logging.debug("Could not serve latency metrics on port "+str(port)+": "+str(e))
+        return None
+    server_thread = Thread(target=server.serve_forever)
+    server_thread.daemon = True
+    server_thread.start()
+    return server
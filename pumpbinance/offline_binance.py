@@ -0,0 +1,49 @@
+'''
+A binance_api that never connects, for the tests and the benchmarks. Requests stop where they
+would be handed to the socket.
+'''
+from timeit import default_timer
+from binance_api import binance_api, API_URL
+from rate_limiter import request_weight_limiter
+from clock_sync import clock_offset_estimator
+from balance_cache import balance_cache
+
+class fixed_filters(object):
+    '''
+    Stands in for symbol_filter_cache, every symbol has the same filters.
+    '''
+    
+    def __init__(self, filters):
+        self.filters = filters
+    
+    def get(self, symbol):
+        return self.filters
+    
+    def refresh(self):
+        pass
+
+def offline_api(response=None, filters=None):
+    '''
+    :param response: optional, returned by every request instead of sending it.
+    :param filters: optional, the symbol_filters of every symbol.
+    :returns: A binance_api that has not connected to Binance.
+    '''
+    api = binance_api.__new__(binance_api)
+    api.api_key = "key"
+    api.api_secret = "secret"
+    api.api_url = API_URL
+    api.session = api._init_session()
+    api.limiter = request_weight_limiter(weight_per_minute=10**9) # Never the bottleneck here
+    api.clock = clock_offset_estimator()
+    api.clock.add_sample(0, 0, 0)
+    api.last_preparation_us = 0
+    api.filters = fixed_filters(filters)
+    api.balances = balance_cache(api) # Never seeded, so orders do not change it
+    api.last_request = None # The last requests.PreparedRequest that would have been sent
+    
+    def _send(request, started, is_order=False):
+        api.last_preparation_us = (default_timer() - started) * 10**6
+        api.last_request = request
+        return response
+    api._send = _send
+    return api
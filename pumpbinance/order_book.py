@@ -0,0 +1,306 @@
+from bisect import bisect_left, insort
+from threading import Event, Lock, Thread
+import json
+import logging
+import websocket
+import fixed_point
+from latency_stats import stats, RECEIVE_TO_PARSED, BOOK_UPDATE
+
+STREAM_URL = 'wss://stream.binance.com:9443/ws'
+DEPTH_LIMITS = (5, 10, 20, 50, 100, 500, 1000) # The limits get_order_book accepts, up to the deepest snapshot Binance serves
+default_snapshot_depth = 100 # Used for the first snapshot of a book that has to cover a quantity
+depth_headroom = 2 # Snapshots hold this many times the levels covering the quantity, so they survive the book thinning out
+reconnect_delay = 1 # Measured in seconds, how long a dropped depth stream waits before connecting again
+
+class order_book(object):
+    '''
+    Local copy of a symbol's order book, kept up to date by applying diff-depth events
+    on top of a REST snapshot.
+    
+    Levels are stored as the exchange's strings so snapshots can be handed to code that
+    expects the REST payload, and the prices of each side are kept sorted for O(1)
+    access to the top of the book.
+    '''
+    
+    def __init__(self):
+        self.last_update_id = 0
+        self._bids = {} # Fixed-point price -> [price string, quantity string]
+        self._asks = {}
+        self._bid_prices = [] # Ascending, the best bid is the last element
+        self._ask_prices = [] # Ascending, the best ask is the first element
+        # A snapshot cut off at its limit says nothing about the bids below its lowest one.
+        self.floor = None # Fixed-point lowest bid of such a snapshot, None when every bid is known
+        self.bid_quantity_above_floor = 0 # Fixed-point quantity of the bids at or above the floor
+    
+    def apply_snapshot(self, snapshot, limit=None):
+        '''
+        :param snapshot: required
+        :type snapshot: dict in the format returned by binance_api.get_order_book
+        :param limit: optional, the limit the snapshot was requested with.
+        '''
+        self.last_update_id = snapshot["lastUpdateId"]
+        self._bids, self._bid_prices = self._side_from_levels(snapshot["bids"])
+        self._asks, self._ask_prices = self._side_from_levels(snapshot["asks"])
+        if limit is not None and len(self._bid_prices) >= limit:
+            self.floor = self._bid_prices[0]
+        else:
+            self.floor = None
+        self.bid_quantity_above_floor = sum(fixed_point.parse(level[1]) for level in self._bids.itervalues())
+    
+    def apply_diff(self, bids, asks, last_update_id):
+        '''
+        Pre: bids and asks are lists of [price, quantity] strings, a quantity of zero removes the level.
+        '''
+        floor = self.floor
+        for bid in bids:
+            price, change = self._update_level(self._bids, self._bid_prices, bid[0], bid[1])
+            if floor is None or price >= floor:
+                self.bid_quantity_above_floor += change
+        for ask in asks:
+            self._update_level(self._asks, self._ask_prices, ask[0], ask[1])
+        self.last_update_id = last_update_id
+    
+    def levels_to_cover(self, quantity):
+        '''
+        :param quantity: required
+        :type quantity: fixed-point int
+        :returns: The number of bids from the best one down whose quantities add up to the quantity,
+                  every bid if the book holds less, or None if the bids that would be needed are below the floor.
+        '''
+        covered = 0
+        prices = self._bid_prices
+        for levels in range(1, len(prices) + 1):
+            covered += fixed_point.parse(self._bids[prices[-levels]][1])
+            if covered >= quantity:
+                return levels
+        if self.floor is not None:
+            return None
+        return len(prices)
+    
+    def top(self):
+        '''
+        :returns: The best bid and ask levels as a tuple, either may be None if that side is empty.
+        '''
+        best_bid = self._bids[self._bid_prices[-1]] if self._bid_prices else None
+        best_ask = self._asks[self._ask_prices[0]] if self._ask_prices else None
+        return (best_bid, best_ask)
+    
+    def snapshot(self, limit=None):
+        '''
+        :param limit: The number of levels to include on each side, all of them by default.
+        :returns: The book in the same format as binance_api.get_order_book.
+        '''
+        bid_prices = self._bid_prices[::-1] if limit is None else self._bid_prices[:-limit-1:-1]
+        ask_prices = self._ask_prices if limit is None else self._ask_prices[:limit]
+        return {"lastUpdateId": self.last_update_id,
+                "bids": [self._bids[price] for price in bid_prices],
+                "asks": [self._asks[price] for price in ask_prices]}
+    
+    def _side_from_levels(self, levels):
+        side = {}
+        for level in levels:
+            price = fixed_point.parse(level[0])
+            side[price] = [level[0], level[1]]
+        return side, sorted(side)
+    
+    def _update_level(self, side, prices, price_str, quantity_str):
+        '''
+        :returns: The fixed-point price and how much the level's quantity changed.
+        '''
+        price = fixed_point.parse(price_str)
+        quantity = fixed_point.parse(quantity_str)
+        previous = side.get(price)
+        previous_quantity = fixed_point.parse(previous[1]) if previous is not None else 0
+        if quantity == 0:
+            if previous is not None:
+                del side[price]
+                del prices[bisect_left(prices, price)]
+        else:
+            if previous is None:
+                insort(prices, price)
+            side[price] = [price_str, quantity_str]
+        return price, quantity - previous_quantity
+
+def _deeper_limit(limit):
+    for deeper in DEPTH_LIMITS:
+        if deeper > limit:
+            return deeper
+    return DEPTH_LIMITS[-1]
+
+class depth_stream(object):
+    '''
+    Keeps an order_book in sync with Binance's diff-depth stream.
+    https://github.com/binance-exchange/binance-official-api-docs/blob/master/web-socket-streams.md#how-to-manage-a-local-order-book-correctly
+    
+    on_book is called with a REST-style snapshot of the book whenever the top of the book changes,
+    so it can be used in place of polling get_order_book. on_bids is called with the bid levels
+    of every event and a flag telling if they are a full snapshot, see pumper.update_bid_levels.
+    
+    The stream reconnects until it is stopped, and every connection starts from a new snapshot,
+    since the events sent while it was down are lost.
+    '''
+    
+    def __init__(self, api, symbol, on_book=None, on_bids=None, stream_url=STREAM_URL, recorder=None, required_quantity=None,
+                 websocket_app=websocket.WebSocketApp):
+        '''
+        :param api: Used to fetch the REST snapshot the stream is applied to.
+        :type api: binance_api
+        :param on_book: optional
+        :param on_bids: optional
+        :param stream_url: Can point at a local server replaying recorded depth events.
+        :param recorder: optional, records the snapshots and the events applied to them.
+        :type recorder: tick_recorder
+        :param required_quantity: optional, returns the fixed-point quantity of bids the book has to hold,
+                                  e.g. the holdings that will be sold into it. Snapshots are sized to cover it,
+                                  without it they are as deep as Binance allows.
+        :param websocket_app: Makes the connections, takes the arguments of websocket.WebSocketApp.
+        '''
+        self.api = api
+        self.symbol = symbol
+        self.on_book = on_book
+        self.on_bids = on_bids
+        self.stream_url = stream_url
+        self.recorder = recorder
+        self.required_quantity = required_quantity
+        self.depth_limit = None # The limit of the last snapshot
+        self.last_event_time = None # Server time in milliseconds of the last event applied, None after a snapshot
+        self.websocket_app = websocket_app
+        self.book = order_book()
+        self.synced = False # If the book has had a snapshot since the stream connected
+        self.lock = Lock() # Held while the book changes, so other threads can read a consistent one.
+        self._next_update_id = None
+        self._ws = None
+        self._stopped = Event()
+    
+    def start(self):
+        self._stopped.clear()
+        stream_thread = Thread(target=self._run)
+        stream_thread.daemon = True
+        stream_thread.start()
+        return stream_thread
+    
+    def stop(self):
+        self._stopped.set()
+        ws = self._ws
+        if ws is not None:
+            ws.close()
+    
+    def _run(self):
+        while not self._stopped.is_set():
+            self._ws = self.websocket_app(self.stream_url + '/' + self.symbol.lower() + '@depth',
+                                          on_open=self._on_open,
+                                          on_message=self._on_message,
+                                          on_error=self._on_error,
+                                          on_close=self._on_close)
+            try:
+                self._ws.run_forever()
+            except Exception as e:
+                logging.debug("Depth stream for "+self.symbol+" failed: "+str(e))
+            # The book misses every event until the next connection resyncs it.
+            self.synced = False
+            if self._stopped.wait(reconnect_delay):
+                break
+            logging.debug("Depth stream for "+self.symbol+" dropped, reconnecting.")
+        self._ws = None
+    
+    def resync(self):
+        '''
+        Replaces the local book with a fresh REST snapshot. Events already contained in
+        the snapshot will be dropped by on_event.
+        '''
+        self.depth_limit = self.choose_depth_limit()
+        snapshot = self.api.get_order_book(symbol=self.symbol, limit=self.depth_limit)
+        with self.lock:
+            self.book.apply_snapshot(snapshot, self.depth_limit)
+            self.synced = True
+        self.last_event_time = None
+        if self.recorder is not None:
+            self.recorder.record_snapshot(self.symbol, snapshot)
+        self._next_update_id = None
+        book = self.book.snapshot()
+        if self.on_bids is not None:
+            self.on_bids(book["bids"], True)
+        if self.on_book is not None:
+            self.on_book(book)
+    
+    def choose_depth_limit(self):
+        '''
+        :returns: The smallest limit whose snapshot covers the required quantity with headroom, judging by the
+                  current book. It is one limit deeper than the last snapshot when that one did not reach far enough.
+        '''
+        if self.required_quantity is None:
+            return DEPTH_LIMITS[-1]
+        if self.depth_limit is None:
+            return default_snapshot_depth
+        levels = self.book.levels_to_cover(self.required_quantity())
+        if levels is None:
+            return _deeper_limit(self.depth_limit)
+        for limit in DEPTH_LIMITS:
+            if limit >= levels * depth_headroom:
+                return limit
+        return DEPTH_LIMITS[-1]
+    
+    def _is_under_sized(self):
+        # Only a deeper snapshot can help, and there is none past the last limit.
+        book = self.book
+        return (book.floor is not None and self.required_quantity is not None and self.depth_limit < DEPTH_LIMITS[-1]
+                and book.bid_quantity_above_floor < self.required_quantity())
+    
+    def on_event(self, event):
+        '''
+        Applies a depthUpdate event to the local book.
+        
+        :type event: dict decoded from the stream
+        '''
+        first_update_id = event["U"]
+        final_update_id = event["u"]
+        
+        if final_update_id <= self.book.last_update_id:
+            # The snapshot already contains this event.
+            return
+        
+        if self._next_update_id is None:
+            gap = first_update_id > self.book.last_update_id + 1
+        else:
+            gap = first_update_id != self._next_update_id
+        if gap:
+            logging.debug("Depth stream for "+self.symbol+" missed an update, resyncing.")
+            self.resync()
+            return
+        
+        self._next_update_id = final_update_id + 1
+        previous_top = self.book.top()
+        with self.lock:
+            self.book.apply_diff(event["b"], event["a"], final_update_id)
+        self.last_event_time = event.get("E")
+        stats.mark(BOOK_UPDATE)
+        if self.recorder is not None:
+            self.recorder.record_diff(self.symbol, event["b"], event["a"], final_update_id)
+        if self.on_bids is not None and event["b"]:
+            self.on_bids(event["b"], False)
+        if self.on_book is not None and self.book.top() != previous_top:
+            self.on_book(self.book.snapshot())
+        if self._is_under_sized():
+            logging.debug("Order book of "+self.symbol+" no longer covers the required quantity, resyncing deeper.")
+            self.resync()
+    
+    def _on_open(self, ws):
+        # The stream is already connected so the events sent while the snapshot is
+        # downloaded are buffered and applied on top of it afterwards.
+        self.resync()
+    
+    def _on_message(self, ws, message):
+        # Everything the event leads to on this thread, up to sending an order, is timed from here.
+        stats.begin()
+        try:
+            event = json.loads(message)
+            stats.mark(RECEIVE_TO_PARSED)
+            self.on_event(event)
+        finally:
+            stats.end()
+    
+    def _on_error(self, ws, error):
+        logging.debug("Depth stream for "+self.symbol+" failed: "+str(error))
+    
+    def _on_close(self, ws, *args):
+        self.synced = False
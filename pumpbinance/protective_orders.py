@@ -0,0 +1,145 @@
+from threading import Lock
+import logging
+import uuid
+from binance_api import BinanceAPIException, fixed_post_binance_fee
+import fixed_point
+
+# The stop-limit is placed this far below the stop so it still fills when the price drops through it.
+stop_limit_margin = fixed_point.parse("0.05")
+
+TAKE_PROFIT = "take_profit"
+STOP_LOSS = "stop_loss"
+OPEN_STATUSES = ("NEW", "PARTIALLY_FILLED")
+
+class protective_orders(object):
+    '''
+    An OCO sell kept on Binance while a pump holds the alt: a limit sell at the target and a
+    stop-limit sell at the stop loss. The exchange exits the position even if the bot stalls
+    or dies, so exits do not depend on the bot reading the book in time.
+    
+    The orders lock the alt they sell, so they have to be cancelled before the bot sells
+    any of it itself. Their fills are followed on the user data stream, and read from the
+    cancel's response, or queried when the cancel fails, in case the stream missed them.
+    '''
+    
+    def __init__(self, api, user_stream, ticker, use_bnb, on_fill):
+        '''
+        :type api: binance_api
+        :type user_stream: user_data_stream
+        :param on_fill: Called with the leg, the fixed-point alt sold, BTC traded and BTC received since the last call
+                        and if the leg is done, whenever one of the orders fills.
+        '''
+        self.api = api
+        self.user_stream = user_stream
+        self.ticker = ticker
+        self.use_bnb = use_bnb
+        self.on_fill = on_fill
+        self.list_client_order_id = None
+        self.active = False
+        self._legs = {} # Client order id -> leg
+        self._reported = {} # Client order id -> (alt sold, BTC traded, BTC received) already passed to on_fill
+        self._lock = Lock()
+    
+    def place(self, quantity, take_profit_price, stop_price):
+        '''
+        Pre: quantity, take_profit_price and stop_price are fixed-point integers
+        :raises: BinanceOrderException, BinanceAPIException
+        '''
+        self.list_client_order_id = _new_client_order_id()
+        limit_id = _new_client_order_id()
+        stop_id = _new_client_order_id()
+        self._legs = {limit_id: TAKE_PROFIT, stop_id: STOP_LOSS}
+        self._reported = {limit_id: (0, 0, 0), stop_id: (0, 0, 0)}
+        # Watched first, since fills can be reported before the response.
+        for client_order_id in self._legs:
+            self.user_stream.watch(client_order_id, self.ticker, self._on_execution)
+        stop_limit_price = stop_price - fixed_point.multiply(stop_price, stop_limit_margin)
+        try:
+            self.api.place_oco_sell(self.ticker, quantity, take_profit_price, stop_price, stop_limit_price,
+                                    self.list_client_order_id, limit_id, stop_id)
+        except Exception:
+            self._unwatch()
+            raise
+        self.active = True
+    
+    def cancel(self):
+        '''
+        Cancels the orders if they are still open and reports what they sold before that.
+        Blocks until Binance has cancelled them, so their alt can be sold right after.
+        
+        The fills found are reported as not done, even a filled leg, since the caller may be
+        deciding what to sell while holding the lock on_fill takes when a leg is done.
+        '''
+        if not self.active:
+            return
+        try:
+            response = self.api.cancel_order_list(symbol=self.ticker, listClientOrderId=self.list_client_order_id)
+        except BinanceAPIException, e:
+            # Usually one of them filled first and the list is gone.
+            logging.debug("Could not cancel the protective orders of "+self.ticker+": "+str(e))
+            self._query_legs()
+            return
+        self.active = False
+        for report in response.get("orderReports", ()):
+            quote = fixed_point.parse(report["cummulativeQuoteQty"])
+            self._report(report["origClientOrderId"], fixed_point.parse(report["executedQty"]), quote, self._after_fee(quote), False)
+        self._unwatch()
+    
+    def stop_watching(self):
+        self.active = False
+        self._unwatch()
+    
+    def _query_legs(self):
+        '''
+        Reports what each order sold, and stops following them once none is open.
+        The stream keeps following them if one is, or could not be queried.
+        '''
+        closed = True
+        for client_order_id in list(self._legs):
+            try:
+                order = self.api.get_order(symbol=self.ticker, origClientOrderId=client_order_id)
+            except BinanceAPIException, e:
+                logging.debug("Could not query the protective order "+client_order_id+": "+str(e))
+                closed = False
+                continue
+            quote = fixed_point.parse(order["cummulativeQuoteQty"])
+            self._report(client_order_id, fixed_point.parse(order["executedQty"]), quote, self._after_fee(quote), False)
+            if order["status"] in OPEN_STATUSES:
+                closed = False
+        if closed:
+            self.active = False
+            self._unwatch()
+    
+    def _on_execution(self, order):
+        '''
+        :type order: user_data_stream.order_state
+        '''
+        if order.status == "FILLED":
+            self.active = False
+        btc_received = order.quote_quantity - order.commission.get("BTC", 0) if order.commission else self._after_fee(order.quote_quantity)
+        self._report(order.client_order_id, order.executed_quantity, order.quote_quantity, btc_received, order.status == "FILLED")
+    
+    def _report(self, client_order_id, alt_sold, btc_traded, btc_received, done):
+        '''
+        Passes what changed since the last report of the leg to on_fill, the amounts are totals of the leg.
+        '''
+        with self._lock:
+            previous = self._reported.get(client_order_id)
+            if previous is None or (alt_sold <= previous[0] and not done):
+                # Not one of the legs, or nothing new about it.
+                return
+            self._reported[client_order_id] = (max(alt_sold, previous[0]), max(btc_traded, previous[1]), max(btc_received, previous[2]))
+        self.on_fill(self._legs[client_order_id], max(alt_sold - previous[0], 0), max(btc_traded - previous[1], 0), max(btc_received - previous[2], 0), done)
+    
+    def _after_fee(self, btc_traded):
+        # The commission is not known, so it is taken out the same way binance_api does without fills.
+        if self.use_bnb:
+            return btc_traded
+        return fixed_point.multiply(btc_traded, fixed_post_binance_fee)
+    
+    def _unwatch(self):
+        for client_order_id in self._legs:
+            self.user_stream.unwatch(client_order_id)
+
+def _new_client_order_id():
+    return "pb" + uuid.uuid4().hex[:20]
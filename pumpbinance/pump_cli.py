@@ -0,0 +1,222 @@
+'''
+Runs the pump bot without a display, taking commands from stdin or from a local socket.
+
+Commands, one per line:
+    pump TICKER [BTC]   Pumps the ticker, with --btc unless BTC is given
+    sell [TICKER]       Sells the pump of the ticker, or every pump
+    status              Shows the balance and the current profit of every pump
+    latency             Shows the percentiles of each stage from receiving the book to sending an order
+    quit [--force]      Quits once no pumps are running, --force sells them first
+
+When stdin runs out while pumps are running, the bot waits for them to finish before quitting.
+
+Usage: python pump_cli.py --target 50 --stop-loss=-10 --btc 0.01 [--limit] [--no-bnb] [--socket PATH | --port PORT] [--metrics-port PORT]
+The API key and secret are read from BINANCE_API_KEY and BINANCE_API_SECRET.
+e.g. echo "pump XVG" | nc -U pump.sock
+With --metrics-port the latencies can be scraped by Prometheus from http://127.0.0.1:PORT/metrics.
+'''
+from decimal import Decimal, InvalidOperation
+from threading import Lock
+import SocketServer
+import argparse
+import os
+import sys
+import time
+from helper_methods import readable_btc_balance
+from pump_engine import pump_engine
+from latency_stats import serve_metrics
+import event_log
+
+class console_listener(object):
+    '''
+    Prints the engine's console to stdout and keeps the latest profit for the status command.
+    '''
+    
+    def __init__(self, output=sys.stdout):
+        self.output = output
+        self.current_profit = Decimal(0)
+        self.btc_balance = Decimal(0)
+        self._lock = Lock()
+    
+    def write_to_console(self, line):
+        with self._lock:
+            self.output.write(time.strftime("%H:%M:%S ") + line + "\n")
+            self.output.flush()
+    
+    def set_current_profit(self, current_profit):
+        # Called on every tick, so it is only stored.
+        self.current_profit = current_profit
+    
+    def set_btc_balance(self, btc_balance):
+        self.btc_balance = btc_balance
+    
+    def on_session_finished(self, session):
+        pass
+
+class pump_cli(object):
+    '''
+    Turns command lines into pump_engine calls.
+    '''
+    
+    def __init__(self, engine, listener, btc_to_use, target_profit_percentage, stop_loss, is_entry_market, use_bnb, protect=False, trailing_stop=None):
+        self.engine = engine
+        self.listener = listener
+        self.btc_to_use = btc_to_use
+        self.target_profit_percentage = target_profit_percentage
+        self.stop_loss = stop_loss
+        self.is_entry_market = is_entry_market
+        self.use_bnb = use_bnb
+        self.protect = protect
+        self.trailing_stop = trailing_stop
+        self._lock = Lock() # Commands can come from several socket connections at once.
+    
+    def execute(self, line):
+        '''
+        :returns: False once the bot should quit.
+        '''
+        words = line.split()
+        if not words:
+            return True
+        command = words[0].lower()
+        with self._lock:
+            if command == "pump" and len(words) > 1:
+                try:
+                    btc_to_use = Decimal(words[2]) if len(words) > 2 else self.btc_to_use
+                except InvalidOperation:
+                    self.listener.write_to_console("BTC to spend has to be a number.")
+                    return True
+                self.wait(self.engine.pump(words[1], btc_to_use, self.target_profit_percentage, self.stop_loss, self.is_entry_market, self.use_bnb,
+                                           self.protect, self.trailing_stop))
+            elif command == "sell":
+                for selling in self.engine.manual_sell(words[1] if len(words) > 1 else ""):
+                    self.wait(selling)
+            elif command == "status":
+                self.status()
+            elif command == "latency":
+                self.engine.show_latency()
+            elif command == "quit":
+                return not self.can_quit(force="--force" in words[1:])
+            else:
+                self.listener.write_to_console("Unknown command: "+line.strip())
+        return True
+    
+    def wait(self, result):
+        '''
+        Waits for what the engine sent in the background, so commands are carried out one after the other.
+        
+        :type result: AsyncResult or None
+        :returns: What it returned, None if it failed.
+        '''
+        if result is None:
+            return None
+        try:
+            return result.get()
+        except Exception, e:
+            self.listener.write_to_console("Failed: "+str(e))
+            return None
+    
+    def can_quit(self, force=False):
+        '''
+        Nothing would sell the pumps left running once the bot quits.
+        
+        :param force: If the running pumps are sold first.
+        :returns: If no pumps are running.
+        '''
+        if force:
+            for selling in self.engine.manual_sell(""):
+                self.wait(selling)
+        if self.engine.is_pumping:
+            self.listener.write_to_console(str(len(self.engine.sessions.sessions))+" pumps are still running. Sell them first, or use quit --force to sell them and quit.")
+            return False
+        return True
+    
+    def wait_for_pumps(self, interval=1):
+        '''
+        Blocks until every pump has finished.
+        '''
+        if self.engine.is_pumping:
+            self.listener.write_to_console("No more commands, waiting for the running pumps to finish.")
+        while self.engine.is_pumping:
+            time.sleep(interval)
+    
+    def status(self):
+        self.listener.write_to_console("Available Balance: "+readable_btc_balance(self.engine.btc_balance))
+        sessions = self.engine.sessions.sessions if self.engine.sessions is not None else []
+        for session in sessions:
+            profit = session.pumper.current_profit_percentage
+            self.listener.write_to_console(session.full_ticker+" Current Profit: "+'{0:.3f}'.format(round(profit*Decimal(100), 3))+"%")
+        if not sessions:
+            self.listener.write_to_console("No pumps are running.")
+    
+    def read_commands(self, lines):
+        for line in lines:
+            if not self.execute(line):
+                return False
+        return True
+
+def serve(cli, server_class, address):
+    class command_handler(SocketServer.StreamRequestHandler):
+        def handle(self):
+            if not cli.read_commands(iter(self.rfile.readline, '')):
+                # Checked by the loop below between connections.
+                server.shutdown_requested = True
+    
+    server = server_class(address, command_handler)
+    server.daemon_threads = True
+    server.shutdown_requested = False
+    server.timeout = 0.5
+    while not server.shutdown_requested:
+        server.handle_request()
+    server.server_close()
+
+class threading_unix_server(SocketServer.ThreadingMixIn, SocketServer.UnixStreamServer):
+    pass
+
+class threading_tcp_server(SocketServer.ThreadingMixIn, SocketServer.TCPServer):
+    allow_reuse_address = True
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Runs the pump bot without a display.")
+    parser.add_argument("--target", type=Decimal, default=Decimal(50), help="Auto sell percentage")
+    parser.add_argument("--stop-loss", type=Decimal, default=Decimal(-10), help="Stop loss percentage, written as --stop-loss=-10")
+    parser.add_argument("--btc", type=Decimal, default=Decimal("0.002"), help="BTC to spend on each pump")
+    parser.add_argument("--limit", action="store_true", help="Enter with a limit buy instead of a market buy")
+    parser.add_argument("--no-bnb", action="store_true", help="Pay fees from the trades instead of with BNB")
+    parser.add_argument("--trailing", type=Decimal, help="Once the target is reached, sells when the bid falls this percentage from its peak")
+    parser.add_argument("--protect", action="store_true", help="Keeps the target and stop loss on Binance as an OCO sell once the entry fills")
+    parser.add_argument("--socket", help="Reads commands from a Unix socket at this path instead of stdin")
+    parser.add_argument("--port", type=int, help="Reads commands from this port on 127.0.0.1 instead of stdin")
+    parser.add_argument("--metrics-port", type=int, help="Serves the latency histograms in Prometheus' text format on this port of 127.0.0.1")
+    parser.add_argument("--ticks", help="Records market data and order events to this file")
+    args = parser.parse_args(argv)
+    
+    log = event_log.install('bot-'+str(time.time())+'.jsonl')
+    if args.metrics_port:
+        serve_metrics(args.metrics_port)
+    listener = console_listener()
+    engine = pump_engine(listener, args.ticks)
+    try:
+        connecting = engine.connect(os.environ.get("BINANCE_API_KEY", ""), os.environ.get("BINANCE_API_SECRET", ""))
+        if connecting is None or not connecting.get():
+            return 1
+        cli = pump_cli(engine, listener, args.btc, args.target/100, args.stop_loss/100, not args.limit, not args.no_bnb, args.protect,
+                       args.trailing/100 if args.trailing is not None else None)
+        if args.socket:
+            if os.path.exists(args.socket):
+                os.remove(args.socket)
+            serve(cli, threading_unix_server, args.socket)
+        elif args.port:
+            serve(cli, threading_tcp_server, ("127.0.0.1", args.port))
+        elif cli.read_commands(iter(sys.stdin.readline, '')):
+            # Stdin ran out without a quit, the pumps still have to be followed to their exits.
+            cli.wait_for_pumps()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.close()
+        # Writes the records that are still queued.
+        log.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
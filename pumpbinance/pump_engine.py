@@ -0,0 +1,216 @@
+from decimal import Decimal
+import logging
+import requests
+from binance_api import binance_api, BinanceAPIException, BinanceRequestException
+from async_binance_api import async_binance_api
+from session_manager import session_manager, pump_session
+from helper_methods import readable_btc_balance
+from pumper import pumper
+from tick_recorder import tick_recorder
+from latency_stats import stats
+
+minimum_trade = Decimal("0.002")
+
+class pump_engine(object):
+    '''
+    Connects to Binance and runs pumps, without depending on a user interface so it can be
+    driven by pump_ui or by pump_cli.
+    
+    The listener is told what happens through write_to_console(line), set_current_profit(profit),
+    set_btc_balance(btc_balance) and on_session_finished(session).
+    
+    connect, pump and manual_sell only check their input on the caller's thread, their requests
+    are sent from async_binance_api's pool so a user interface never waits on the network.
+    '''
+    
+    def __init__(self, listener, tick_filename=None):
+        '''
+        :param tick_filename: optional, every pump's market data and order events are recorded to it.
+        '''
+        self.listener = listener
+        self.tick_filename = tick_filename
+        self.api = None
+        self.async_api = None
+        self.sessions = None # session_manager, created once the API is connected
+        self.recorder = None
+        self.btc_balance = Decimal(0)
+    
+    def write_to_console(self, line):
+        self.listener.write_to_console(line)
+    
+    def set_current_profit(self, current_profit):
+        self.listener.set_current_profit(current_profit)
+    
+    @property
+    def is_pumping(self):
+        return self.sessions is not None and bool(self.sessions.sessions)
+    
+    def connect(self, api_key, api_secret, callback=None):
+        '''
+        :param callback: optional, called from a pool thread with whether the BTC balance could be fetched with the API key.
+        :returns: An AsyncResult whose get() waits for the same, None if the API info is missing.
+        '''
+        if not api_key or not api_secret:
+            self.write_to_console("Missing API info.")
+            return None
+        
+        self.close()
+        self.api = binance_api(api_key, api_secret)
+        self.async_api = async_binance_api(self.api)
+        if self.recorder is None and self.tick_filename is not None:
+            self.recorder = tick_recorder(self.tick_filename)
+        return self.async_api.submit(self._open_sessions, callback=callback)
+    
+    def _open_sessions(self):
+        try:
+            self.api.filters.load()
+            self.sessions = session_manager(self.api, self.async_api, on_balances=self.on_balances, recorder=self.recorder)
+            btc_balance = self.api.get_btc_balance()
+        except BinanceAPIException, e:
+            logging.debug(str(e))
+            self.write_to_console("Invalid API key or IP.")
+            return False
+        except (BinanceRequestException, requests.exceptions.RequestException), e:
+            logging.debug(str(e))
+            self.write_to_console("Could not reach Binance.")
+            return False
+        
+        self.set_btc_balance(btc_balance)
+        self.write_to_console("Fetched BTC balance from Binance.")
+        if self.api.clock.round_trip_ms is not None:
+            # Half of the round trip of the sample the clock estimate comes from, see clock_sync.
+            self.write_to_console("Latency to Binance is "+str(int(round(self.api.clock.round_trip_ms/2.0)))+"ms.")
+        return True
+    
+    def close(self):
+        if self.sessions is not None:
+            self.sessions.close()
+            self.sessions = None
+        if self.async_api is not None:
+            self.async_api.close()
+            self.async_api = None
+        if self.api is not None:
+            self.api.close()
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+    
+    def pump(self, ticker, btc_to_use, target_profit_percentage, stop_loss, is_entry_market, use_bnb, protect=False, trailing_stop=None,
+             callback=None):
+        '''
+        Pre: btc_to_use, target_profit_percentage and stop_loss are Decimals, the percentages are fractions.
+        :param protect: If the target and the stop loss are also placed on Binance as an OCO sell once the entry fills.
+        :param trailing_stop: optional Decimal fraction, once the target is reached the pump sells when the bid falls this much from its peak.
+        :param callback: optional, called from a pool thread with the pump_session once it started, or None if it did not.
+        :returns: An AsyncResult whose get() waits for the same, None if the input was not valid.
+        '''
+        if self.sessions is None:
+            self.write_to_console("You need to connect to Binance before pumping.")
+            return None
+        
+        if btc_to_use < minimum_trade:
+            # BTC is smaller than the minimum trade. Output an error.
+            self.write_to_console("Stop!")
+            self.write_to_console("The minimum trade is "+readable_btc_balance(minimum_trade)+".")
+            return None
+        if btc_to_use > self.btc_balance:
+            # The user is trying to trade with more than they actually have.
+            self.write_to_console("Stop!")
+            self.write_to_console("You are trying to spend more BTC than you have.")
+            return None
+        
+        # Validate auto-sell and stop loss
+        if target_profit_percentage <= Decimal(0):
+            self.write_to_console("Auto sell has to be positive.")
+            return None
+        if stop_loss >= Decimal(0):
+            self.write_to_console("Stop loss has to be negative.")
+            return None
+        if trailing_stop is not None and not Decimal(0) < trailing_stop < Decimal(1):
+            self.write_to_console("Trailing stop has to be between 0 and 100%.")
+            return None
+        if trailing_stop is not None and protect:
+            # The take profit on Binance would sell at the target.
+            self.write_to_console("Protective orders cannot be used with a trailing stop.")
+            return None
+        
+        # Empty strings are False in Python
+        ticker = ticker.upper()
+        if not ticker:
+            self.write_to_console("You did not enter a ticker.")
+            return None
+        
+        return self.async_api.submit(self._start_pump, (ticker, btc_to_use, target_profit_percentage, stop_loss, is_entry_market, use_bnb,
+                                                        protect, trailing_stop), callback=callback)
+    
+    def _start_pump(self, ticker, btc_to_use, target_profit_percentage, stop_loss, is_entry_market, use_bnb, protect, trailing_stop):
+        try:
+            alt = self.api.get_ticker(symbol=self.api.full_ticker_for(ticker))
+        except BinanceAPIException, e:
+            logging.debug(str(e))
+            self.write_to_console("Invalid ticker.")
+            return None
+        
+        if use_bnb and self.api.balances.get("BNB") <= Decimal(0):
+            self.write_to_console("You have no BNB, fees will be paid from the trade.")
+            use_bnb = False
+        
+        session = pump_session(self.sessions, pumper(), is_entry_market, use_bnb, self, protect)
+        if not session.enter(ticker, alt, btc_to_use, target_profit_percentage, stop_loss, trailing_stop):
+            return None
+        self.flush_recording()
+        if not self.sessions.user_stream.connected:
+            # Otherwise the stream reports the new balance.
+            self.set_btc_balance(self.btc_balance - btc_to_use)
+        return session
+    
+    def manual_sell(self, ticker=""):
+        '''
+        Sells the pump of the ticker, or every pump if it is empty.
+        
+        :returns: An AsyncResult per pump being sold, whose get() waits for the sell.
+        '''
+        if self.sessions is None:
+            return []
+        ticker = ticker.upper()
+        if ticker:
+            sessions = self.sessions.sessions_for(self.api.full_ticker_for(ticker))
+            if not sessions:
+                self.write_to_console("You are not pumping "+ticker+".")
+        else:
+            sessions = list(self.sessions.sessions)
+        return [self.async_api.submit(session.manual_sell) for session in sessions]
+    
+    def show_latency(self):
+        '''
+        Writes the latency percentiles of every stage of the tick-to-trade path to the console.
+        '''
+        lines = stats.summary_lines()
+        if not lines:
+            self.write_to_console("No latency has been recorded yet.")
+        for line in lines:
+            self.write_to_console(line)
+    
+    def on_session_finished(self, session):
+        # The user data stream keeps the BTC balance in sync, it only has to be fetched when the stream is down.
+        if not self.sessions.user_stream.connected:
+            self.sync_btc_balance()
+        self.flush_recording()
+        self.listener.on_session_finished(session)
+    
+    def flush_recording(self):
+        ''' Makes the recording hold every pump up to here, even if the bot is killed. '''
+        if self.recorder is not None:
+            self.recorder.flush()
+    
+    def on_balances(self, balances):
+        if "BTC" in balances:
+            self.set_btc_balance(balances["BTC"])
+    
+    def set_btc_balance(self, btc_balance):
+        self.btc_balance = btc_balance
+        self.listener.set_btc_balance(btc_balance)
+    
+    def sync_btc_balance(self):
+        # Fetched in the background, the balance is not needed until the next pump.
+        self.async_api.get_btc_balance(callback=self.set_btc_balance, refresh=True)
@@ -1,27 +1,32 @@
-from Tkinter import Tk, DISABLED, NORMAL, Button, Spinbox, Label, StringVar, W, N, E, Entry, OptionMenu, END
+from Tkinter import Tk, DISABLED, NORMAL, Button, Spinbox, Label, StringVar, IntVar, Checkbutton, W, N, E, Entry, OptionMenu, END
 import ttk
 from tkFont import Font
-from binance_api import binance_api
-from helper_methods import btc_to_alt, readable_alt_balance, readable_btc_balance
+from pump_engine import pump_engine, minimum_trade
+from helper_methods import readable_btc_balance
+from ui_events import ui_event_queue, frames_per_second
+from console_log import console_log
+from latency_stats import serve_metrics
 from decimal import Decimal, InvalidOperation
-from pumper import pumper, SELL_PROFIT, SELL_STOP_LOSS
-from math import floor
-from binance_api import BinanceAPIException, minimum_decimals_in_quantity
-from threading import Thread
-import logging
+import event_log
 import time
 
-# Object to log the bot's behaviour into a text file.
-LOG_FILENAME = 'bot-'+str(time.time())+'.log'
-logging.basicConfig(filename=LOG_FILENAME, level=logging.DEBUG)
+# The bot's behaviour is logged as JSON lines, see event_log.py.
+LOG_FILENAME = 'bot-'+str(time.time())+'.jsonl'
+# Market data and order events of every pump, replayable with tick_replay.py.
+TICKS_FILENAME = 'ticks-'+str(time.time())+'.bin.gz'
+record_ticks = True
+# Every line written to the console, which only shows the last max_lines_in_console.
+CONSOLE_FILENAME = 'console-'+str(time.time())+'.log'
+# The latency of each stage of a trade can be scraped by Prometheus from http://127.0.0.1:METRICS_PORT/metrics.
+METRICS_PORT = 9108
         
 #### User Interface ####
 frame_title = "Binance P&D"
 label_font_colour = "#ffffff"
 background_colour = "#00471e"
 default_relief = "raised"
-minimum_trade = Decimal("0.002")
 btc_to_use_increment = Decimal("0.001")
+frame_interval = 1000 // frames_per_second # Measured in milliseconds
 max_lines_in_console = 22 # There is a pattern that the lines should equal the height of the console.
 
 class pump_ui(object):
@@ -35,19 +40,22 @@ class pump_ui(object):
         master.winfo_toplevel().title(frame_title)
         master.iconbitmap("bitcoin.ico")
         
-        # Create pumper assistant to store data on the current BTC and alt holdings.
-        self.pumper = pumper()
+        self.master = master
+        self.events = ui_event_queue()
+        self.engine = pump_engine(self, TICKS_FILENAME if record_ticks else None)
         
         self.create_title(master)
         self.create_api_info(master,previous_row=0)
         self.create_auto_sell(master, previous_row=3)
         self.create_stop_loss(master, previous_row=4)
-        self.create_order_type(master, previous_row=6)
-        self.create_fee_type(master, previous_row=7)
-        self.create_btc_balance_picker(master, previous_row=8)
-        self.create_alt_ticker(master, previous_row=10)
-        self.create_pump_and_sell_buttons(master, previous_row=11)
-        self.create_current_profit(master, previous_row=12)
+        self.create_trailing_stop(master, previous_row=5)
+        self.create_protective_orders(master, previous_row=6)
+        self.create_order_type(master, previous_row=7)
+        self.create_fee_type(master, previous_row=8)
+        self.create_btc_balance_picker(master, previous_row=9)
+        self.create_alt_ticker(master, previous_row=11)
+        self.create_pump_and_sell_buttons(master, previous_row=12)
+        self.create_current_profit(master, previous_row=13)
         
         self.create_output_box(master, rightmost_column=1)
         
@@ -61,6 +69,7 @@ class pump_ui(object):
         
         # Display the UI, this can only be called once per program.
         # Nothing in the main Python script will be run after creating the UI because of this.
+        master.after(frame_interval, self.drain_events)
         master.mainloop()
         
     def create_title(self, master, previous_row=-1, previous_column=-1):
@@ -111,6 +120,29 @@ class pump_ui(object):
         self.stop_loss_spinbox.delete(0, "end")
         self.stop_loss_spinbox.insert(0, -10)
         
+    def create_trailing_stop(self, master, previous_row=-1, previous_column=-1):
+        # 0 sells at the auto sell target, otherwise the bot holds until the bid falls this much from its peak.
+        trailing_stop_lbl = Label(master, text="Trailing (%):")
+        trailing_stop_lbl.grid(row=previous_row+1, column=previous_column+1, columnspan=1, sticky=E, padx=(3,0))
+        trailing_stop_lbl.config(bg=background_colour, fg=label_font_colour)
+        
+        self.trailing_stop_spinbox = Spinbox(master, from_=0.0, to=50.0, increment=1.0, highlightbackground=background_colour)
+        self.trailing_stop_spinbox.config(borderwidth=2, relief=default_relief)
+        self.trailing_stop_spinbox.grid(row=previous_row+1, column=previous_column+2)
+        self.trailing_stop_spinbox.delete(0, "end")
+        self.trailing_stop_spinbox.insert(0, 0)
+        
+    def create_protective_orders(self, master, previous_row=-1, previous_column=-1):
+        # Keeps the target and the stop loss on Binance as an OCO sell, so the position is exited even if the bot stops.
+        protective_orders_lbl = Label(master, text="Keep OCO On Binance:")
+        protective_orders_lbl.grid(row=previous_row+1, column=previous_column+1, columnspan=1, sticky=E, padx=(3,0))
+        protective_orders_lbl.config(bg=background_colour, fg=label_font_colour)
+        
+        self.use_protective_orders = IntVar()
+        self.protective_orders_checkbutton = Checkbutton(master, variable=self.use_protective_orders, highlightthickness=0)
+        self.protective_orders_checkbutton.config(bg=background_colour, activebackground=background_colour)
+        self.protective_orders_checkbutton.grid(row=previous_row+1, column=previous_column+2, sticky=W, padx=8)
+        
     def create_btc_balance_picker(self, master, previous_row=-1, previous_column=-1):
         self.btc_balance_str = StringVar()
         btc_balance_lbl = Label(master, textvar=self.btc_balance_str)
@@ -191,264 +223,130 @@ class pump_ui(object):
     def create_output_box(self, master, rightmost_column):
         self.pump_output = StringVar()
         console_lbl = Label(master, textvar=self.pump_output, borderwidth=2, relief=default_relief, anchor=N)
-        console_lbl.grid(row=0, column=rightmost_column+1, columnspan=1, rowspan=14, padx=(10,0), pady=0)
+        console_lbl.grid(row=0, column=rightmost_column+1, columnspan=1, rowspan=15, padx=(10,0), pady=0)
         console_lbl.config(width=50, height=22, bg="black", font=Font(family="Courier", size=9), fg="white")
-        self.lines = 0
+        self.console = console_log(max_lines_in_console, CONSOLE_FILENAME)
+        # Lines written while the window was hidden are shown once it is visible again.
+        master.bind("<Map>", self.show_console)
+        # F2 writes where the time between receiving the book and sending an order went.
+        master.bind("<F2>", self.on_show_latency)
         
     def disable_pre_pump_options(self):
-        # Change the buttons that can be clicked to prevent the user
-        # from trying to pump multiple coins with one bot.
+        # Other coins can be pumped at the same time, but the API
+        # cannot be changed while pumps are using it.
         self.manual_sell_btn.config(state=NORMAL)
-        self.pump_btn.config(state=DISABLED)
-        self.btc_to_use_spinbox.config(state=DISABLED)
-        self.ticker_entry.config(state=DISABLED)
-        self.auto_sell_spinbox.config(state=DISABLED)
-        self.stop_loss_spinbox.config(state=DISABLED)
         self.api_key_entry.config(state=DISABLED) # Comment out if hardcoding key
         self.api_secret_entry.config(state=DISABLED) # Comment out if hardcoding secret
         self.api_connect_btn.config(state=DISABLED)
-        self.entry_type_option_menu.config(state=DISABLED)
-        self.fee_type_option_menu.config(state=DISABLED)
         
     def enable_pump_options(self):
-        # Change the buttons that can be clicked to prevent the user
-        # from trying to pump multiple coins with one bot.
+        # Called once every pump has finished.
         self.manual_sell_btn.config(state=DISABLED)
-        self.pump_btn.config(state=NORMAL)
-        self.btc_to_use_spinbox.config(state=NORMAL)
-        self.ticker_entry.config(state=NORMAL)
-        self.auto_sell_spinbox.config(state=NORMAL)
-        self.stop_loss_spinbox.config(state=NORMAL)
         self.api_key_entry.config(state=NORMAL) # Comment out if hardcoding key
         self.api_secret_entry.config(state=NORMAL) # Comment out if hardcoding secret
         self.api_connect_btn.config(state=NORMAL)
-        self.entry_type_option_menu.config(state=NORMAL)
-        self.fee_type_option_menu.config(state=NORMAL)
         
     def set_available_btc_balance(self, btc_balance):
-        self.pumper.btc_balance = btc_balance
         self.btc_balance_str.set("Available Balance: " + readable_btc_balance(btc_balance))
         
+    #### Listener ####
+    # Called by the engine from any thread, the widgets are only updated from the main loop.
+    def write_to_console(self, line):
+        # Rendered by drain_events.
+        self.console.append(line)
+        
     def set_current_profit(self, current_profit):
+        # Many updates per frame are drawn once.
+        self.events.replace(self.show_current_profit, current_profit)
+        
+    def set_btc_balance(self, btc_balance):
+        self.events.replace(self.show_btc_balance, btc_balance)
+        
+    def on_session_finished(self, session):
+        self.events.push(self.show_session_finished)
+        
+    def drain_events(self):
+        self.events.drain()
+        if self.console.changed and self.master.winfo_viewable():
+            self.show_console()
+        self.console.flush()
+        self.master.after(frame_interval, self.drain_events)
+        
+    #### Widget Updates ####
+    def show_current_profit(self, current_profit):
         self.current_profit_str.set("Current Profit: "+'{0:.3f}'.format(round(current_profit*Decimal(100), 3))+"%")
         
-    def write_to_console(self, line):
-        self.lines += 1
-        if self.lines > max_lines_in_console:
-            i = self.pump_output.get().index('\n')
-            self.pump_output.set(self.pump_output.get()[i+1:]+"\n"+line)
-        elif self.lines == 1:
-            self.pump_output.set(line)
+    def show_console(self, event=None):
+        self.pump_output.set(self.console.render())
+        
+    def show_btc_balance(self, btc_balance):
+        if btc_balance < minimum_trade:
+            self.btc_to_use_spinbox.config(to=minimum_trade)
         else:
-            self.pump_output.set(self.pump_output.get()+"\n"+line)
+            self.btc_to_use_spinbox.config(to=btc_balance)
+        self.set_available_btc_balance(btc_balance)
         
     #### Button Behaviour ####
     def on_pump(self):
         try:
-            api = self.api
             btc_to_use = Decimal(self.btc_to_use_spinbox.get())
         except InvalidOperation:
             # The BTC to spend box is empty.
             self.write_to_console("Stop!")
             self.write_to_console("BTC to spend cannot be empty.")
             return
-        except AttributeError:
-            # There is no API object.
-            self.write_to_console("You need to connect to Binance before pumping.")
-            return
-            
-        if btc_to_use >= minimum_trade:
-            if btc_to_use <= self.pumper.btc_balance:
-                target_profit_percentage = Decimal(float(self.auto_sell_spinbox.get())/100.0)
-                
-                # Validate auto-sell and stop loss
-                if target_profit_percentage <= Decimal(0):
-                    self.write_to_console("Auto sell has to be positive.")
-                    return
-                if Decimal(self.stop_loss_spinbox.get()) >= Decimal(0):
-                    self.write_to_console("Stop loss has to be negative.")
-                    return
-                
-                ticker = self.ticker_entry.get().upper()
-                
-                # Empty strings are False in Python
-                if ticker:
-                    full_ticker = api.full_ticker_for(ticker)
-                    
-                    try:
-                        alt = self.api.get_ticker(symbol=full_ticker)
-                    except BinanceAPIException, e:
-                        logging.debug(str(e))
-                        self.write_to_console("Invalid ticker.")
-                        return
-                    
-                    alt_value = Decimal(alt["askPrice"])
-                    
-                    # Used in console output
-                    decimal_points = minimum_decimals_in_quantity.get(full_ticker, 0)
-                    self.pumper.decimal_points_in_alt = decimal_points
-                    
-                    self.pumper.set_up(btc_to_use, target_profit_percentage, alt_value, ticker)
-                    if self.is_entry_market:
-                        self.pumper.alt_holdings = api.market_buy(self.pumper.btc_to_use, full_ticker, self.is_using_bnb)
-                        self.write_to_console("Bought "+readable_alt_balance(decimal_points, pumper=self.pumper)+" with "+readable_btc_balance(btc_to_use)+".")
-                    else:
-                        highest_bid = Decimal(alt["bidPrice"])
-                        
-                        if alt_value - highest_bid <= Decimal(0.00000001):
-                            to_bid = highest_bid
-                        else:
-                            # Bid between the highest bid and the lowest ask for the best odds of being filled.
-                            to_bid = (alt_value - highest_bid)/2 + highest_bid
-                            to_bid = Decimal(floor(to_bid * Decimal(100000000.0))) / Decimal(100000000.0)
-                        self.pumper.starting_alt_value = to_bid
-                        
-                        expected = api.limit_buy(btc_to_alt(btc_to_use, alt_value), pumper, full_ticker, to_bid, self.is_using_bnb)
-                        self.write_to_console("Buying "+readable_alt_balance(decimal_points, alt_amount=expected, ticker=ticker)+" for "+readable_btc_balance(btc_to_use)+".")
-                        self.write_to_console("This is a limit order, it may not get filled.")
-                        
-                    self.disable_pre_pump_options()
-                    self.set_stop_loss()
-                    self.start_monitoring_orderbook(full_ticker)
-                else:
-                    # The user is trying to trade with more than they actually have.
-                    self.write_to_console("You did not enter a ticker.")
-            else:
-                # The user is trying to trade with more than they actually have.
-                self.write_to_console("Stop!")
-                self.write_to_console("You are trying to spend more BTC than you have.")
-        else:
-            # BTC is smaller than the minimum trade. Output an error.
+        
+        try:
+            target_profit_percentage = Decimal(self.auto_sell_spinbox.get())/100
+            stop_loss = self.get_stop_loss()
+            trailing_stop = self.get_trailing_stop()
+        except InvalidOperation:
+            # A box was emptied or typed over.
             self.write_to_console("Stop!")
-            self.write_to_console("The minimum trade is "+readable_btc_balance(minimum_trade)+".")
-            
-    def set_stop_loss(self):
-        ''' Should be called before monitoring the ROI. '''
-        self.pumper.stop_loss = Decimal(float(self.stop_loss_spinbox.get())/100.0)
-            
-    def start_monitoring_orderbook(self, full_ticker):
-        def start():
-            while self._monitor_orderbook:
-                self.on_book(self.api.get_order_book(symbol=full_ticker))
-        self._monitor_orderbook = True
-        monitoring_thread = Thread(target=start)
-        monitoring_thread.start()
-        
-    def stop_monitoring_orderbook(self):
-        self._monitor_orderbook = False
-            
-    def on_book(self, book):
-        '''
-        A pump has started and the bot is listening to the exchange's asks to decide what to do.
-        '''
-
-        action = self.pumper.update_bids(book["bids"])
-
-        if action == SELL_PROFIT:
-            if not self.is_entry_market:
-                # Cancel any open buy orders and sync the amount of alt that we have.
-                btc_spent = self.cancel_pumper_limit_order_and_sync()
-                self.write_to_console("Limit order was filled for "+readable_alt_balance(self.pumper.decimal_points_in_alt, pumper=self.pumper)+", spent "+readable_btc_balance(btc_spent)+".")
-                
-            # Wait until the order book can handle our sell order
-            if self.pumper.can_sell():
-                btc_received = self.api.market_sell(self.pumper, self.is_using_bnb)
-                
-                # Allow the user to start a new pump.
-                self.stop_monitoring_orderbook()
-                self.enable_pump_options()
-                
-                # Tell the user how much they made and sync their balance.
-                self.write_to_console("Sold "+readable_alt_balance(self.pumper.decimal_points_in_alt, pumper=self.pumper)+" for "+readable_btc_balance(btc_received)+".")
-                self.write_to_console("Profited "+readable_btc_balance(btc_received-self.pumper.btc_to_use)+".")
-                self.on_connect_api()
-                
-        elif action == SELL_STOP_LOSS:
-            if not self.is_entry_market:
-                self.cancel_pumper_limit_order_and_sync()
-            
-            self.write_to_console("Stop loss reached.")
-            
-            if self.pumper.alt_holdings > Decimal(0):
-                new_btc_balance = self.api.market_sell(self.pumper, self.is_using_bnb)
-                self.write_to_console("Selling at market. Lost "+readable_btc_balance(self.pumper.btc_balance-new_btc_balance)+".")
-                self.set_available_btc_balance(new_btc_balance)
-            else:
-                self.write_to_console("Limit order was not filled. No "+self.pumper.alt_ticker+" to sell.")
-            
-            self.write_to_console("Aborting pump bot.")
+            self.write_to_console("Auto sell, stop loss and trailing have to be numbers.")
+            return
+        
+        # The entry is sent in the background, the options are disabled once it started.
+        self.engine.pump(self.ticker_entry.get(), btc_to_use, target_profit_percentage, stop_loss, self.is_entry_market, self.is_using_bnb,
+                         self.use_protective_orders.get() == 1, trailing_stop, callback=lambda session: self.events.push(self.show_pump_started, session))
             
-            # Allow the user to start a new pump.
-            self.stop_monitoring_orderbook()
-            self.enable_pump_options()
+    def get_stop_loss(self):
+        return Decimal(self.stop_loss_spinbox.get())/100
         
-        # Update the UI with the current profit percentage.
-        self.set_current_profit(self.pumper.current_profit_percentage)
+    def get_trailing_stop(self):
+        trailing_stop = Decimal(self.trailing_stop_spinbox.get())/100
+        return trailing_stop if trailing_stop > 0 else None
             
     def on_pump_shortcut(self, event):
         if self.pump_btn['state'] == NORMAL:
             self.on_pump()
         
     def on_manual_sell(self):
-        if not self.is_entry_market:
-            self.cancel_pumper_limit_order_and_sync()
-            
-        # A limit order may have been placed but not filled
-        if self.pumper.alt_holdings > Decimal(0):
-            btc_received = self.api.market_sell(self.pumper, self.is_using_bnb)
-            self.write_to_console("Manually sold "+readable_alt_balance(self.pumper.decimal_points_in_alt, pumper=self.pumper)+" for "+readable_btc_balance(btc_received)+".")
-            net = btc_received-self.pumper.btc_to_use
-
-            # Sync the BTC balance
-            self.on_connect_api()
-            if net > 0:
-                self.write_to_console("Profited "+readable_btc_balance(net)+".")
-            else:
-                self.write_to_console("Lost "+readable_btc_balance(net)+".")
-        else:
-            self.write_to_console("You have no "+self.pumper.alt_ticker+" to sell.")
-            self.write_to_console("Try a market order next time.")
-            
-        # Allow the user to start a new pump.
-        self.stop_monitoring_orderbook()
-        self.enable_pump_options()
+        # Sells the pump of the ticker in the ticker box, or every pump if it is empty.
+        self.engine.manual_sell(self.ticker_entry.get())
+        
+    def show_pump_started(self, session):
+        if session is not None:
+            self.disable_pre_pump_options()
+        
+    def show_session_finished(self):
+        if not self.engine.is_pumping:
+            # Allow the user to change the API info again.
+            self.enable_pump_options()
+        
+    def on_show_latency(self, event=None):
+        self.engine.show_latency()
         
     def on_connect_api(self):
-        key = self.api_key_entry.get()
-        secret = self.api_secret_entry.get()
-        
-        if key and secret:
-            self.api = binance_api(key, secret)
-            btc_balance = self.api.get_btc_balance()
-            if btc_balance == None:
-                self.write_to_console("Invalid API key or IP.")
-            else:
-                if btc_balance < minimum_trade:
-                    self.btc_to_use_spinbox.config(to=minimum_trade)
-                else:
-                    self.btc_to_use_spinbox.config(to=btc_balance)
-                self.set_available_btc_balance(btc_balance)
-
-                self.pump_btn.config(state=NORMAL)
-                self.write_to_console("Fetched BTC balance from Binance.")
-                # Divide latency by two because Binance's API does not divide latency by 2.
-                # See the API's get_average_latency method for details.
-                self.write_to_console("Latency to Binance is "+str(int(round(self.api.latency_between_server_and_client/2.0)))+"ms.")
-        else:
-            self.write_to_console("Missing API info.")
+        self.engine.connect(self.api_key_entry.get(), self.api_secret_entry.get(),
+                            callback=lambda connected: self.events.push(self.show_connected, connected))
+        
+    def show_connected(self, connected):
+        if connected:
+            self.pump_btn.config(state=NORMAL)
             
-    def cancel_pumper_limit_order_and_sync(self):
-        '''
-        :returns: BTC spent
-        '''
-        full_ticker = self.api.full_ticker_for(self.pumper.alt_ticker)
-        order_info = self.api.get_order(origClientOrderId=self.pumper.limit_order_id, symbol=full_ticker)
-        if order_info["status"] == "NEW" or order_info["status"] == "PARTIALLY_FILLED":
-            self.api.cancel_order(origClientOrderId=self.pumper.limit_order_id, symbol=full_ticker)
-        alt_bought = Decimal(order_info["executedQty"])
-        self.pumper.alt_holdings = alt_bought
-        return alt_bought * Decimal(order_info["price"])
-    
 if __name__ == "__main__":
+    event_log.install(LOG_FILENAME)
+    serve_metrics(METRICS_PORT)
     ui = pump_ui()
     
\ No newline at end of file
@@ -1,23 +1,39 @@
-from decimal import Decimal
+from bisect import bisect_left, insort
+from decimal import Decimal, ROUND_CEILING
+import fixed_point
 
 # Constants used when deciding what to do given the ROI.
 SELL_PROFIT = True
 SELL_STOP_LOSS = False
+SELL_TRAILING = 2 # The bid fell trailing_stop from its peak, compares unequal to the other two
 
 class pumper(object):
     
     btc_balance = Decimal(0)
     btc_to_use = Decimal(0)
     starting_alt_value = Decimal(0)
-    target_profit_percentage = Decimal(0.5)
-    current_profit_percentage = Decimal(0)
+    target_profit_percentage = Decimal("0.5")
     alt_ticker = ""
     limit_order_id = ""
-    stop_loss = Decimal(-0.25)
     decimal_points_in_alt = 0
     bid_threshold = Decimal(0)
-    alt_holdings = Decimal(0) # Need to be set whenever a buy or sell order is made
-    usable_sell_quantity = Decimal(0)
+    
+    def __init__(self):
+        # The hot path works on fixed-point integers, see fixed_point.py.
+        # The Decimal properties below are only computed when they are read.
+        self._highest_bid = None
+        self._bid_threshold = 0
+        self._stop_loss = Decimal("-0.25")
+        self._stop_loss_bid = 0
+        self._trailing_stop = 0 # Fixed-point fraction, 0 sells at the target instead
+        self._peak_bid = 0 # Highest bid since set_up
+        self._trailing_exit_bid = 0 # 0 until the peak reaches the target
+        self._alt_holdings = 0 # Need to be set whenever a buy or sell order is made
+        self._usable_sell_quantity = 0
+        
+        # Bid levels tracked by update_bid_levels.
+        self._bid_levels = {} # Fixed-point price -> fixed-point quantity
+        self._bid_prices = [] # Ascending, the highest bid is the last element
     
     def set_up(self, btc_to_use, target_profit_percentage, starting_alt_value, alt_ticker):
         assert isinstance(btc_to_use, Decimal)
@@ -25,26 +41,129 @@ class pumper(object):
         assert isinstance(starting_alt_value, Decimal)
         self.btc_to_use = btc_to_use
         self.target_profit_percentage = target_profit_percentage
-        self.current_profit_percentage = Decimal(0)
+        self._highest_bid = None
         self.starting_alt_value = starting_alt_value
         self.alt_ticker = alt_ticker
         
         # Rearranged version of profit_percentage = (highest_bid - starting_alt_value) / starting_alt_value
         self.bid_threshold = self.target_profit_percentage * self.starting_alt_value + self.starting_alt_value
-        self.bid_threshold.quantize(Decimal('1E-8'))
+        # Bids are whole satoshis, so rounding the threshold up keeps the comparison exact.
+        self._bid_threshold = fixed_point.from_decimal(self.bid_threshold, ROUND_CEILING)
+        self.stop_loss = self._stop_loss
+        self._peak_bid = 0
+        self._trailing_exit_bid = 0
         
+        # The usable quantity depends on the threshold, so the tracked levels have to be seeded again.
+        self._bid_levels = {}
+        self._bid_prices = []
+        self._usable_sell_quantity = 0
+    
+    @property
+    def stop_loss(self):
+        return self._stop_loss
+    
+    @stop_loss.setter
+    def stop_loss(self, stop_loss):
+        '''
+        Pre: stop_loss is a negative Decimal
+        '''
+        self._stop_loss = stop_loss
+        self._stop_loss_bid = fixed_point.from_decimal(stop_loss * self.starting_alt_value + self.starting_alt_value)
+    
+    @property
+    def trailing_stop(self):
+        '''
+        The fraction the bid can fall from its peak before selling, None when selling at the target.
+        '''
+        if not self._trailing_stop:
+            return None
+        return fixed_point.to_decimal(self._trailing_stop)
+    
+    @trailing_stop.setter
+    def trailing_stop(self, trailing_stop):
+        '''
+        Once the bid reaches the target the pumper keeps holding, and sells when it falls trailing_stop from the highest bid since.
+        
+        Pre: trailing_stop is a Decimal between 0 and 1, or None to sell at the target
+        '''
+        self._trailing_stop = fixed_point.from_decimal(trailing_stop) if trailing_stop else 0
+        self._trailing_exit_bid = 0
+        if self._trailing_stop and self._peak_bid >= self._bid_threshold:
+            self._trailing_exit_bid = self._peak_bid - fixed_point.multiply(self._peak_bid, self._trailing_stop)
+    
+    @property
+    def peak_bid(self):
+        return fixed_point.to_decimal(self._peak_bid)
+    
+    @property
+    def alt_holdings(self):
+        return fixed_point.to_decimal(self._alt_holdings)
+    
+    @alt_holdings.setter
+    def alt_holdings(self, alt_holdings):
+        '''
+        Pre: alt_holdings is a Decimal
+        '''
+        self._alt_holdings = fixed_point.from_decimal(alt_holdings)
+    
+    @property
+    def fixed_alt_holdings(self):
+        # Read on every tick by the order book, which works in fixed-point.
+        return self._alt_holdings
+    
+    @property
+    def usable_sell_quantity(self):
+        return fixed_point.to_decimal(self._usable_sell_quantity)
+    
+    @property
+    def fixed_usable_sell_quantity(self):
+        return self._usable_sell_quantity
+    
+    @property
+    def fixed_bid_threshold(self):
+        return self._bid_threshold
+    
+    @property
+    def fixed_stop_loss_bid(self):
+        return self._stop_loss_bid
+    
+    @property
+    def current_profit_percentage(self):
+        if self._highest_bid is None:
+            return Decimal(0)
+        return fixed_point.to_decimal(self._highest_bid) / self.starting_alt_value - Decimal(1)
+    
     def update_current_profit_percentage(self, highest_bid):
         '''
         Pre: highest_bid is a Decimal
         '''
-
-        self.current_profit_percentage = highest_bid / self.starting_alt_value - Decimal(1)
-
-        if self.current_profit_percentage >= self.target_profit_percentage:
+        return self._update_highest_bid(fixed_point.from_decimal(highest_bid))
+    
+    def _update_highest_bid(self, highest_bid):
+        '''
+        Pre: highest_bid is a fixed-point integer
+        '''
+        self._highest_bid = highest_bid
+        if self._trailing_stop:
+            return self._update_trailing(highest_bid)
+        
+        if highest_bid >= self._bid_threshold:
             return SELL_PROFIT
-        elif self.current_profit_percentage <= self.stop_loss:
+        elif highest_bid <= self._stop_loss_bid:
             return SELL_STOP_LOSS
+    
+    def _update_trailing(self, highest_bid):
+        # Only the peak is kept, so every tick is a few comparisons whatever the length of the pump.
+        if highest_bid > self._peak_bid:
+            self._peak_bid = highest_bid
+            if highest_bid >= self._bid_threshold:
+                self._trailing_exit_bid = highest_bid - fixed_point.multiply(highest_bid, self._trailing_stop)
         
+        if self._trailing_exit_bid and highest_bid <= self._trailing_exit_bid:
+            return SELL_TRAILING
+        elif highest_bid <= self._stop_loss_bid:
+            return SELL_STOP_LOSS
+    
     def is_bid_usable(self, bid):
         '''
         :param bid: required
@@ -54,19 +173,54 @@ class pumper(object):
         return bid >= self.bid_threshold
     
     def update_bids(self, bids):
-        # Everything is calculated every time. It would be more efficient to use the web socket.
-        highest_bid = Decimal(0)
-        self.usable_sell_quantity = Decimal(0)
+        # Everything is calculated every time, use update_bid_levels when the changes to the book are known.
+        highest_bid = 0
+        bid_threshold = self._bid_threshold
+        usable_sell_quantity = 0
         for bid in bids:
-            price = Decimal(bid[0])
-            quantity = Decimal(bid[1])
+            price = fixed_point.parse(bid[0])
             if highest_bid < price:
                 highest_bid = price
-            if self.is_bid_usable(price):
-                self.usable_sell_quantity += quantity
+            if price >= bid_threshold:
+                usable_sell_quantity += fixed_point.parse(bid[1])
             else:
                 break
-        return self.update_current_profit_percentage(highest_bid)
+        self._usable_sell_quantity = usable_sell_quantity
+        return self._update_highest_bid(highest_bid)
+    
+    def update_bid_levels(self, bids, reset=False):
+        '''
+        Incremental version of update_bids, only the levels that changed are processed.
+        
+        :param bids: required
+        :type bids: list of [price, quantity] strings, a quantity of zero removes the level
+        :param reset: If the bids are a full snapshot of the book rather than changes to it.
+        :type reset: bool
+        '''
+        if reset:
+            self._bid_levels = {}
+            self._bid_prices = []
+            self._usable_sell_quantity = 0
+        
+        for bid in bids:
+            price = fixed_point.parse(bid[0])
+            quantity = fixed_point.parse(bid[1])
+            previous_quantity = self._bid_levels.get(price)
+            if previous_quantity is None:
+                if quantity == 0:
+                    continue
+                insort(self._bid_prices, price)
+                previous_quantity = 0
+            if quantity == 0:
+                del self._bid_levels[price]
+                del self._bid_prices[bisect_left(self._bid_prices, price)]
+            else:
+                self._bid_levels[price] = quantity
+            if price >= self._bid_threshold:
+                self._usable_sell_quantity += quantity - previous_quantity
+        
+        highest_bid = self._bid_prices[-1] if self._bid_prices else 0
+        return self._update_highest_bid(highest_bid)
     
     def can_sell(self):
-        return self.alt_holdings <= self.usable_sell_quantity
\ No newline at end of file
+        return self._alt_holdings <= self._usable_sell_quantity
@@ -0,0 +1,116 @@
+from threading import Condition
+from timeit import default_timer
+
+# Priorities of requests, orders are never starved by market data.
+ORDER = 0
+MARKET_DATA = 1
+
+weight_per_minute = 1200 # Binance's REQUEST_WEIGHT limit
+order_reserve = 100 # Weight that only orders can use, so exits always find budget left.
+default_ban_seconds = 60 # Used when a 429 or 418 response does not say how long to wait.
+
+# Request weights of the endpoints the client calls, by method and path. Any other request weighs 1.
+# Reading an order weighs more than placing or cancelling it.
+endpoint_weights = {("get", "exchangeInfo"): 10,
+                    ("get", "account"): 10,
+                    ("get", "order"): 2,
+                    ("get", "openOrders"): 3}
+# Weights of the endpoints that return every symbol when no symbol is given.
+all_symbols_weights = {"ticker/24hr": 40,
+                       "openOrders": 40}
+
+def depth_weight(limit=100):
+    '''
+    :returns: The request weight of get_order_book for the given number of levels.
+    '''
+    if limit <= 100:
+        return 1
+    elif limit <= 500:
+        return 5
+    elif limit <= 1000:
+        return 10
+    return 50
+
+def request_weight(path, params, method="get"):
+    '''
+    :param path: The endpoint, e.g. "depth"
+    :param params: The request's parameters, the weight of some endpoints depends on them.
+    :param method: The request's HTTP method in lower case, e.g. "post"
+    '''
+    if path == "depth":
+        return depth_weight(int(params.get("limit", 100)))
+    if method == "get" and path in all_symbols_weights and "symbol" not in params:
+        return all_symbols_weights[path]
+    return endpoint_weights.get((method, path), 1)
+
+class request_weight_limiter(object):
+    '''
+    Token bucket over Binance's request weight budget, refilled continuously and
+    corrected with the weight the exchange reports as used.
+    
+    Market data cannot use the last order_reserve of the budget and waits while any
+    order is waiting, so polling can never delay an exit.
+    '''
+    
+    def __init__(self, weight_per_minute=weight_per_minute, order_reserve=order_reserve):
+        self.weight_per_minute = weight_per_minute
+        self.order_reserve = order_reserve
+        self._tokens = float(weight_per_minute)
+        self._refilled_at = default_timer()
+        self._banned_until = 0
+        self._orders_waiting = 0
+        self._condition = Condition()
+    
+    def acquire(self, weight, priority=MARKET_DATA):
+        '''
+        Blocks until the request can be sent without going over the budget.
+        '''
+        with self._condition:
+            if priority == ORDER:
+                self._orders_waiting += 1
+            try:
+                while True:
+                    self._refill()
+                    timeout = self._banned_until - default_timer()
+                    if timeout <= 0:
+                        if priority == ORDER:
+                            available = self._tokens
+                        elif self._orders_waiting:
+                            # Wait to be notified once the orders are sent.
+                            self._condition.wait()
+                            continue
+                        else:
+                            available = self._tokens - self.order_reserve
+                        if available >= weight:
+                            self._tokens -= weight
+                            return
+                        timeout = (weight - available) * 60.0 / self.weight_per_minute
+                    self._condition.wait(timeout)
+            finally:
+                if priority == ORDER:
+                    self._orders_waiting -= 1
+                    self._condition.notify_all()
+    
+    def update_from_headers(self, headers):
+        '''
+        Lowers the budget to what Binance says is left for this minute, it counts requests
+        from every program using the same IP.
+        '''
+        used = headers.get("X-MBX-USED-WEIGHT-1M", headers.get("X-MBX-USED-WEIGHT"))
+        if used is not None:
+            with self._condition:
+                self._refill()
+                self._tokens = min(self._tokens, float(self.weight_per_minute - int(used)))
+    
+    def back_off(self, seconds=default_ban_seconds):
+        '''
+        Stops every request for the given time, called after a 429 or 418 response.
+        '''
+        with self._condition:
+            self._banned_until = max(self._banned_until, default_timer() + seconds)
+    
+    def _refill(self):
+        now = default_timer()
+        refill = (now - self._refilled_at) * self.weight_per_minute / 60.0
+        self._tokens = min(float(self.weight_per_minute), self._tokens + refill)
+        self._refilled_at = now
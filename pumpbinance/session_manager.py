@@ -0,0 +1,612 @@
+from collections import deque
+from decimal import Decimal
+from threading import Condition, Lock, RLock
+import logging
+import websocket
+from binance_api import BinanceAPIException, BinanceOrderException
+from helper_methods import btc_to_alt, readable_alt_balance, readable_btc_balance
+from order_book import depth_stream, STREAM_URL
+from protective_orders import protective_orders, TAKE_PROFIT
+from pumper import SELL_PROFIT, SELL_STOP_LOSS, SELL_TRAILING
+from sliced_exit import sliced_exit
+from user_data_stream import user_data_stream
+import event_log
+import fixed_point
+from latency_stats import stats, monotonic, UPDATE_BIDS, DECISION
+
+# How decisions are named in the event log.
+decision_names = {SELL_PROFIT: "profit", SELL_STOP_LOSS: "stop_loss", SELL_TRAILING: "trailing"}
+# Measured in seconds, how long slicing has to pause before the protective orders are placed again.
+reprotect_delay = 2
+
+class fair_scheduler(object):
+    '''
+    Shares the request weight budget between the symbols being pumped.
+    
+    binance_api's limiter decides when the budget allows a request. This decides whose
+    request goes next: requests wait in a queue per key and take turns round-robin
+    across the keys, so one busy symbol cannot starve the others.
+    '''
+    
+    def __init__(self):
+        self._waiting = {} # Key -> deque of tickets waiting for their turn
+        self._order = [] # Keys in the order they take turns
+        self._last_served = -1
+        self._busy = False
+        self._condition = Condition()
+    
+    def acquire(self, key):
+        '''
+        Blocks until it is the key's turn, release has to be called once the request is done.
+        '''
+        ticket = object()
+        with self._condition:
+            if key not in self._waiting:
+                self._waiting[key] = deque()
+                self._order.append(key)
+            self._waiting[key].append(ticket)
+            while self._busy or self._next_key() != key or self._waiting[key][0] is not ticket:
+                self._condition.wait()
+            # Keys keep their place in the order once they are done, so they cannot skip the queue by coming back.
+            self._waiting[key].popleft()
+            self._last_served = self._order.index(key)
+            self._busy = True
+    
+    def release(self):
+        with self._condition:
+            self._busy = False
+            self._condition.notify_all()
+    
+    def _next_key(self):
+        for i in range(1, len(self._order) + 1):
+            key = self._order[(self._last_served + i) % len(self._order)]
+            if self._waiting[key]:
+                return key
+
+class scheduled_api(object):
+    '''
+    The market data requests of a binance_api, taking turns through a fair_scheduler.
+    '''
+    
+    def __init__(self, api, scheduler):
+        self.api = api
+        self.scheduler = scheduler
+    
+    def get_order_book(self, **params):
+        self.scheduler.acquire(params["symbol"])
+        try:
+            return self.api.get_order_book(**params)
+        finally:
+            self.scheduler.release()
+
+class market_data_feed(object):
+    '''
+    One depth stream per symbol, shared by every session pumping it.
+    '''
+    
+    def __init__(self, api, stream_url=STREAM_URL, recorder=None, websocket_app=websocket.WebSocketApp):
+        '''
+        :param api: Used for the streams' snapshots.
+        :type api: scheduled_api
+        :param recorder: optional
+        :type recorder: tick_recorder
+        :param websocket_app: Makes the streams' connections, see depth_stream.
+        '''
+        self.api = api
+        self.stream_url = stream_url
+        self.recorder = recorder
+        self.websocket_app = websocket_app
+        self._streams = {} # Symbol -> depth_stream
+        self._subscribers = {} # Symbol -> list of on_bids callbacks
+        self._holdings = {} # on_bids callback -> function returning the fixed-point quantity it will sell
+        # Held while a subscriber is added and seeded, which may lead it to unsubscribe.
+        self._lock = RLock()
+    
+    def subscribe(self, symbol, on_bids, holdings=None):
+        '''
+        :param on_bids: Called like pumper.update_bid_levels for every change to the symbol's bids.
+        :param holdings: optional, returns the fixed-point quantity the subscriber will sell into the bids.
+                         The book is kept deep enough to cover the holdings of every subscriber.
+        
+        A subscriber joining a running stream is seeded with its book, unless the book is waiting for
+        a snapshot; the snapshot then seeds every subscriber once it arrives.
+        '''
+        with self._lock:
+            self._subscribers.setdefault(symbol, []).append(on_bids)
+            if holdings is not None:
+                self._holdings[on_bids] = holdings
+            stream = self._streams.get(symbol)
+            if stream is None:
+                stream = depth_stream(self.api, symbol, on_bids=lambda bids, reset: self._on_bids(symbol, bids, reset), stream_url=self.stream_url,
+                                      recorder=self.recorder, required_quantity=lambda: self._required_quantity(symbol),
+                                      websocket_app=self.websocket_app)
+                self._streams[symbol] = stream
+                stream.start()
+                return
+            # Seeded under the lock, the stream's next bids wait for it so they cannot arrive before the seed.
+            # A diff already in the seed may still follow it, applying it again changes nothing.
+            with stream.lock:
+                bids = stream.book.snapshot()["bids"] if stream.synced else None
+            if bids is not None:
+                on_bids(bids, True)
+    
+    def unsubscribe(self, symbol, on_bids):
+        with self._lock:
+            subscribers = self._subscribers.get(symbol, [])
+            if on_bids in subscribers:
+                subscribers.remove(on_bids)
+            self._holdings.pop(on_bids, None)
+            if not subscribers:
+                self._subscribers.pop(symbol, None)
+                stream = self._streams.pop(symbol, None)
+                if stream is not None:
+                    stream.stop()
+    
+    def close(self):
+        '''
+        Stops every depth stream, their subscribers are no longer told about the bids.
+        '''
+        with self._lock:
+            streams = self._streams.values()
+            self._streams = {}
+            self._subscribers = {}
+            self._holdings = {}
+        for stream in streams:
+            stream.stop()
+    
+    def last_event_time(self, symbol):
+        '''
+        :returns: The server time in milliseconds of the last depth event applied to the symbol's book, None after a snapshot.
+        '''
+        stream = self._streams.get(symbol)
+        return stream.last_event_time if stream is not None else None
+    
+    def _required_quantity(self, symbol):
+        quantity = 0
+        for on_bids in self._subscribers.get(symbol, ()):
+            holdings = self._holdings.get(on_bids)
+            if holdings is not None:
+                quantity += holdings()
+        return quantity
+    
+    def _on_bids(self, symbol, bids, reset):
+        with self._lock:
+            subscribers = list(self._subscribers.get(symbol, ()))
+        for on_bids in subscribers:
+            on_bids(bids, reset)
+
+class pump_session(object):
+    '''
+    A single pump: its pumper, how it entered and the decisions taken on its book.
+    
+    The listener is told what happens through write_to_console(line), set_current_profit(profit)
+    and on_session_finished(session).
+    '''
+    
+    def __init__(self, manager, pumper, is_entry_market, use_bnb, listener, protect=False):
+        '''
+        :param protect: If an OCO sell at the target and the stop loss is kept on Binance once the entry fills.
+        '''
+        self.manager = manager
+        self.api = manager.api
+        self.pumper = pumper
+        self.is_entry_market = is_entry_market
+        self.use_bnb = use_bnb
+        self.listener = listener
+        self.protect = protect
+        self.protection = None # protective_orders, once placed
+        self.protection_released = False # If they were cancelled for slices and have to be placed again
+        self.last_slice_at = 0 # Monotonic time of the last slice
+        self.full_ticker = ""
+        self.sell_template = None
+        self.exit = None # sliced_exit, every sale goes through it
+        self.limit_order = None # order_state of the entry when it is a limit order
+        self.entry_closed = False # If the limit order was cancelled to start selling
+        self.active = False
+        self.pump_id = event_log.new_pump_id() # Correlates the event log records of this pump
+        self._lock = Lock() # Decisions can come from the feed and from the user at the same time.
+    
+    def write_to_console(self, line):
+        event_log.emit("console", self.pump_id, line=line)
+        self.listener.write_to_console(line)
+    
+    def enter(self, ticker, alt, btc_to_use, target_profit_percentage, stop_loss, trailing_stop=None):
+        '''
+        Buys the alt and starts following its book.
+        
+        :param alt: required
+        :type alt: dict from binance_api.get_ticker
+        :param trailing_stop: optional, see pumper.trailing_stop
+        :returns: If the entry order was placed.
+        '''
+        api = self.api
+        full_ticker = api.full_ticker_for(ticker)
+        self.full_ticker = full_ticker
+        alt_value = Decimal(alt["askPrice"])
+        if self.manager.recorder is not None:
+            self.manager.recorder.record_ticker(full_ticker, alt)
+        
+        # Used in console output
+        try:
+            decimal_points = api.symbol_filters(full_ticker).quantity_decimals
+        except BinanceOrderException, e:
+            # Raised for an unknown symbol
+            self.write_to_console(e.message)
+            return False
+        self.pumper.decimal_points_in_alt = decimal_points
+        
+        self.pumper.set_up(btc_to_use, target_profit_percentage, alt_value, ticker)
+        # Made before the entry, the limit order's fills can be reported as soon as it is watched.
+        self.exit = sliced_exit(api, self.pumper, full_ticker, self.use_bnb)
+        if self.is_entry_market:
+            try:
+                self.pumper.alt_holdings = api.market_buy(self.pumper.btc_to_use, full_ticker, self.use_bnb)
+            except (BinanceAPIException, BinanceOrderException), e:
+                self.write_to_console(e.message)
+                return False
+            self.write_to_console("Bought "+readable_alt_balance(decimal_points, pumper=self.pumper)+" with "+readable_btc_balance(btc_to_use)+".")
+        else:
+            highest_bid = fixed_point.parse(alt["bidPrice"])
+            lowest_ask = fixed_point.parse(alt["askPrice"])
+            
+            # Bid between the highest bid and the lowest ask for the best odds of being filled.
+            # The spread is in satoshis so a one satoshi spread keeps the highest bid.
+            to_bid = fixed_point.to_decimal((lowest_ask - highest_bid)//2 + highest_bid)
+            # The thresholds depend on the starting value.
+            self.pumper.set_up(btc_to_use, target_profit_percentage, to_bid, ticker)
+            
+            try:
+                expected = api.limit_buy(btc_to_alt(btc_to_use, alt_value), self.pumper, full_ticker, to_bid, self.use_bnb)
+            except (BinanceAPIException, BinanceOrderException), e:
+                self.write_to_console(e.message)
+                return False
+            # Fills are followed on the user data stream, so exits never wait on the order's status.
+            self.limit_order = self.manager.user_stream.watch(self.pumper.limit_order_id, full_ticker, self.on_limit_order_execution)
+            self.write_to_console("Buying "+readable_alt_balance(decimal_points, alt_amount=expected, ticker=ticker)+" for "+readable_btc_balance(btc_to_use)+".")
+            self.write_to_console("This is a limit order, it may not get filled.")
+        
+        # Sign the parts of the sell order that are already known so selling is faster.
+        self.sell_template = api.prepare_market_sell(full_ticker)
+        self.exit.template = self.sell_template
+        self.pumper.stop_loss = stop_loss
+        self.pumper.trailing_stop = trailing_stop
+        event_log.emit("pump_started", self.pump_id, symbol=full_ticker, entry="market" if self.is_entry_market else "limit",
+                       btc_to_use=btc_to_use, alt_holdings=self.pumper.alt_holdings, starting_alt_value=self.pumper.starting_alt_value,
+                       target=target_profit_percentage, stop_loss=stop_loss, trailing_stop=trailing_stop)
+        self.active = True
+        if self.protect:
+            # A limit entry is protected once it is filled, which may have been reported already.
+            if self.is_entry_market:
+                self.protect_position(announce=True)
+            else:
+                self.protect_filled_entry(self.limit_order)
+        self.manager.start_session(self)
+        return True
+    
+    def on_bids(self, bids, reset):
+        '''
+        The bot is listening to the exchange's bids to decide what to do.
+        '''
+        with self._lock:
+            if self.active:
+                action = self.pumper.update_bid_levels(bids, reset)
+                stats.mark(UPDATE_BIDS)
+                self.on_action(action)
+                if self.active:
+                    self.restore_protection()
+    
+    def fixed_alt_holdings(self):
+        return self.pumper.fixed_alt_holdings
+    
+    def on_limit_order_execution(self, order):
+        '''
+        Keeps the alt holdings equal to what the limit order has bought so far, less what was already sold.
+        
+        :type order: user_data_stream.order_state
+        '''
+        self._sync_limit_order(order)
+        if self.protect and order.status == "FILLED":
+            self.protect_filled_entry(order)
+    
+    def _sync_limit_order(self, order):
+        # Not under the session's lock, the stream should not wait on a sell. The exit serializes it with the sales.
+        self.exit.set_bought(order.alt_received(self.pumper.alt_ticker))
+        event_log.emit("limit_order_update", self.pump_id, status=order.status, executed=order.executed_quantity, quote=order.quote_quantity)
+    
+    def protect_filled_entry(self, order):
+        '''
+        Places the protective orders once the limit entry is filled, unless the bot started selling already.
+        
+        :type order: user_data_stream.order_state
+        '''
+        with self._lock:
+            if (order.status == "FILLED" and self.active and self.protection is None
+                    and not self.entry_closed and self.exit.alt_sold == 0):
+                self.protect_position(announce=True)
+    
+    def protect_position(self, announce=False):
+        '''
+        Places an OCO sell of what is left at the target and at the stop loss.
+        Failing to place it is not fatal, the bot still sells on its own.
+        '''
+        quantity = self.exit.tradeable(self.exit.remaining)
+        if self.protection is None:
+            self.protection = protective_orders(self.api, self.manager.user_stream, self.full_ticker, self.use_bnb, self.on_protective_fill)
+        try:
+            self.protection.place(quantity, self.pumper.fixed_bid_threshold, self.pumper.fixed_stop_loss_bid)
+        except (BinanceOrderException, BinanceAPIException), e:
+            self.write_to_console("Could not place protective orders: "+e.message)
+            return
+        event_log.emit("protection_placed", self.pump_id, quantity=fixed_point.to_decimal(quantity),
+                       take_profit=fixed_point.to_decimal(self.pumper.fixed_bid_threshold), stop=fixed_point.to_decimal(self.pumper.fixed_stop_loss_bid))
+        if announce:
+            self.write_to_console("Placed a take profit and a stop loss for "+readable_alt_balance(self.pumper.decimal_points_in_alt, fixed_point.to_decimal(quantity), self.pumper.alt_ticker)+" on Binance.")
+    
+    def release_protection(self):
+        '''
+        Cancels the protective orders so the bot can sell the alt they hold, their fills until then are recorded.
+        
+        :returns: If they were still open.
+        '''
+        if self.protection is None or not self.protection.active:
+            return False
+        self.protection.cancel()
+        event_log.emit("protection_cancelled", self.pump_id, remaining=self.pumper.alt_holdings)
+        return True
+    
+    def on_protective_fill(self, leg, alt_sold, btc_traded, btc_received, done):
+        '''
+        Called by the protective orders when one of them sells, done once Binance has exited the position.
+        '''
+        # Not under the lock, cancel reports the fills it finds while the lock is held.
+        self.exit.record(alt_sold, btc_traded, btc_received)
+        event_log.emit("protective_fill", self.pump_id, leg=leg, alt_sold=fixed_point.to_decimal(alt_sold),
+                       btc_received=fixed_point.to_decimal(btc_received), done=done)
+        if not done:
+            return
+        with self._lock:
+            if not self.active:
+                return
+            btc_received = fixed_point.to_decimal(self.exit.btc_received)
+            self.write_to_console(("Take profit" if leg == TAKE_PROFIT else "Stop loss")+" filled on Binance, sold "+
+                                  readable_alt_balance(self.pumper.decimal_points_in_alt, fixed_point.to_decimal(self.exit.alt_sold), self.pumper.alt_ticker)+
+                                  " at an average of "+readable_btc_balance(self.exit.average_price)+".")
+            net = btc_received-self.pumper.btc_to_use
+            if net > 0:
+                self.write_to_console("Profited "+readable_btc_balance(net)+".")
+            else:
+                self.write_to_console("Lost "+readable_btc_balance(net)+".")
+            self.finish()
+    
+    def on_action(self, action):
+        if action is not None:
+            event_log.emit("decision", self.pump_id, action=decision_names[action],
+                           profit=self.pumper.current_profit_percentage, can_sell=self.pumper.can_sell())
+        if action == SELL_PROFIT:
+            if not self.is_entry_market and not self.entry_closed:
+                # Cancel any open buy orders and sync the amount of alt that we have.
+                btc_spent = self.cancel_limit_order_and_sync()
+                self.entry_closed = True
+                self.write_to_console("Limit order was filled for "+readable_alt_balance(self.pumper.decimal_points_in_alt, pumper=self.pumper)+", spent "+readable_btc_balance(btc_spent)+".")
+            
+            # Sell as much as the bids above the threshold can take, the rest waits for the next update of the book.
+            self.sell_slice()
+            if self.exit.is_done() and self.exit.alt_sold == 0:
+                if self.is_entry_market:
+                    self.write_to_console(readable_alt_balance(self.pumper.decimal_points_in_alt, pumper=self.pumper)+" is too little to sell.")
+                else:
+                    self.write_to_console("Limit order was not filled. No "+self.pumper.alt_ticker+" to sell.")
+                self.finish()
+            elif self.exit.is_done():
+                btc_received = fixed_point.to_decimal(self.exit.btc_received)
+                
+                # Tell the user how much they made.
+                self.write_to_console("Sold "+readable_alt_balance(self.pumper.decimal_points_in_alt, fixed_point.to_decimal(self.exit.alt_sold), self.pumper.alt_ticker)+
+                                      " for "+readable_btc_balance(btc_received)+" in "+str(self.exit.slices)+" slices, at an average of "+readable_btc_balance(self.exit.average_price)+".")
+                self.write_to_console("Profited "+readable_btc_balance(btc_received-self.pumper.btc_to_use)+".")
+                self.finish()
+        
+        elif action == SELL_STOP_LOSS:
+            if not self.is_entry_market:
+                self.cancel_limit_order_and_sync()
+            
+            self.write_to_console("Stop loss reached.")
+            self.release_protection()
+            
+            if self.pumper.alt_holdings > Decimal(0):
+                self.market_sell()
+                btc_received = fixed_point.to_decimal(self.exit.btc_received) # Includes the slices sold before
+                self.write_to_console("Selling at market. Lost "+readable_btc_balance(self.pumper.btc_to_use-btc_received)+".")
+            elif self.exit.alt_sold:
+                self.write_to_console("Everything left was already sold.")
+            else:
+                self.write_to_console("Limit order was not filled. No "+self.pumper.alt_ticker+" to sell.")
+            
+            self.write_to_console("Aborting pump bot.")
+            self.finish()
+        
+        elif action == SELL_TRAILING:
+            if not self.is_entry_market:
+                self.cancel_limit_order_and_sync()
+            self.release_protection()
+            
+            self.write_to_console("The bid fell "+'{0:.2f}'.format(self.pumper.trailing_stop*100)+"% from its peak of "+readable_btc_balance(self.pumper.peak_bid)+".")
+            
+            if self.pumper.alt_holdings > Decimal(0):
+                self.market_sell()
+                # Includes the slices sold before
+                net = fixed_point.to_decimal(self.exit.btc_received)-self.pumper.btc_to_use
+                if net > 0:
+                    self.write_to_console("Sold at market. Profited "+readable_btc_balance(net)+".")
+                else:
+                    self.write_to_console("Sold at market. Lost "+readable_btc_balance(net)+".")
+            elif self.exit.alt_sold:
+                self.write_to_console("Everything left was already sold.")
+            else:
+                self.write_to_console("Limit order was not filled. No "+self.pumper.alt_ticker+" to sell.")
+            self.finish()
+        
+        # Update the UI with the current profit percentage.
+        self.listener.set_current_profit(self.pumper.current_profit_percentage)
+    
+    def manual_sell(self):
+        with self._lock:
+            if not self.active:
+                return
+            if not self.is_entry_market:
+                self.cancel_limit_order_and_sync()
+            self.release_protection()
+            
+            # A limit order may have been placed but not filled
+            if self.pumper.alt_holdings > Decimal(0):
+                alt_sold = self.pumper.alt_holdings
+                btc_received = self.market_sell()
+                self.write_to_console("Manually sold "+readable_alt_balance(self.pumper.decimal_points_in_alt, alt_sold, self.pumper.alt_ticker)+" for "+readable_btc_balance(btc_received)+".")
+                # Includes the slices sold before
+                net = fixed_point.to_decimal(self.exit.btc_received)-self.pumper.btc_to_use
+                if net > 0:
+                    self.write_to_console("Profited "+readable_btc_balance(net)+".")
+                else:
+                    self.write_to_console("Lost "+readable_btc_balance(net)+".")
+            elif self.exit.alt_sold:
+                self.write_to_console("Everything was already sold.")
+            else:
+                self.write_to_console("You have no "+self.pumper.alt_ticker+" to sell.")
+                self.write_to_console("Try a market order next time.")
+            self.finish()
+    
+    def market_sell(self):
+        '''
+        Sells everything that is left at market.
+        
+        :returns: BTC received
+        '''
+        stats.mark(DECISION)
+        alt_sold = self.exit.alt_sold
+        btc_received = fixed_point.to_decimal(self.exit.sell(self.exit.tradeable(self.exit.remaining)))
+        event_log.emit("market_sell", self.pump_id, alt_sold=fixed_point.to_decimal(self.exit.alt_sold - alt_sold), btc_received=btc_received,
+                       preparation_us=self.api.last_preparation_us)
+        return btc_received
+    
+    def sell_slice(self):
+        event_time = self.manager.feed.last_event_time(self.full_ticker)
+        if self.exit.next_slice(event_time) is None:
+            return
+        # The protective orders hold the alt. They stay cancelled while the slices follow each other,
+        # restore_protection places them again for what is left once the slices pause.
+        if self.release_protection():
+            self.protection_released = True
+        self._sell_slice(event_time)
+        self.last_slice_at = monotonic()
+    
+    def restore_protection(self):
+        '''
+        Places the protective orders cancelled for the slices again, once no slice was sold for reprotect_delay.
+        '''
+        if not self.protection_released or monotonic() - self.last_slice_at < reprotect_delay:
+            return
+        self.protection_released = False
+        if not self.exit.is_done():
+            self.protect_position()
+    
+    def _sell_slice(self, event_time):
+        # Sized again, the protective orders may have sold some before they were cancelled.
+        quantity = self.exit.next_slice(event_time)
+        if quantity is None:
+            return
+        stats.mark(DECISION)
+        remaining = self.exit.remaining
+        btc_received = self.exit.sell_slice(quantity)
+        alt_sold = fixed_point.to_decimal(remaining - self.exit.remaining)
+        event_log.emit("slice_sold", self.pump_id, slice=self.exit.slices, alt_sold=alt_sold, btc_received=fixed_point.to_decimal(btc_received),
+                       remaining=self.pumper.alt_holdings, average_price=self.exit.average_price, preparation_us=self.api.last_preparation_us)
+        if not self.exit.is_done():
+            self.write_to_console("Sold "+readable_alt_balance(self.pumper.decimal_points_in_alt, alt_sold, self.pumper.alt_ticker)+", "+
+                                  readable_alt_balance(self.pumper.decimal_points_in_alt, pumper=self.pumper)+" left.")
+    
+    def cancel_limit_order_and_sync(self):
+        '''
+        The cancel is sent in the background so the alt that was bought can be sold at the same time.
+        The order's fills come from the user data stream, its status is only queried when the stream is down.
+        
+        :returns: BTC spent
+        '''
+        order = self.limit_order
+        if order is None or not self.manager.user_stream.connected:
+            return self._query_limit_order_and_sync()
+        if order.is_open:
+            self.manager.async_api.cancel_order(origClientOrderId=self.pumper.limit_order_id, symbol=self.full_ticker)
+        # Called under the lock and about to sell, so the entry is not protected from here.
+        self._sync_limit_order(order)
+        return fixed_point.to_decimal(order.quote_quantity)
+    
+    def _query_limit_order_and_sync(self):
+        order_info = self.api.get_order(origClientOrderId=self.pumper.limit_order_id, symbol=self.full_ticker)
+        if order_info["status"] == "NEW" or order_info["status"] == "PARTIALLY_FILLED":
+            self.manager.async_api.cancel_order(origClientOrderId=self.pumper.limit_order_id, symbol=self.full_ticker)
+        alt_bought = Decimal(order_info["executedQty"])
+        self.exit.set_bought(fixed_point.from_decimal(alt_bought))
+        return alt_bought * Decimal(order_info["price"])
+    
+    def finish(self):
+        self.active = False
+        event_log.emit("pump_finished", self.pump_id, symbol=self.full_ticker)
+        if self.protection is not None:
+            self.protection.stop_watching()
+        if self.limit_order is not None:
+            self.manager.user_stream.unwatch(self.limit_order.client_order_id)
+        self.manager.end_session(self)
+        self.listener.on_session_finished(self)
+
+class session_manager(object):
+    '''
+    Runs any number of pump_sessions over one market data feed and one API connection,
+    sharing the request weight budget fairly between them.
+    '''
+    
+    def __init__(self, api, async_api, stream_url=STREAM_URL, on_balances=None, recorder=None):
+        '''
+        :param api: The order gateway shared by every session.
+        :type api: binance_api
+        :type async_api: async_binance_api
+        :param on_balances: optional, called with a dict of asset -> free Decimal balance when the stream reports changes.
+        :param recorder: optional, records the market data and order events of every session.
+        :type recorder: tick_recorder
+        '''
+        self.api = api
+        self.async_api = async_api
+        self.on_balances = on_balances
+        self.recorder = recorder
+        self.scheduler = fair_scheduler()
+        self.feed = market_data_feed(scheduled_api(api, self.scheduler), stream_url, recorder)
+        self.user_stream = user_data_stream(api, self._on_balances, stream_url, recorder)
+        self.user_stream.start()
+        api.balances.start_reconciling()
+        self.sessions = []
+        self._lock = Lock()
+    
+    def close(self):
+        self.user_stream.stop()
+        self.feed.close()
+        self.api.balances.stop_reconciling()
+    
+    def _on_balances(self, balances, updated_at):
+        self.api.balances.update(balances, updated_at)
+        if self.on_balances is not None:
+            self.on_balances(balances)
+    
+    def start_session(self, session):
+        with self._lock:
+            self.sessions.append(session)
+        self.feed.subscribe(session.full_ticker, session.on_bids, session.fixed_alt_holdings)
+    
+    def end_session(self, session):
+        with self._lock:
+            if session in self.sessions:
+                self.sessions.remove(session)
+        self.feed.unsubscribe(session.full_ticker, session.on_bids)
+        logging.debug("Pump on "+session.full_ticker+" finished, "+str(len(self.sessions))+" still running.")
+    
+    def sessions_for(self, full_ticker):
+        with self._lock:
+            return [session for session in self.sessions if session.full_ticker == full_ticker]
@@ -0,0 +1,124 @@
+from decimal import Decimal
+from threading import Lock
+from binance_api import BinanceOrderException
+import fixed_point
+
+class sliced_exit(object):
+    '''
+    Sells a pumper's holdings in slices no larger than the bids above its threshold, so a position
+    bigger than the top of the book is sold as the bids arrive, instead of waiting for one book
+    that can take all of it or selling all of it through the threshold at once.
+    
+    The bids a slice was sold into are still in the book until a depth event from after the
+    slice arrives, so the slice's quantity is not counted as available until then.
+    
+    Every sale of the pump goes through it, so it also keeps the totals of the whole exit.
+    '''
+    
+    def __init__(self, api, pumper, ticker, use_bnb, template=None):
+        '''
+        :type api: binance_api
+        :param template: optional, from binance_api.prepare_market_sell
+        '''
+        self.api = api
+        self.pumper = pumper # Its alt_holdings are what is left to sell
+        self.ticker = ticker
+        self.use_bnb = use_bnb
+        self.template = template
+        self.slices = 0
+        self.alt_sold = 0 # Fixed-point
+        self.btc_traded = 0 # Fixed-point, before fees
+        self.btc_received = 0 # Fixed-point, after fees
+        self._unseen_quantity = 0 # Sold since the last depth event from after a slice
+        self._unseen_until = 0 # Server time in milliseconds of the last slice
+        # The holdings change on the feed's thread and on the user data stream's.
+        self._lock = Lock()
+    
+    @property
+    def remaining(self):
+        return self.pumper.fixed_alt_holdings
+    
+    @property
+    def average_price(self):
+        '''
+        :returns: The volume weighted average price of everything sold, as a Decimal.
+        '''
+        if self.alt_sold == 0:
+            return Decimal(0)
+        return fixed_point.to_decimal(fixed_point.divide(self.btc_traded, self.alt_sold))
+    
+    def is_done(self):
+        '''
+        :returns: If what is left is too small to be sold at the threshold.
+        '''
+        return not self._can_sell(self.tradeable(self.remaining))
+    
+    def next_slice(self, event_time):
+        '''
+        Called after the pumper's bids were updated.
+        
+        :param event_time: Server time in milliseconds of the depth event, None after a snapshot.
+        :returns: The fixed-point quantity the bids above the threshold can take, None if they are too thin for a slice.
+        '''
+        if self._unseen_quantity and (event_time is None or event_time > self._unseen_until):
+            self._unseen_quantity = 0
+        available = self.pumper.fixed_usable_sell_quantity - self._unseen_quantity
+        quantity = self.tradeable(min(self.remaining, available))
+        if not self._can_sell(quantity):
+            return None
+        return quantity
+    
+    def sell_slice(self, quantity):
+        '''
+        Pre: quantity is from next_slice
+        :returns: The fixed-point BTC received after paying fees.
+        '''
+        btc_received = self.sell(quantity)
+        self.slices += 1
+        return btc_received
+    
+    def sell(self, quantity):
+        '''
+        Pre: quantity is a fixed-point integer adjusted for decimals
+        :returns: The fixed-point BTC received after paying fees.
+        :raises: BinanceOrderException if the quantity is below the symbol's minimum
+        '''
+        order, btc_received = self.api.market_sell_quantity(self.ticker, quantity, self.use_bnb, self.template)
+        sold = fixed_point.parse(order["executedQty"])
+        self.record(sold, fixed_point.parse(order["cummulativeQuoteQty"]), btc_received)
+        self._unseen_quantity += sold
+        self._unseen_until = order.get("transactTime", 0)
+        return btc_received
+    
+    def record(self, alt_sold, btc_traded, btc_received):
+        '''
+        Adds a sale to the totals and takes it out of the holdings, also used for sales made by other orders.
+        
+        Pre: the amounts are fixed-point integers
+        '''
+        with self._lock:
+            self.alt_sold += alt_sold
+            self.btc_traded += btc_traded
+            self.btc_received += btc_received
+            self.pumper.alt_holdings = fixed_point.to_decimal(max(self.remaining - alt_sold, 0))
+    
+    def set_bought(self, alt_bought):
+        '''
+        Sets the holdings to what the entry has bought so far, less what was already sold.
+        
+        Pre: alt_bought is a fixed-point integer
+        '''
+        with self._lock:
+            self.pumper.alt_holdings = fixed_point.to_decimal(alt_bought - self.alt_sold)
+    
+    def tradeable(self, quantity):
+        ''' :returns: The quantity rounded down to the symbol's step size. '''
+        return fixed_point.floor_to_step(max(quantity, 0), self.api.symbol_filters(self.ticker).step_size)
+    
+    def _can_sell(self, quantity):
+        # Checked at the threshold, the lowest price a slice can be sold at.
+        try:
+            self.api.validate_order(self.ticker, quantity, self.pumper.fixed_bid_threshold)
+        except BinanceOrderException:
+            return False
+        return True
@@ -0,0 +1,100 @@
+import json
+import logging
+import time
+import fixed_point
+
+EXCHANGE_INFO_FILENAME = 'exchange_info.json'
+exchange_info_ttl = 24 * 60 * 60 # Measured in seconds, symbols' filters rarely change.
+
+class symbol_filters(object):
+    '''
+    The trading rules of a symbol that are checked before an order is sent.
+    https://github.com/binance-exchange/binance-official-api-docs/blob/master/rest-api.md#filters
+    
+    Every amount is a fixed-point integer, see fixed_point.py.
+    '''
+    
+    def __init__(self, step_size, min_quantity, tick_size, min_price, min_notional):
+        self.step_size = step_size # LOT_SIZE
+        self.min_quantity = min_quantity
+        self.tick_size = tick_size # PRICE_FILTER
+        self.min_price = min_price
+        self.min_notional = min_notional # MIN_NOTIONAL, measured in BTC
+        self.quantity_decimals = fixed_point.decimals_in_step(step_size)
+        self.price_decimals = fixed_point.decimals_in_step(tick_size)
+    
+    @classmethod
+    def from_exchange_info(cls, filters):
+        '''
+        :param filters: required
+        :type filters: dict of filterType -> filter, from a symbol in binance_api.get_exchange_info
+        '''
+        lot_size = filters.get("LOT_SIZE", {})
+        price_filter = filters.get("PRICE_FILTER", {})
+        min_notional = filters.get("MIN_NOTIONAL", {})
+        return cls(step_size=fixed_point.parse(lot_size.get("stepSize", "1")),
+                   min_quantity=fixed_point.parse(lot_size.get("minQty", "0")),
+                   tick_size=fixed_point.parse(price_filter.get("tickSize", "0.00000001")),
+                   min_price=fixed_point.parse(price_filter.get("minPrice", "0")),
+                   min_notional=fixed_point.parse(min_notional.get("minNotional", "0")))
+
+class symbol_filter_cache(object):
+    '''
+    Every symbol's filters, downloaded from exchangeInfo and kept on disk so connecting
+    does not need to fetch them again until they expire.
+    
+    Nothing is read until the first get, call load beforehand to keep it off the order path.
+    '''
+    
+    def __init__(self, api, filename=EXCHANGE_INFO_FILENAME, ttl=exchange_info_ttl):
+        '''
+        :param api: Used to download exchangeInfo when the file is missing or expired.
+        :type api: binance_api
+        '''
+        self.api = api
+        self.filename = filename
+        self.ttl = ttl
+        self._filters = None # Symbol -> symbol_filters, None until loaded
+    
+    def get(self, symbol):
+        '''
+        :returns: The symbol's filters, or None if the exchange did not list it.
+        '''
+        if self._filters is None:
+            self.load()
+        return self._filters.get(symbol)
+    
+    def load(self):
+        '''
+        Reads the filters from disk, or downloads them if the file is missing or older than the TTL.
+        '''
+        try:
+            with open(self.filename) as cache_file:
+                cached = json.load(cache_file)
+            if time.time() - cached["savedAt"] < self.ttl:
+                self._set_filters(cached["symbols"])
+                return
+        except (IOError, ValueError, KeyError) as e:
+            logging.debug("Could not read "+self.filename+": "+str(e))
+        self.refresh()
+    
+    def refresh(self):
+        '''
+        Downloads every symbol's filters and saves them to disk.
+        '''
+        symbols = {}
+        for symbol in self.api.get_exchange_info()["symbols"]:
+            symbols[symbol["symbol"]] = dict((f["filterType"], f) for f in symbol["filters"])
+        self._set_filters(symbols)
+        
+        try:
+            with open(self.filename, "w") as cache_file:
+                json.dump({"savedAt": time.time(), "symbols": symbols}, cache_file)
+        except IOError as e:
+            logging.debug("Could not save "+self.filename+": "+str(e))
+    
+    def _set_filters(self, symbols):
+        filters = {}
+        for symbol, symbol_filter in symbols.items():
+            filters[symbol] = symbol_filters.from_exchange_info(symbol_filter)
+        self._filters = filters
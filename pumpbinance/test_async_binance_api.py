@@ -0,0 +1,138 @@
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from threading import Condition, Thread, current_thread
+import SocketServer
+import json
+import time
+import unittest
+import urlparse
+from async_binance_api import async_binance_api
+from binance_api import binance_api, BinanceAPIException
+
+class stub_binance(SocketServer.ThreadingMixIn, HTTPServer):
+    '''
+    Answers the few endpoints the tests use like Binance would, on a free local port.
+    Orders and cancels are held until as many of them arrived as concurrent_orders,
+    so they only get a response if they were sent at the same time.
+    '''
+    daemon_threads = True
+    
+    def __init__(self, concurrent_orders=1):
+        HTTPServer.__init__(self, ("127.0.0.1", 0), stub_handler)
+        self.concurrent_orders = concurrent_orders
+        self.requests = [] # (method, path, params)
+        self._orders_arrived = 0
+        self._condition = Condition()
+    
+    @property
+    def api_url(self):
+        return "http://127.0.0.1:%d/api" % self.server_address[1]
+    
+    def start(self):
+        server_thread = Thread(target=self.serve_forever)
+        server_thread.daemon = True
+        server_thread.start()
+    
+    def wait_for_other_orders(self):
+        with self._condition:
+            self._orders_arrived += 1
+            self._condition.notify_all()
+            deadline = time.time() + 5
+            while self._orders_arrived < self.concurrent_orders and time.time() < deadline:
+                self._condition.wait(deadline - time.time())
+            return self._orders_arrived >= self.concurrent_orders
+
+class stub_handler(BaseHTTPRequestHandler):
+    
+    def do_GET(self):
+        self.respond("GET")
+    
+    def do_POST(self):
+        self.respond("POST")
+    
+    def do_DELETE(self):
+        self.respond("DELETE")
+    
+    def respond(self, method):
+        url = urlparse.urlparse(self.path)
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        params = dict(urlparse.parse_qsl(url.query or body))
+        self.server.requests.append((method, url.path, params))
+        status, response = 200, {}
+        if url.path == "/api/v1/time":
+            response = {"serverTime": int(time.time() * 1000)}
+        elif url.path == "/api/v1/ticker/24hr":
+            if params.get("symbol") != "XVGBTC":
+                status, response = 400, {"code": -1121, "msg": "Invalid symbol."}
+            else:
+                response = {"symbol": "XVGBTC", "bidPrice": "0.00000100", "askPrice": "0.00000101"}
+        elif url.path == "/api/v1/depth":
+            response = {"lastUpdateId": 1, "bids": [["0.00000100", "5.00000000", []]], "asks": []}
+        elif url.path == "/api/v3/order":
+            if not self.server.wait_for_other_orders():
+                status, response = 400, {"code": -1, "msg": "Only one order was in flight."}
+            else:
+                response = {"symbol": params["symbol"], "clientOrderId": params.get("origClientOrderId", "new"), "status": "FILLED"}
+        body = json.dumps(response)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+class async_binance_api_test(unittest.TestCase):
+    
+    def start(self, concurrent_orders=1):
+        self.server = stub_binance(concurrent_orders)
+        self.server.start()
+        self.api = binance_api("key", "secret", api_url=self.server.api_url)
+        self.async_api = async_binance_api(self.api)
+    
+    def tearDown(self):
+        self.async_api.close()
+        self.api.close()
+        self.server.shutdown()
+        self.server.server_close()
+    
+    def test_calls_back_from_the_pool(self):
+        self.start()
+        called_from = []
+        result = self.async_api.get_order_book(symbol="XVGBTC", limit=5, callback=lambda book: called_from.append(current_thread()))
+        self.assertEqual(result.get(5)["bids"][0][0], "0.00000100")
+        self.assertEqual(len(called_from), 1)
+        self.assertIsNot(called_from[0], current_thread())
+    
+    def test_cancel_and_sell_are_in_flight_at_once(self):
+        self.start(concurrent_orders=2)
+        cancelling = self.async_api.cancel_order(symbol="XVGBTC", origClientOrderId="limit")
+        selling = self.async_api.create_order(symbol="XVGBTC", side="SELL", type="MARKET", quantity="5")
+        self.assertEqual(cancelling.get(10)["status"], "FILLED")
+        self.assertEqual(selling.get(10)["status"], "FILLED")
+        orders = [(method, params) for method, path, params in self.server.requests if path == "/api/v3/order"]
+        self.assertEqual(sorted(method for method, params in orders), ["DELETE", "POST"])
+        for method, params in orders:
+            self.assertIn("signature", params)
+            self.assertIn("timestamp", params)
+    
+    def test_reports_errors_to_on_error(self):
+        self.start()
+        errors = []
+        result = self.async_api.submit(self.api.get_ticker, callback=self.fail, on_error=errors.append)
+        self.assertRaises(BinanceAPIException, result.get, 5)
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0].code, -1121)
+    
+    def test_submit_runs_several_requests_off_the_caller_thread(self):
+        self.start()
+        def enter():
+            alt = self.api.get_ticker(symbol="XVGBTC")
+            book = self.api.get_order_book(symbol="XVGBTC", limit=5)
+            return current_thread(), alt["askPrice"], book["lastUpdateId"]
+        ran_on, ask, last_update_id = self.async_api.submit(enter).get(5)
+        self.assertIsNot(ran_on, current_thread())
+        self.assertEqual((ask, last_update_id), ("0.00000101", 1))
+
+if __name__ == "__main__":
+    unittest.main()
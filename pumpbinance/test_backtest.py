@@ -0,0 +1,32 @@
+import unittest
+import numpy
+import backtest
+from backtest import book_series, evaluate, market_sell_btc, trailing_exit_tick, MARKET
+
+def series(*best_bids):
+    '''
+    One bid and one ask level per tick, the ask a satoshi above the bid.
+    '''
+    bid_prices = numpy.array(best_bids, dtype=float)[:, None] * backtest.satoshi
+    quantities = numpy.full(bid_prices.shape, 1e9)
+    return book_series(bid_prices, quantities, bid_prices + backtest.satoshi, quantities)
+
+class trailing_backtest_test(unittest.TestCase):
+    
+    def test_trailing_stop_sells_once_the_bid_falls_from_its_peak(self):
+        pump = series(99, 120, 160, 200, 185, 180, 170)
+        # Entered at an ask of 100, so a 50% target is reached at a bid of 150.
+        thresholds = numpy.array([150, 250]) * backtest.satoshi
+        self.assertEqual(list(trailing_exit_tick(pump, thresholds, 0.1)), [5, 7])
+    
+    def test_evaluate_sells_at_the_trailing_exit(self):
+        pump = series(99, 120, 160, 200, 185, 180, 170)
+        pnl = evaluate(pump, MARKET, 0.01, numpy.array([0.5]), numpy.array([-0.25]), trailing_stop=0.1)
+        alt = 0.01 / (100 * backtest.satoshi) * backtest.fee
+        expected = market_sell_btc(pump, numpy.array([5]), alt)[0] * backtest.fee - 0.01
+        self.assertAlmostEqual(pnl[0, 0], expected)
+        # Without it the pump sells at the target.
+        self.assertLess(evaluate(pump, MARKET, 0.01, numpy.array([0.5]), numpy.array([-0.25]))[0, 0], pnl[0, 0])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+from decimal import Decimal
+import unittest
+from balance_cache import balance_cache
+
+class account_api(object):
+    '''
+    Serves get_account from the balances and update time it is given.
+    '''
+    
+    def __init__(self, update_time, **balances):
+        self.update_time = update_time
+        self.balances = balances
+    
+    def get_account(self):
+        return {"updateTime": self.update_time,
+                "balances": [{"asset": asset, "free": free, "locked": "0"} for asset, free in self.balances.items()]}
+
+class balance_cache_test(unittest.TestCase):
+    
+    def test_ignores_updates_older_than_the_balance(self):
+        balances = balance_cache(account_api(100, BTC="1.0"))
+        balances.reconcile()
+        balances.update({"BTC": Decimal("0.5")}, 200)
+        balances.update({"BTC": Decimal("0.8")}, 150)
+        self.assertEqual(balances.get("BTC"), Decimal("0.5"))
+    
+    def test_reconcile_keeps_balances_updated_after_the_account(self):
+        api = account_api(100, BTC="1.0", XVG="0")
+        balances = balance_cache(api)
+        balances.reconcile()
+        balances.update({"XVG": Decimal("500")}, 300)
+        api.update_time, api.balances = 200, {"BTC": "0.9", "XVG": "0"}
+        balances.reconcile()
+        self.assertEqual(balances.get("XVG"), Decimal("500"))
+        self.assertEqual(balances.get("BTC"), Decimal("0.9"))
+    
+    def test_stops_reconciling(self):
+        balances = balance_cache(account_api(100, BTC="1.0"))
+        reconcile_thread = balances.start_reconciling(interval=0.01)
+        balances.stop_reconciling()
+        reconcile_thread.join(5)
+        self.assertFalse(reconcile_thread.is_alive())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+from decimal import Decimal
+import unittest
+import urlparse
+import fixed_point
+from offline_binance import offline_api
+from pumper import pumper
+from symbol_filters import symbol_filters
+
+class limit_order_test(unittest.TestCase):
+    
+    def setUp(self):
+        # Whole coins and a one satoshi tick size.
+        filters = symbol_filters(fixed_point.ONE, fixed_point.ONE, 1, 1, 1)
+        self.api = offline_api({"clientOrderId": "abc"}, filters)
+        self.pump = pumper()
+    
+    def sent(self):
+        return dict(urlparse.parse_qsl(self.api.last_request.body))
+    
+    def test_sub_microbitcoin_buy_price_is_not_in_scientific_notation(self):
+        self.assertEqual(str(Decimal("0.00000050")), "5.0E-7")
+        self.api.limit_buy(Decimal("1000.7"), self.pump, "XVGBTC", Decimal("0.00000050"), True)
+        sent = self.sent()
+        self.assertEqual(sent["price"], "0.00000050")
+        self.assertEqual(sent["quantity"], "1000")
+        self.assertEqual(self.pump.limit_order_id, "abc")
+    
+    def test_sub_microbitcoin_sell_price_is_not_in_scientific_notation(self):
+        self.pump.alt_ticker = "XVG"
+        self.pump.alt_holdings = Decimal("250")
+        self.api.limit_sell(self.pump, Decimal("0.000000509"))
+        sent = self.sent()
+        self.assertEqual(sent["price"], "0.00000050")
+        self.assertEqual(sent["quantity"], "250")
+
+if __name__ == "__main__":
+    unittest.main()
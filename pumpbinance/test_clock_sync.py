@@ -0,0 +1,50 @@
+from threading import Event
+import unittest
+from clock_sync import clock_offset_estimator, sample_window
+
+class clock_offset_estimator_test(unittest.TestCase):
+    
+    def test_keeps_the_sign_of_the_offset(self):
+        clock = clock_offset_estimator()
+        clock.add_sample(1000, 750, 1020)
+        self.assertEqual(clock.offset_ms, -260)
+        self.assertEqual(clock.round_trip_ms, 20)
+    
+    def test_uses_the_sample_with_the_smallest_round_trip(self):
+        clock = clock_offset_estimator()
+        clock.add_sample(1000, 1300, 1100)
+        clock.add_sample(2000, 2260, 2020)
+        clock.add_sample(3000, 3400, 3300)
+        self.assertEqual(clock.offset_ms, 250)
+        self.assertEqual(clock.round_trip_ms, 20)
+    
+    def test_date_headers_do_not_push_out_exact_samples(self):
+        clock = clock_offset_estimator()
+        clock.add_sample(1000, 1260.4, 1020)
+        for i in range(sample_window * 2):
+            clock.add_date_header(2000 + i * 1000, "Wed, 21 Oct 2015 07:28:00 GMT", 2005 + i * 1000)
+        self.assertAlmostEqual(clock.offset_ms, 250.4)
+        self.assertEqual(clock.round_trip_ms, 20)
+    
+    def test_uses_date_headers_until_there_is_an_exact_sample(self):
+        clock = clock_offset_estimator()
+        # 07:28:00 GMT, the server read its clock somewhere in the following second.
+        server_ms = 1445412480000
+        clock.add_date_header(server_ms - 100, "Wed, 21 Oct 2015 07:28:00 GMT", server_ms - 80)
+        self.assertEqual(clock.offset_ms, 590)
+        self.assertTrue(clock.wait_until_synced(0))
+    
+    def test_stop_ends_the_sampling_thread(self):
+        clock = clock_offset_estimator()
+        sampled = Event()
+        def sample():
+            clock.add_sample(0, 0, 0)
+            sampled.set()
+        sync_thread = clock.start(sample, interval=60)
+        self.assertTrue(sampled.wait(5))
+        clock.stop()
+        sync_thread.join(5)
+        self.assertFalse(sync_thread.is_alive())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import os
+import shutil
+import tempfile
+import unittest
+from console_log import console_log
+
+class console_log_test(unittest.TestCase):
+    
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, "console.log")
+    
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+    
+    def test_only_the_last_lines_are_rendered(self):
+        console = console_log(3)
+        for i in range(10):
+            console.append("line %d" % i)
+        self.assertEqual(console.render(), "line 7\nline 8\nline 9")
+    
+    def test_render_clears_changed(self):
+        console = console_log(3)
+        self.assertFalse(console.changed)
+        console.append("line")
+        self.assertTrue(console.changed)
+        console.render()
+        self.assertFalse(console.changed)
+    
+    def test_every_line_is_spooled_when_flushed(self):
+        console = console_log(2, self.filename)
+        for i in range(5):
+            console.append("line %d" % i)
+        # Nothing is written until the flush.
+        self.assertEqual(open(self.filename).read(), "")
+        console.flush()
+        console.append("line 5")
+        console.close()
+        self.assertEqual(open(self.filename).read(), "".join("line %d\n" % i for i in range(6)))
+    
+    def test_without_a_spool_nothing_is_kept_for_it(self):
+        console = console_log(2)
+        console.append("line")
+        console.flush()
+        console.close()
+        self.assertEqual(len(console._unspooled), 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+from decimal import Decimal
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+import unittest
+import event_log
+
+class event_log_test(unittest.TestCase):
+    
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, "bot.jsonl")
+        self.log = event_log.event_log(self.filename, flush_interval=0.01)
+    
+    def tearDown(self):
+        self.log.close()
+        shutil.rmtree(self.directory)
+    
+    def records(self):
+        with open(self.filename) as log_file:
+            return [json.loads(line) for line in log_file]
+    
+    def test_records_are_flushed_while_the_log_is_open(self):
+        self.log.emit("pump_started", "abc", symbol="XVGBTC", btc_to_use=Decimal("0.01"))
+        deadline = time.time() + 5
+        while not self.records() and time.time() < deadline:
+            time.sleep(0.01)
+        records = self.records()
+        self.assertEqual(len(records), 1)
+        record = records[0]
+        self.assertEqual(record["event"], "pump_started")
+        self.assertEqual(record["pump"], "abc")
+        self.assertEqual(record["symbol"], "XVGBTC")
+        # Decimals are written as strings so no precision is lost.
+        self.assertEqual(record["btc_to_use"], "0.01")
+        self.assertIn("t", record)
+        self.assertIn("time", record)
+    
+    def test_close_writes_every_record_in_order(self):
+        for i in range(100):
+            self.log.emit("console", line=i)
+        self.log.close()
+        records = self.records()
+        self.assertEqual([record["line"] for record in records], range(100))
+        # Without a pump the record has no correlation id.
+        self.assertNotIn("pump", records[0])
+        times = [record["t"] for record in records]
+        self.assertEqual(times, sorted(times))
+    
+    def test_logging_records_become_log_events(self):
+        logger = logging.getLogger("event_log_test")
+        logger.propagate = False
+        handler = event_log.event_log_handler(self.log)
+        logger.addHandler(handler)
+        try:
+            logger.warning("Stream closed %s", "XVGBTC")
+        finally:
+            logger.removeHandler(handler)
+        self.log.close()
+        record = self.records()[0]
+        self.assertEqual((record["event"], record["level"], record["logger"], record["message"]),
+                         ("log", "WARNING", "event_log_test", "Stream closed XVGBTC"))
+
+class monotonic_test(unittest.TestCase):
+    
+    def test_monotonic_never_goes_back(self):
+        times = [event_log.monotonic() for i in range(1000)]
+        self.assertEqual(times, sorted(times))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+from decimal import Decimal, ROUND_CEILING
+import unittest
+import fixed_point
+
+class fixed_point_test(unittest.TestCase):
+    
+    def test_parses_exchange_strings(self):
+        self.assertEqual(fixed_point.parse("0.00012345"), 12345)
+        self.assertEqual(fixed_point.parse("12"), 12 * fixed_point.ONE)
+        self.assertEqual(fixed_point.parse("1.5"), 150000000)
+        # Past the eighth decimal is truncated.
+        self.assertEqual(fixed_point.parse("0.000000019"), 1)
+    
+    def test_writes_exchange_strings(self):
+        self.assertEqual(fixed_point.to_string(12345), "0.00012345")
+        self.assertEqual(fixed_point.to_string(-150000000), "-1.50000000")
+        self.assertEqual(fixed_point.to_string(123456789, 2), "1.23")
+        self.assertEqual(fixed_point.to_string(199999999, 0), "1")
+    
+    def test_converts_decimals(self):
+        self.assertEqual(fixed_point.to_decimal(12345), Decimal("0.00012345"))
+        self.assertEqual(fixed_point.from_decimal(Decimal("0.000000019")), 1)
+        self.assertEqual(fixed_point.from_decimal(Decimal("0.000000011"), ROUND_CEILING), 2)
+        self.assertEqual(fixed_point.from_decimal(fixed_point.to_decimal(987654321)), 987654321)
+    
+    def test_multiplies_and_divides_rounding_down(self):
+        self.assertEqual(fixed_point.multiply(fixed_point.parse("1.5"), fixed_point.parse("0.00000003")), 4)
+        self.assertEqual(fixed_point.divide(fixed_point.parse("1"), fixed_point.parse("3")), 33333333)
+        self.assertEqual(fixed_point.divide(fixed_point.parse("0.0001"), fixed_point.parse("0.00000100")), fixed_point.parse("100"))
+    
+    def test_steps(self):
+        step = fixed_point.parse("0.001")
+        self.assertEqual(fixed_point.floor_to_step(fixed_point.parse("1.23456"), step), fixed_point.parse("1.234"))
+        self.assertEqual(fixed_point.floor_to_step(fixed_point.parse("1.234"), step), fixed_point.parse("1.234"))
+        self.assertEqual(fixed_point.decimals_in_step(step), 3)
+        self.assertEqual(fixed_point.decimals_in_step(fixed_point.parse("1")), 0)
+        self.assertEqual(fixed_point.decimals_in_step(1), 8)
+        self.assertEqual(fixed_point.step_for_decimals(3), step)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import unittest
+import urllib2
+from latency_stats import histogram, latency_stats, serve_metrics, SUB_BUCKET_BITS, DECISION, SIGNATURE, TICK_TO_TRADE
+import latency_stats as latency_stats_module
+
+class histogram_test(unittest.TestCase):
+    
+    def setUp(self):
+        self.histogram = histogram()
+    
+    def record_us(self, us):
+        self.histogram.record(us / 1e6)
+    
+    def test_small_values_have_a_bucket_each(self):
+        for us in range(1 << SUB_BUCKET_BITS):
+            self.assertEqual(self.histogram._index(us), us)
+            self.assertEqual(self.histogram._highest_in_bucket(us), us)
+    
+    def test_buckets_above_the_sub_buckets_hold_two_values_per_step(self):
+        h = self.histogram
+        # 128 and 129 differ only in the bit that is dropped.
+        self.assertEqual(h._index(128), 128)
+        self.assertEqual(h._index(129), 128)
+        self.assertEqual(h._index(130), 129)
+        self.assertEqual(h._highest_in_bucket(128), 129)
+        self.assertEqual(h._index(255), h._index(254))
+        self.assertEqual(h._index(256), h._index(255) + 1)
+    
+    def test_buckets_hold_their_values_within_the_precision(self):
+        h = self.histogram
+        previous = -1
+        for us in range(0, 10**6, 7) + [2**31 - 1, 2**31, 2**38]:
+            index = h._index(us)
+            self.assertTrue(index >= previous)
+            previous = index
+            highest = h._highest_in_bucket(index)
+            self.assertTrue(us <= highest <= us + us / 64, (us, highest))
+    
+    def test_values_past_the_highest_bucket_are_kept_in_it(self):
+        h = self.histogram
+        last = len(h._counts) - 1
+        self.assertEqual(h._index(2**60), last)
+        self.record_us(2**60)
+        # The percentile is capped at the highest bucket, the maximum keeps the value.
+        self.assertEqual(h.percentile(0.5), h._highest_in_bucket(last))
+        self.assertEqual(h.max_us, 2**60)
+    
+    def test_percentiles_of_one_to_a_hundred(self):
+        for us in range(1, 101):
+            self.record_us(us)
+        h = self.histogram
+        self.assertEqual([h.percentile(q) for q in (0.5, 0.9, 0.99, 0.999)], [50, 90, 99, 100])
+        self.assertEqual(h.count, 100)
+        self.assertEqual(h.total_us, 5050)
+        self.assertEqual(h.max_us, 100)
+    
+    def test_percentile_is_the_top_of_its_bucket_but_never_above_the_max(self):
+        self.record_us(200)
+        self.record_us(1000)
+        # 200 shares its bucket with 201.
+        self.assertEqual(self.histogram.percentile(0.5), 201)
+        self.assertEqual(self.histogram.percentile(1), 1000)
+    
+    def test_microseconds_are_rounded(self):
+        self.record_us(249)
+        self.assertEqual(self.histogram.max_us, 249)
+    
+    def test_empty_and_negative(self):
+        self.assertEqual(self.histogram.percentile(0.99), 0)
+        self.histogram.record(-0.5)
+        self.assertEqual(self.histogram.percentile(0.99), 0)
+
+class latency_stats_test(unittest.TestCase):
+    
+    def setUp(self):
+        self.stats = latency_stats()
+    
+    def test_marks_without_a_trace_are_not_recorded(self):
+        self.stats.mark(DECISION)
+        self.stats.mark_sent()
+        self.stats.begin()
+        self.stats.mark(DECISION)
+        self.stats.mark_sent()
+        self.stats.end()
+        self.stats.mark(DECISION)
+        self.assertEqual(self.stats.histograms[DECISION].count, 1)
+        self.assertEqual(self.stats.histograms[TICK_TO_TRADE].count, 1)
+    
+    def test_summary_lines_only_have_recorded_stages(self):
+        for us in range(1, 101):
+            self.stats.record(SIGNATURE, us / 1e6)
+        self.assertEqual(self.stats.summary_lines(),
+                         ["signature n=100 p50=0.050ms p90=0.090ms p99=0.099ms p99.9=0.100ms max=0.100ms"])
+    
+    def test_prometheus_text_is_in_seconds(self):
+        self.stats.record(SIGNATURE, 0.001)
+        text = self.stats.prometheus_text()
+        self.assertIn('pumpbinance_stage_latency_seconds{stage="signature",quantile="0.5"} 0.001\n', text)
+        self.assertIn('pumpbinance_stage_latency_seconds_count{stage="signature"} 1\n', text)
+        self.assertIn('pumpbinance_stage_latency_seconds_count{stage="decision"} 0\n', text)
+
+class serve_metrics_test(unittest.TestCase):
+    
+    def test_metrics_are_served(self):
+        server = serve_metrics(0)
+        try:
+            url = "http://127.0.0.1:%d" % server.server_address[1]
+            body = urllib2.urlopen(url + "/metrics", timeout=5).read()
+            self.assertEqual(body, latency_stats_module.stats.prometheus_text())
+            with self.assertRaises(urllib2.HTTPError):
+                urllib2.urlopen(url + "/other", timeout=5)
+        finally:
+            server.shutdown()
+            server.server_close()
+    
+    def test_port_in_use_is_not_served(self):
+        server = serve_metrics(0)
+        try:
+            self.assertIsNone(serve_metrics(server.server_address[1]))
+        finally:
+            server.shutdown()
+            server.server_close()
+
+if __name__ == "__main__":
+    unittest.main()
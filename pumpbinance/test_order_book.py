@@ -0,0 +1,120 @@
+import json
+import unittest
+import order_book
+from order_book import depth_stream
+
+def depth_event(first_update_id, final_update_id, bids=(), asks=(), event_time=0):
+    return {"e": "depthUpdate", "E": event_time, "s": "XVGBTC", "U": first_update_id, "u": final_update_id,
+            "b": [list(bid) for bid in bids], "a": [list(ask) for ask in asks]}
+
+def snapshot(last_update_id, bids, asks=()):
+    return {"lastUpdateId": last_update_id, "bids": [list(bid) for bid in bids], "asks": [list(ask) for ask in asks]}
+
+class snapshot_api(object):
+    '''
+    Serves the depth snapshots in order, the last one from then on.
+    '''
+    
+    def __init__(self, *snapshots):
+        self.snapshots = list(snapshots)
+        self.requests = 0
+    
+    def get_order_book(self, **params):
+        self.requests += 1
+        if len(self.snapshots) > 1:
+            return self.snapshots.pop(0)
+        return self.snapshots[0]
+
+class scripted_sockets(object):
+    '''
+    Stands in for websocket.WebSocketApp. Every connection opens, sends its messages and drops,
+    the stream is stopped once the last one has.
+    '''
+    
+    def __init__(self, *connections):
+        self.connections = list(connections) # Lists of events, one per connection
+        self.stream = None
+        self.urls = []
+    
+    def __call__(self, url, on_open=None, on_message=None, on_error=None, on_close=None):
+        self.urls.append(url)
+        return scripted_socket(self, self.connections.pop(0), on_open, on_message, on_close)
+
+class scripted_socket(object):
+    
+    def __init__(self, sockets, events, on_open, on_message, on_close):
+        self.sockets = sockets
+        self.events = events
+        self.on_open = on_open
+        self.on_message = on_message
+        self.on_close = on_close
+    
+    def run_forever(self):
+        self.on_open(self)
+        for event in self.events:
+            self.on_message(self, json.dumps(event))
+        if not self.sockets.connections:
+            self.sockets.stream.stop()
+        self.on_close(self, None, None)
+    
+    def close(self):
+        pass
+
+class depth_stream_test(unittest.TestCase):
+    
+    def setUp(self):
+        self.reconnect_delay = order_book.reconnect_delay
+        order_book.reconnect_delay = 0
+        self.bids = [] # Every on_bids call as (bids, reset)
+    
+    def tearDown(self):
+        order_book.reconnect_delay = self.reconnect_delay
+    
+    def run_stream(self, api, *connections):
+        sockets = scripted_sockets(*connections)
+        stream = depth_stream(api, "XVGBTC", on_bids=lambda bids, reset: self.bids.append((bids, reset)), websocket_app=sockets)
+        sockets.stream = stream
+        stream.start().join(5)
+        return stream
+    
+    def test_applies_events_after_the_snapshot(self):
+        api = snapshot_api(snapshot(10, [("0.00000100", "5")], [("0.00000110", "5")]))
+        stream = self.run_stream(api, [depth_event(9, 11, bids=[("0.00000101", "2")]),
+                                       depth_event(12, 12, bids=[("0.00000100", "0")], asks=[("0.00000105", "1")])])
+        self.assertEqual(stream.book.snapshot(), snapshot(12, [("0.00000101", "2")], [("0.00000105", "1"), ("0.00000110", "5")]))
+        self.assertEqual(api.requests, 1)
+        self.assertEqual(self.bids[0], ([["0.00000100", "5"]], True))
+    
+    def test_drops_events_already_in_the_snapshot(self):
+        api = snapshot_api(snapshot(10, [("0.00000100", "5")]))
+        stream = self.run_stream(api, [depth_event(5, 8, bids=[("0.00000100", "0")]),
+                                       depth_event(9, 10, bids=[("0.00000099", "1")])])
+        self.assertEqual(stream.book.snapshot(), snapshot(10, [("0.00000100", "5")]))
+        self.assertEqual(api.requests, 1)
+        self.assertEqual(len(self.bids), 1)
+    
+    def test_resyncs_after_a_gap(self):
+        api = snapshot_api(snapshot(10, [("0.00000100", "5")]), snapshot(20, [("0.00000102", "3")]))
+        stream = self.run_stream(api, [depth_event(11, 12, bids=[("0.00000101", "1")]),
+                                       depth_event(15, 16, bids=[("0.00000099", "1")]),
+                                       depth_event(21, 21, bids=[("0.00000103", "4")])])
+        self.assertEqual(api.requests, 2)
+        self.assertEqual(stream.book.snapshot(), snapshot(21, [("0.00000103", "4"), ("0.00000102", "3")]))
+        self.assertEqual([reset for bids, reset in self.bids], [True, False, True, False])
+    
+    def test_reconnects_and_resyncs_after_a_disconnect(self):
+        api = snapshot_api(snapshot(10, [("0.00000100", "5")]), snapshot(30, [("0.00000104", "2")]))
+        stream = self.run_stream(api, [depth_event(11, 11, bids=[("0.00000101", "1")])],
+                                      [depth_event(25, 31, bids=[("0.00000105", "1")])])
+        self.assertEqual(api.requests, 2)
+        self.assertEqual(stream.book.snapshot(), snapshot(31, [("0.00000105", "1"), ("0.00000104", "2")]))
+        self.assertFalse(stream.synced)
+    
+    def test_is_not_synced_before_the_first_snapshot(self):
+        stream = depth_stream(snapshot_api(snapshot(1, [])), "XVGBTC")
+        self.assertFalse(stream.synced)
+        stream.resync()
+        self.assertTrue(stream.synced)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+import fixed_point
+from binance_api import BinanceAPIException
+from protective_orders import protective_orders, TAKE_PROFIT, STOP_LOSS
+
+class error_response(object):
+    '''
+    The parts of a requests response BinanceAPIException reads.
+    '''
+    
+    def __init__(self, code, msg):
+        self.status_code = 400
+        self.body = {"code": code, "msg": msg}
+    
+    def json(self):
+        return self.body
+
+class oco_api(object):
+    '''
+    Accepts the OCO sell, then answers its cancel and queries with the orders it is given.
+    '''
+    
+    def __init__(self):
+        self.legs = {} # Leg -> client order id
+        self.orders = {} # Leg -> get_order response
+        self.cancel_reports = [] # orderReports of a successful cancel
+        self.cancel_error = None
+    
+    def place_oco_sell(self, ticker, alt_amount, price, stop_price, stop_limit_price, list_client_order_id, limit_client_order_id, stop_client_order_id):
+        self.legs = {TAKE_PROFIT: limit_client_order_id, STOP_LOSS: stop_client_order_id}
+    
+    def cancel_order_list(self, **params):
+        if self.cancel_error is not None:
+            raise BinanceAPIException(error_response(*self.cancel_error))
+        return {"orderReports": [dict(report, origClientOrderId=self.legs[leg]) for leg, report in self.cancel_reports]}
+    
+    def get_order(self, **params):
+        for leg, client_order_id in self.legs.items():
+            if client_order_id == params["origClientOrderId"]:
+                return self.orders[leg]
+
+class watching_stream(object):
+    '''
+    Stands in for user_data_stream, only keeps track of what is watched.
+    '''
+    
+    def __init__(self):
+        self.watchers = {}
+    
+    def watch(self, client_order_id, symbol, on_execution):
+        self.watchers[client_order_id] = on_execution
+    
+    def unwatch(self, client_order_id):
+        self.watchers.pop(client_order_id, None)
+
+class filled_order(object):
+    '''
+    The order_state of a leg the stream reports as filled.
+    '''
+    
+    def __init__(self, client_order_id, executed, quote):
+        self.client_order_id = client_order_id
+        self.status = "FILLED"
+        self.executed_quantity = fixed_point.parse(executed)
+        self.quote_quantity = fixed_point.parse(quote)
+        self.commission = {"BNB": 1}
+
+def order(status, executed, quote):
+    return {"status": status, "executedQty": executed, "cummulativeQuoteQty": quote}
+
+class protective_orders_test(unittest.TestCase):
+    
+    def setUp(self):
+        self.api = oco_api()
+        self.stream = watching_stream()
+        self.fills = [] # Every on_fill call
+        self.orders = protective_orders(self.api, self.stream, "XVGBTC", True, lambda *fill: self.fills.append(fill))
+        self.orders.place(fixed_point.parse("100"), fixed_point.parse("0.00000120"), fixed_point.parse("0.00000090"))
+    
+    def test_reports_what_was_sold_before_the_cancel(self):
+        self.api.cancel_reports = [(TAKE_PROFIT, order("CANCELED", "40", "0.000048")), (STOP_LOSS, order("CANCELED", "0", "0"))]
+        self.orders.cancel()
+        self.assertEqual(self.fills, [(TAKE_PROFIT, fixed_point.parse("40"), fixed_point.parse("0.000048"), fixed_point.parse("0.000048"), False)])
+        self.assertFalse(self.orders.active)
+        self.assertEqual(self.stream.watchers, {})
+    
+    def test_queries_the_legs_when_one_filled_before_the_cancel(self):
+        self.api.cancel_error = (-2011, "Order list does not exist.")
+        self.api.orders = {TAKE_PROFIT: order("FILLED", "100", "0.00012"), STOP_LOSS: order("EXPIRED", "0", "0")}
+        self.orders.cancel()
+        self.assertEqual(self.fills, [(TAKE_PROFIT, fixed_point.parse("100"), fixed_point.parse("0.00012"), fixed_point.parse("0.00012"), False)])
+        self.assertFalse(self.orders.active)
+        self.assertEqual(self.stream.watchers, {})
+    
+    def test_keeps_watching_when_the_cancel_fails_with_a_leg_open(self):
+        self.api.cancel_error = (-1021, "Timestamp for this request is outside of the recvWindow.")
+        self.api.orders = {TAKE_PROFIT: order("NEW", "0", "0"), STOP_LOSS: order("NEW", "0", "0")}
+        self.orders.cancel()
+        self.assertTrue(self.orders.active)
+        self.assertEqual(self.fills, [])
+        # The fill the stream reports afterwards still reaches the session.
+        limit_id = self.api.legs[TAKE_PROFIT]
+        self.stream.watchers[limit_id](filled_order(limit_id, "100", "0.00012"))
+        self.assertEqual(self.fills, [(TAKE_PROFIT, fixed_point.parse("100"), fixed_point.parse("0.00012"), fixed_point.parse("0.00012"), True)])
+        self.assertFalse(self.orders.active)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+from threading import Timer
+import unittest
+from pump_cli import pump_cli
+
+class finished(object):
+    '''
+    An AsyncResult that is already done.
+    '''
+    
+    def __init__(self, value=None):
+        self.value = value
+    
+    def get(self, timeout=None):
+        return self.value
+
+class running_sessions(object):
+    
+    def __init__(self, *tickers):
+        self.sessions = list(tickers)
+
+class pumping_engine(object):
+    '''
+    Stands in for pump_engine with some pumps running, selling one ends it.
+    '''
+    
+    def __init__(self, *tickers):
+        self.sessions = running_sessions(*tickers)
+        self.sold = []
+    
+    @property
+    def is_pumping(self):
+        return bool(self.sessions.sessions)
+    
+    def manual_sell(self, ticker=""):
+        sold, self.sessions.sessions = self.sessions.sessions, []
+        self.sold.extend(sold)
+        return [finished() for ticker in sold]
+
+class console(object):
+    
+    def __init__(self):
+        self.lines = []
+    
+    def write_to_console(self, line):
+        self.lines.append(line)
+
+class pump_cli_test(unittest.TestCase):
+    
+    def start(self, *tickers):
+        self.engine = pumping_engine(*tickers)
+        self.listener = console()
+        return pump_cli(self.engine, self.listener, None, None, None, True, True)
+    
+    def test_quits_when_nothing_is_running(self):
+        cli = self.start()
+        self.assertFalse(cli.execute("quit"))
+    
+    def test_refuses_to_quit_while_pumping(self):
+        cli = self.start("XVGBTC")
+        self.assertTrue(cli.execute("quit"))
+        self.assertEqual(self.engine.sold, [])
+        self.assertIn("quit --force", self.listener.lines[-1])
+    
+    def test_forced_quit_sells_first(self):
+        cli = self.start("XVGBTC", "TRXBTC")
+        self.assertFalse(cli.read_commands(["quit --force\n", "pump XVG\n"]))
+        self.assertEqual(self.engine.sold, ["XVGBTC", "TRXBTC"])
+    
+    def test_waits_for_the_pumps_at_the_end_of_the_commands(self):
+        cli = self.start("XVGBTC")
+        self.assertTrue(cli.read_commands([]))
+        finishing = Timer(0.05, self.engine.manual_sell)
+        finishing.start()
+        cli.wait_for_pumps(interval=0.01)
+        self.assertFalse(self.engine.is_pumping)
+        finishing.join()
+
+if __name__ == "__main__":
+    unittest.main()
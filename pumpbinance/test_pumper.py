@@ -0,0 +1,85 @@
+from decimal import Decimal
+import unittest
+from pumper import pumper, SELL_PROFIT, SELL_STOP_LOSS, SELL_TRAILING
+
+def bids(*satoshis):
+    return [["%.8f" % (price * 1e-8), "1000.00000000"] for price in satoshis]
+
+class trailing_stop_test(unittest.TestCase):
+    
+    def start(self, trailing_stop, stop_loss=Decimal("-0.25")):
+        pump = pumper()
+        pump.set_up(Decimal("0.01"), Decimal("0.5"), Decimal("0.00000100"), "XVG")
+        pump.stop_loss = stop_loss
+        pump.trailing_stop = trailing_stop
+        return pump
+    
+    def test_tracks_the_peak_once_the_target_is_reached(self):
+        pump = self.start(Decimal("0.1"))
+        self.assertEqual(pump.update_bids(bids(120)), None)
+        # Not armed below the target, however far the bid falls from its peak.
+        self.assertEqual(pump.update_bids(bids(100)), None)
+        self.assertEqual(pump.update_bids(bids(160)), None)
+        self.assertEqual(pump.update_bids(bids(200)), None)
+        self.assertEqual(pump.update_bids(bids(185)), None)
+        self.assertEqual(pump.peak_bid, Decimal("0.00000200"))
+        self.assertEqual(pump.update_bids(bids(180)), SELL_TRAILING)
+    
+    def test_does_not_sell_at_the_target(self):
+        pump = self.start(Decimal("0.1"))
+        self.assertNotEqual(pump.update_bids(bids(150)), SELL_PROFIT)
+        self.assertEqual(pumper().trailing_stop, None)
+        self.assertEqual(pump.trailing_stop, Decimal("0.1"))
+    
+    def test_trailing_exit_can_fire_below_the_starting_bid(self):
+        pump = self.start(Decimal("0.4"), stop_loss=Decimal("-0.5"))
+        self.assertEqual(pump.update_bids(bids(150)), None)
+        self.assertEqual(pump.update_bids(bids(95)), None)
+        self.assertEqual(pump.update_bids(bids(90)), SELL_TRAILING)
+    
+    def test_stop_loss_still_fires_before_the_target(self):
+        pump = self.start(Decimal("0.1"))
+        self.assertEqual(pump.update_bids(bids(140)), None)
+        self.assertEqual(pump.update_bids(bids(75)), SELL_STOP_LOSS)
+
+class threshold_test(unittest.TestCase):
+    
+    def setUp(self):
+        self.pump = pumper()
+        self.pump.set_up(Decimal("0.01"), Decimal("0.5"), Decimal("0.00000101"), "XVG")
+        self.pump.stop_loss = Decimal("-0.25")
+    
+    def test_target_threshold_is_rounded_up_to_a_satoshi(self):
+        # 151.5 satoshis, which no bid can be.
+        self.assertEqual(self.pump.fixed_bid_threshold, 152)
+        self.assertEqual(self.pump.update_bids(bids(151)), None)
+        self.assertEqual(self.pump.update_bids(bids(152)), SELL_PROFIT)
+    
+    def test_stop_loss_bid_is_rounded_down_to_a_satoshi(self):
+        # 75.75 satoshis
+        self.assertEqual(self.pump.fixed_stop_loss_bid, 75)
+        self.assertEqual(self.pump.update_bids(bids(76)), None)
+        self.assertEqual(self.pump.update_bids(bids(75)), SELL_STOP_LOSS)
+    
+    def test_counts_only_the_bids_above_the_threshold(self):
+        self.pump.alt_holdings = Decimal("1500")
+        self.assertEqual(self.pump.update_bids(bids(160, 152, 140)), SELL_PROFIT)
+        self.assertEqual(self.pump.usable_sell_quantity, Decimal("2000"))
+        self.assertTrue(self.pump.can_sell())
+        self.pump.alt_holdings = Decimal("2500")
+        self.assertFalse(self.pump.can_sell())
+    
+    def test_bid_levels_match_a_full_update(self):
+        self.assertEqual(self.pump.update_bid_levels(bids(160, 152, 140), reset=True), SELL_PROFIT)
+        self.assertEqual(self.pump.update_bid_levels([["0.00000160", "0"], ["0.00000155", "500"]]), SELL_PROFIT)
+        self.assertEqual(self.pump.usable_sell_quantity, Decimal("1500"))
+        full = pumper()
+        full.set_up(Decimal("0.01"), Decimal("0.5"), Decimal("0.00000101"), "XVG")
+        full.update_bids([["0.00000155", "500"]] + bids(152, 140))
+        self.assertEqual(full.usable_sell_quantity, self.pump.usable_sell_quantity)
+        self.assertEqual(self.pump.update_bid_levels([["0.00000155", "0"], ["0.00000152", "0"]]), None)
+        self.assertEqual(self.pump.usable_sell_quantity, 0)
+        self.assertEqual(self.pump.current_profit_percentage, Decimal("0.00000140") / Decimal("0.00000101") - 1)
+
+if __name__ == "__main__":
+    unittest.main()
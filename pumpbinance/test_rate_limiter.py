@@ -0,0 +1,30 @@
+import unittest
+from rate_limiter import request_weight
+
+class request_weight_test(unittest.TestCase):
+    
+    def test_depth_weighs_more_for_more_levels(self):
+        self.assertEqual(request_weight("depth", {"symbol": "XVGBTC"}), 1)
+        self.assertEqual(request_weight("depth", {"symbol": "XVGBTC", "limit": "500"}), 5)
+        self.assertEqual(request_weight("depth", {"symbol": "XVGBTC", "limit": 1000}), 10)
+        self.assertEqual(request_weight("depth", {"symbol": "XVGBTC", "limit": 5000}), 50)
+    
+    def test_every_symbol_weighs_more_than_one(self):
+        self.assertEqual(request_weight("ticker/24hr", {"symbol": "XVGBTC"}), 1)
+        self.assertEqual(request_weight("ticker/24hr", {}), 40)
+        self.assertEqual(request_weight("openOrders", {"symbol": "XVGBTC"}), 3)
+        self.assertEqual(request_weight("openOrders", {}), 40)
+    
+    def test_reading_an_order_weighs_more_than_placing_it(self):
+        self.assertEqual(request_weight("order", {"symbol": "XVGBTC"}, "get"), 2)
+        self.assertEqual(request_weight("order", {"symbol": "XVGBTC"}, "post"), 1)
+        self.assertEqual(request_weight("order", {"symbol": "XVGBTC"}, "delete"), 1)
+        self.assertEqual(request_weight("order/oco", {"symbol": "XVGBTC"}, "post"), 1)
+    
+    def test_exchange_info_and_account(self):
+        self.assertEqual(request_weight("exchangeInfo", {}), 10)
+        self.assertEqual(request_weight("account", {}), 10)
+        self.assertEqual(request_weight("time", {}), 1)
+
+if __name__ == "__main__":
+    unittest.main()
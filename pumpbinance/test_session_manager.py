@@ -0,0 +1,150 @@
+from decimal import Decimal
+import json
+import unittest
+from threading import Event
+from binance_api import BinanceAPIException, BinanceOrderUnknownSymbolException
+from pumper import pumper
+from session_manager import market_data_feed, pump_session
+from test_order_book import depth_event, snapshot, snapshot_api
+
+class held_sockets(object):
+    '''
+    Stands in for websocket.WebSocketApp. The connection stays open until it is closed,
+    the test opens it and sends its messages from its own thread.
+    '''
+    
+    def __init__(self):
+        self.socket = None
+        self.connected = Event()
+    
+    def __call__(self, url, on_open=None, on_message=None, on_error=None, on_close=None):
+        self.socket = held_socket(on_open, on_message, on_close)
+        self.connected.set()
+        return self.socket
+
+class held_socket(object):
+    
+    def __init__(self, on_open, on_message, on_close):
+        self.on_open = on_open
+        self.on_message = on_message
+        self.on_close = on_close
+        self.closed = Event()
+    
+    def run_forever(self):
+        self.closed.wait(10)
+        self.on_close(self, None, None)
+    
+    def open(self):
+        self.on_open(self)
+    
+    def send(self, event):
+        self.on_message(self, json.dumps(event))
+    
+    def close(self):
+        self.closed.set()
+
+class market_data_feed_test(unittest.TestCase):
+    
+    def setUp(self):
+        self.sockets = held_sockets()
+        self.api = snapshot_api(snapshot(10, [("0.00000100", "5"), ("0.00000099", "2")]))
+        self.feed = market_data_feed(self.api, websocket_app=self.sockets)
+        self.first, self.second = [], [] # Every on_bids call as (bids, reset)
+        self.on_first = lambda bids, reset: self.first.append((bids, reset))
+        self.on_second = lambda bids, reset: self.second.append((bids, reset))
+        self.feed.subscribe("XVGBTC", self.on_first)
+        self.assertTrue(self.sockets.connected.wait(5))
+    
+    def tearDown(self):
+        self.feed.unsubscribe("XVGBTC", self.on_second)
+        self.feed.unsubscribe("XVGBTC", self.on_first)
+    
+    def test_second_subscriber_waits_for_the_snapshot(self):
+        self.feed.subscribe("XVGBTC", self.on_second)
+        # An empty book would look like the price crashed.
+        self.assertEqual(self.second, [])
+        self.sockets.socket.open()
+        expected = [([["0.00000100", "5"], ["0.00000099", "2"]], True)]
+        self.assertEqual(self.first, expected)
+        self.assertEqual(self.second, expected)
+    
+    def test_second_subscriber_is_seeded_with_the_synced_book(self):
+        self.sockets.socket.open()
+        self.sockets.socket.send(depth_event(11, 11, bids=[("0.00000101", "1")]))
+        self.feed.subscribe("XVGBTC", self.on_second)
+        self.assertEqual(self.second, [([["0.00000101", "1"], ["0.00000100", "5"], ["0.00000099", "2"]], True)])
+        self.sockets.socket.send(depth_event(12, 12, bids=[("0.00000100", "0")]))
+        self.assertEqual(self.first[-1], ([["0.00000100", "0"]], False))
+        self.assertEqual(self.second[-1], ([["0.00000100", "0"]], False))
+        self.assertEqual(self.api.requests, 1)
+    
+    def test_close_stops_the_streams(self):
+        self.feed.close()
+        self.assertTrue(self.sockets.socket.closed.is_set())
+        self.assertIsNone(self.feed.last_event_time("XVGBTC"))
+
+class rejected_response(object):
+    '''
+    Stands in for the requests.Response of a rejected order.
+    '''
+    
+    status_code = 400
+    
+    def json(self):
+        return {"code": -2010, "msg": "Account has insufficient balance for requested action."}
+
+class rejecting_api(object):
+    '''
+    Stands in for binance_api, every order is rejected by Binance.
+    '''
+    
+    def full_ticker_for(self, alt):
+        return alt + "BTC"
+    
+    def symbol_filters(self, ticker):
+        if ticker != "XVGBTC":
+            raise BinanceOrderUnknownSymbolException(ticker)
+        return type("filters", (object,), {"quantity_decimals": 0})
+    
+    def market_buy(self, btc_amount, ticker, use_bnb):
+        raise BinanceAPIException(rejected_response())
+    
+    def limit_buy(self, alt_amount, pumper, ticker, price, use_bnb):
+        raise BinanceAPIException(rejected_response())
+
+class console(object):
+    '''
+    Stands in for the session's listener.
+    '''
+    
+    def __init__(self):
+        self.lines = []
+    
+    def write_to_console(self, line):
+        self.lines.append(line)
+
+class rejected_entry_test(unittest.TestCase):
+    
+    def setUp(self):
+        self.console = console()
+        self.manager = type("manager", (object,), {"api": rejecting_api(), "recorder": None})
+        self.alt = {"askPrice": "0.00000101", "bidPrice": "0.00000099"}
+    
+    def enter(self, is_entry_market, ticker="XVG"):
+        session = pump_session(self.manager, pumper(), is_entry_market, True, self.console)
+        return session.enter(ticker, self.alt, Decimal("0.01"), Decimal("0.5"), Decimal("0.1"))
+    
+    def test_rejected_market_buy_is_reported(self):
+        self.assertFalse(self.enter(True))
+        self.assertEqual(self.console.lines, ["Account has insufficient balance for requested action."])
+    
+    def test_rejected_limit_buy_is_reported(self):
+        self.assertFalse(self.enter(False))
+        self.assertEqual(self.console.lines, ["Account has insufficient balance for requested action."])
+    
+    def test_unknown_symbol_is_reported(self):
+        self.assertFalse(self.enter(True, "NOPE"))
+        self.assertEqual(self.console.lines, ["Unknown symbol NOPEBTC"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+from decimal import Decimal
+import unittest
+import fixed_point
+from offline_binance import offline_api
+from pumper import pumper
+from sliced_exit import sliced_exit
+from symbol_filters import symbol_filters
+
+class sliced_exit_test(unittest.TestCase):
+    
+    def setUp(self):
+        # Whole coins, and orders of at least 0.0001 BTC.
+        filters = symbol_filters(fixed_point.ONE, fixed_point.ONE, 1, 1, fixed_point.parse("0.0001"))
+        self.response = {}
+        self.api = offline_api(self.response, filters)
+        self.pump = pumper()
+        self.pump.set_up(Decimal("0.01"), Decimal("0.5"), Decimal("0.00000100"), "XVG")
+        self.pump.alt_holdings = Decimal("1000.5")
+        self.exit = sliced_exit(self.api, self.pump, "XVGBTC", True)
+    
+    def fill(self, quantity, price, transact_time):
+        self.response.clear()
+        self.response.update({"side": "SELL", "executedQty": quantity, "cummulativeQuoteQty": fixed_point.to_string(fixed_point.multiply(fixed_point.parse(quantity), fixed_point.parse(price))),
+                              "transactTime": transact_time, "fills": []})
+    
+    def test_slices_are_sized_to_the_bids_above_the_threshold(self):
+        self.pump.update_bids([["0.00000160", "300.7"], ["0.00000150", "100"], ["0.00000140", "5000"]])
+        self.assertEqual(self.exit.next_slice(None), fixed_point.parse("400"))
+        self.pump.update_bids([["0.00000160", "5000"]])
+        # Never more than what is left, rounded to the step size.
+        self.assertEqual(self.exit.next_slice(None), fixed_point.parse("1000"))
+    
+    def test_too_small_a_slice_waits(self):
+        # 60 coins at the threshold are 0.00009 BTC, under the minimum order.
+        self.pump.update_bids([["0.00000150", "60"]])
+        self.assertIsNone(self.exit.next_slice(None))
+    
+    def test_sold_bids_are_not_counted_until_a_later_event(self):
+        self.pump.update_bids([["0.00000160", "700"]])
+        self.fill("700", "0.00000160", 1000)
+        self.exit.sell_slice(self.exit.next_slice(900))
+        self.assertEqual(self.exit.slices, 1)
+        self.assertEqual(self.exit.remaining, fixed_point.parse("300.5"))
+        # The event the slice was sold on still shows the bids it took.
+        self.assertIsNone(self.exit.next_slice(1000))
+        self.assertEqual(self.exit.next_slice(1001), fixed_point.parse("300"))
+    
+    def test_keeps_the_totals_of_every_sale(self):
+        self.exit.record(fixed_point.parse("600"), fixed_point.parse("0.00096"), fixed_point.parse("0.00095"))
+        self.exit.record(fixed_point.parse("400"), fixed_point.parse("0.0006"), fixed_point.parse("0.00059"))
+        self.assertEqual(self.exit.alt_sold, fixed_point.parse("1000"))
+        self.assertEqual(self.exit.btc_received, fixed_point.parse("0.00154"))
+        self.assertEqual(self.exit.average_price, Decimal("0.00000156"))
+        self.assertEqual(self.pump.alt_holdings, Decimal("0.5"))
+        self.assertTrue(self.exit.is_done())
+    
+    def test_entry_fills_subtract_what_was_sold(self):
+        self.exit.record(fixed_point.parse("300"), fixed_point.parse("0.00048"), fixed_point.parse("0.00048"))
+        self.exit.set_bought(fixed_point.parse("2000"))
+        self.assertEqual(self.pump.alt_holdings, Decimal("1700"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+import fixed_point
+from symbol_filters import symbol_filters, symbol_filter_cache
+
+XVG_FILTERS = [{"filterType": "PRICE_FILTER", "minPrice": "0.00000001", "maxPrice": "100000.00000000", "tickSize": "0.00000001"},
+               {"filterType": "LOT_SIZE", "minQty": "1.00000000", "maxQty": "90000000.00000000", "stepSize": "1.00000000"},
+               {"filterType": "MIN_NOTIONAL", "minNotional": "0.00100000"}]
+
+class exchange_info_api(object):
+    '''
+    Serves an exchangeInfo listing XVGBTC, counting the downloads.
+    '''
+    
+    def __init__(self):
+        self.downloads = 0
+    
+    def get_exchange_info(self):
+        self.downloads += 1
+        return {"symbols": [{"symbol": "XVGBTC", "filters": XVG_FILTERS}]}
+
+class symbol_filters_test(unittest.TestCase):
+    
+    def test_reads_exchange_info_filters(self):
+        filters = symbol_filters.from_exchange_info(dict((f["filterType"], f) for f in XVG_FILTERS))
+        self.assertEqual(filters.step_size, fixed_point.ONE)
+        self.assertEqual(filters.min_quantity, fixed_point.ONE)
+        self.assertEqual(filters.tick_size, 1)
+        self.assertEqual(filters.min_notional, fixed_point.parse("0.001"))
+        self.assertEqual((filters.quantity_decimals, filters.price_decimals), (0, 8))
+    
+    def test_missing_filters_allow_anything(self):
+        filters = symbol_filters.from_exchange_info({})
+        self.assertEqual((filters.min_quantity, filters.min_price, filters.min_notional), (0, 0, 0))
+        self.assertEqual(filters.quantity_decimals, 0)
+
+class symbol_filter_cache_test(unittest.TestCase):
+    
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, "exchange_info.json")
+        self.api = exchange_info_api()
+    
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+    
+    def test_downloads_once_and_reads_the_file_afterwards(self):
+        cache = symbol_filter_cache(self.api, self.filename)
+        self.assertEqual(self.api.downloads, 0)
+        self.assertEqual(cache.get("XVGBTC").min_notional, fixed_point.parse("0.001"))
+        self.assertIsNone(cache.get("TRXBTC"))
+        self.assertEqual(symbol_filter_cache(self.api, self.filename).get("XVGBTC").step_size, fixed_point.ONE)
+        self.assertEqual(self.api.downloads, 1)
+    
+    def test_downloads_again_once_expired(self):
+        with open(self.filename, "w") as cache_file:
+            json.dump({"savedAt": time.time() - 100, "symbols": {}}, cache_file)
+        cache = symbol_filter_cache(self.api, self.filename, ttl=10)
+        self.assertIsNotNone(cache.get("XVGBTC"))
+        self.assertEqual(self.api.downloads, 1)
+    
+    def test_downloads_when_the_file_is_unreadable(self):
+        with open(self.filename, "w") as cache_file:
+            cache_file.write("{")
+        symbol_filter_cache(self.api, self.filename).load()
+        self.assertEqual(self.api.downloads, 1)
+
+if __name__ == "__main__":
+    unittest.main()
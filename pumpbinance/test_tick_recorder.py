@@ -0,0 +1,41 @@
+import os
+import shutil
+import tempfile
+import unittest
+from tick_recorder import tick_recorder, read_ticks, DEPTH_SNAPSHOT, TICKER
+
+class tick_recorder_test(unittest.TestCase):
+    
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+    
+    def record(self, filename):
+        recorder = tick_recorder(os.path.join(self.directory, filename))
+        recorder.record_snapshot("XVGBTC", {"lastUpdateId": 7, "bids": [["0.00000100", "5.00000000"]], "asks": []})
+        recorder.record_ticker("XVGBTC", {"symbol": "XVGBTC", "askPrice": "0.00000101"})
+        return recorder
+    
+    def read(self, filename):
+        return [(kind, symbol, data) for kind, recorded_at, symbol, data in read_ticks(os.path.join(self.directory, filename))]
+    
+    def test_flushed_records_can_be_read_while_recording(self):
+        # A gzip member can only be read once it is closed.
+        recorder = self.record("ticks.bin")
+        recorder.flush()
+        self.assertEqual(self.read("ticks.bin"), [(DEPTH_SNAPSHOT, "XVGBTC", ([["0.00000100", "5.00000000"]], [], 7)),
+                                                  (TICKER, "XVGBTC", {"symbol": "XVGBTC", "askPrice": "0.00000101"})])
+        recorder.close()
+    
+    def test_drops_records_after_closing(self):
+        recorder = self.record("ticks.bin.gz")
+        recorder.close()
+        recorder.record_ticker("XVGBTC", {"symbol": "XVGBTC"})
+        recorder.flush()
+        recorder.close()
+        self.assertEqual(len(self.read("ticks.bin.gz")), 2)
+
+if __name__ == "__main__":
+    unittest.main()
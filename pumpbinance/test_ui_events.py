@@ -0,0 +1,47 @@
+import unittest
+from ui_events import ui_event_queue
+
+class ui_event_queue_test(unittest.TestCase):
+    
+    def setUp(self):
+        self.events = ui_event_queue()
+        self.calls = []
+    
+    def handler(self, *args):
+        self.calls.append(("handler",) + args)
+    
+    def other_handler(self, *args):
+        self.calls.append(("other_handler",) + args)
+    
+    def test_pushed_events_are_all_called_in_order(self):
+        self.events.push(self.handler, 1)
+        self.events.push(self.other_handler, 2, 3)
+        self.events.push(self.handler, 4)
+        self.assertEqual(self.calls, [])
+        self.events.drain()
+        self.assertEqual(self.calls, [("handler", 1), ("other_handler", 2, 3), ("handler", 4)])
+        self.events.drain()
+        self.assertEqual(len(self.calls), 3)
+    
+    def test_replaced_events_only_keep_the_latest(self):
+        for profit in range(100):
+            self.events.replace(self.handler, profit)
+        self.events.replace(self.other_handler, "balance")
+        self.events.drain()
+        self.assertEqual(sorted(self.calls), [("handler", 99), ("other_handler", "balance")])
+        self.events.drain()
+        self.assertEqual(len(self.calls), 2)
+    
+    def test_pushed_events_are_called_before_replaced_ones(self):
+        self.events.replace(self.handler, "profit")
+        self.events.push(self.other_handler, "started")
+        self.events.drain()
+        self.assertEqual(self.calls, [("other_handler", "started"), ("handler", "profit")])
+    
+    def test_event_pushed_by_a_handler_is_called_in_the_same_frame(self):
+        self.events.push(lambda: self.events.push(self.handler, "finished"))
+        self.events.drain()
+        self.assertEqual(self.calls, [("handler", "finished")])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+import fixed_point
+from user_data_stream import user_data_stream
+
+class order_api(object):
+    '''
+    Answers get_order with the orders it is given, by client order id.
+    '''
+    
+    def __init__(self, **orders):
+        self.orders = orders
+        self.queried = []
+    
+    def get_order(self, **params):
+        self.queried.append(params["origClientOrderId"])
+        return self.orders[params["origClientOrderId"]]
+
+def execution_report(client_order_id, status, executed, quote, execution_type="TRADE"):
+    return {"e": "executionReport", "E": 0, "s": "XVGBTC", "c": client_order_id, "x": execution_type, "X": status,
+            "z": executed, "Z": quote, "N": "BNB", "n": "0.001"}
+
+class user_data_stream_test(unittest.TestCase):
+    
+    def setUp(self):
+        self.api = order_api(entry={"status": "FILLED", "executedQty": "100", "cummulativeQuoteQty": "0.0001"})
+        self.stream = user_data_stream(self.api)
+        self.reports = [] # (status, executed quantity) of every on_execution call
+        self.order = self.stream.watch("entry", "XVGBTC", lambda order: self.reports.append((order.status, order.executed_quantity)))
+    
+    def reconnect(self):
+        self.stream._ws = ws = object()
+        self.stream._on_open(ws)
+    
+    def test_queries_watched_orders_after_reconnecting(self):
+        self.stream.on_event(execution_report("entry", "PARTIALLY_FILLED", "40", "0.00004"))
+        self.reconnect()
+        self.assertEqual(self.api.queried, ["entry"])
+        self.assertEqual(self.reports, [("PARTIALLY_FILLED", fixed_point.parse("40")), ("FILLED", fixed_point.parse("100"))])
+        self.assertTrue(self.stream.connected)
+    
+    def test_older_reports_do_not_undo_the_query(self):
+        self.reconnect()
+        # Sent before the query was answered, but read after it.
+        self.stream.on_event(execution_report("entry", "PARTIALLY_FILLED", "40", "0.00004"))
+        self.assertEqual(self.reports, [("FILLED", fixed_point.parse("100")), ("FILLED", fixed_point.parse("100"))])
+        self.assertEqual(self.order.commission, {"BNB": fixed_point.parse("0.001")})
+    
+    def test_closed_orders_are_not_queried(self):
+        self.stream.on_event(execution_report("entry", "CANCELED", "0", "0", execution_type="CANCELED"))
+        self.reconnect()
+        self.assertEqual(self.api.queried, [])
+
+if __name__ == "__main__":
+    unittest.main()
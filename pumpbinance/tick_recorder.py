@@ -0,0 +1,145 @@
+'''
+Append-only binary recording of the market data and order events of pumps, read back by tick_replay.
+
+The file starts with FILE_HEADER followed by records of:
+    uint32 body length, uint8 kind, float64 time.time() when recorded, body
+Depth bodies hold the symbol, the last update id and the levels as fixed-point int64 pairs.
+Ticker and order bodies hold the symbol and the event as JSON.
+Files ending in .gz are gzip compressed, appending to them adds a gzip member.
+'''
+from threading import Lock
+import gzip
+import json
+import os
+import struct
+import time
+import fixed_point
+
+FILE_HEADER = b"PBTICKS1"
+
+# Kinds of records
+DEPTH_SNAPSHOT = 1
+DEPTH_DIFF = 2
+TICKER = 3
+ORDER = 4
+
+_record_header = struct.Struct('<IBd')
+_depth_header = struct.Struct('<QII')
+
+def _open(filename, mode):
+    if filename.endswith('.gz'):
+        return gzip.open(filename, mode)
+    return open(filename, mode)
+
+def _encode_symbol(symbol):
+    symbol = symbol.encode('utf-8')
+    return struct.pack('<B', len(symbol)) + symbol
+
+def _encode_levels(levels):
+    flat = []
+    for level in levels:
+        flat.append(fixed_point.parse(level[0]))
+        flat.append(fixed_point.parse(level[1]))
+    return struct.pack('<%dq' % len(flat), *flat)
+
+def _decode_levels(body, offset, count):
+    flat = struct.unpack_from('<%dq' % (2 * count), body, offset)
+    return [[fixed_point.to_string(flat[i]), fixed_point.to_string(flat[i + 1])] for i in range(0, len(flat), 2)]
+
+class tick_recorder(object):
+    '''
+    Writes ticks to a file, can be shared by every stream and session.
+    '''
+    
+    def __init__(self, filename):
+        '''
+        :param filename: Compressed if it ends in .gz
+        '''
+        is_new = not os.path.exists(filename) or os.path.getsize(filename) == 0
+        self.filename = filename
+        self._file = _open(filename, 'ab')
+        if is_new:
+            self._file.write(FILE_HEADER)
+        self._closed = False
+        self._lock = Lock()
+    
+    def flush(self):
+        ''' Writes the buffered records to the file, e.g. when a pump starts or ends. '''
+        with self._lock:
+            if not self._closed:
+                self._file.flush()
+    
+    def close(self):
+        '''
+        Records from streams that are still stopping are dropped afterwards.
+        '''
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._file.close()
+    
+    def record_snapshot(self, symbol, book):
+        '''
+        :type book: dict in the format returned by binance_api.get_order_book
+        '''
+        self._record_depth(DEPTH_SNAPSHOT, symbol, book["bids"], book["asks"], book["lastUpdateId"])
+    
+    def record_diff(self, symbol, bids, asks, last_update_id):
+        '''
+        Pre: bids and asks are lists of [price, quantity] strings, see order_book.apply_diff
+        '''
+        self._record_depth(DEPTH_DIFF, symbol, bids, asks, last_update_id)
+    
+    def record_ticker(self, symbol, ticker):
+        '''
+        :type ticker: dict from binance_api.get_ticker
+        '''
+        self._write(TICKER, _encode_symbol(symbol) + json.dumps(ticker, separators=(',', ':')).encode('utf-8'))
+    
+    def record_order(self, symbol, event):
+        '''
+        :type event: An order response or executionReport event
+        '''
+        self._write(ORDER, _encode_symbol(symbol) + json.dumps(event, separators=(',', ':')).encode('utf-8'))
+    
+    def _record_depth(self, kind, symbol, bids, asks, last_update_id):
+        body = _encode_symbol(symbol) + _depth_header.pack(last_update_id, len(bids), len(asks)) + _encode_levels(bids) + _encode_levels(asks)
+        self._write(kind, body)
+    
+    def _write(self, kind, body):
+        record = _record_header.pack(len(body), kind, time.time()) + body
+        with self._lock:
+            if not self._closed:
+                self._file.write(record)
+
+def read_ticks(filename):
+    '''
+    Yields every record of a recording as (kind, recorded_at, symbol, data). The data of depth
+    records is a (bids, asks, last_update_id) tuple with the levels as [price, quantity] strings,
+    the data of ticker and order records is the recorded dict.
+    
+    A record cut short by the recorder stopping mid-write ends the recording.
+    '''
+    with _open(filename, 'rb') as recording:
+        if recording.read(len(FILE_HEADER)) != FILE_HEADER:
+            raise ValueError(filename + " is not a tick recording.")
+        while True:
+            header = recording.read(_record_header.size)
+            if len(header) < _record_header.size:
+                return
+            length, kind, recorded_at = _record_header.unpack(header)
+            body = recording.read(length)
+            if len(body) < length:
+                return
+            
+            symbol_length = struct.unpack_from('<B', body)[0]
+            symbol = body[1:1 + symbol_length].decode('utf-8')
+            offset = 1 + symbol_length
+            if kind == DEPTH_SNAPSHOT or kind == DEPTH_DIFF:
+                last_update_id, bid_count, ask_count = _depth_header.unpack_from(body, offset)
+                offset += _depth_header.size
+                bids = _decode_levels(body, offset, bid_count)
+                asks = _decode_levels(body, offset + 16 * bid_count, ask_count)
+                yield kind, recorded_at, symbol, (bids, asks, last_update_id)
+            else:
+                yield kind, recorded_at, symbol, json.loads(body[offset:].decode('utf-8'))
@@ -0,0 +1,150 @@
+'''
+Replays a tick_recorder recording through the pump decision loop, at the recorded speed or as
+fast as possible, to regression test strategy changes and measure tick throughput offline.
+
+Usage: python tick_replay.py recording symbol target_percentage stop_loss_percentage btc_to_use [speed] [trailing_percentage]
+e.g. python tick_replay.py ticks.bin.gz XVGBTC 50 -25 0.01
+A speed of 0 replays as fast as possible, so a trailing percentage can be given without a speed.
+'''
+from decimal import Decimal
+from timeit import default_timer
+import sys
+import time
+from helper_methods import btc_to_alt, readable_btc_balance
+from order_book import order_book
+from pumper import pumper, SELL_PROFIT, SELL_STOP_LOSS, SELL_TRAILING
+from tick_recorder import read_ticks, DEPTH_SNAPSHOT, DEPTH_DIFF, TICKER, ORDER
+import fixed_point
+
+class tick_replay(object):
+    '''
+    Feeds a recording to callbacks the way market_data_feed and user_data_stream would.
+    '''
+    
+    def __init__(self, filename, symbol=None, speed=None):
+        '''
+        :param symbol: optional, only this symbol's ticks are replayed.
+        :param speed: None replays as fast as possible, 1.0 at the recorded speed, 2.0 twice as fast.
+        '''
+        self.filename = filename
+        self.symbol = symbol
+        self.speed = speed
+        self.books = {} # Symbol -> order_book rebuilt from the recording
+    
+    def run(self, on_bids=None, on_book=None, on_ticker=None, on_order=None):
+        '''
+        :param on_bids: optional, called like pumper.update_bid_levels with (symbol, bids, reset)
+        :param on_book: optional, called with (symbol, book) after every depth record, book is in the
+                        format returned by binance_api.get_order_book
+        :param on_ticker: optional, called with (symbol, ticker)
+        :param on_order: optional, called with (symbol, event)
+        :returns: The number of ticks replayed. Any callback can stop the replay by returning False.
+        '''
+        ticks = 0
+        first_recorded_at = None
+        started = default_timer()
+        for kind, recorded_at, symbol, data in read_ticks(self.filename):
+            if self.symbol is not None and symbol != self.symbol:
+                continue
+            if self.speed is not None:
+                if first_recorded_at is None:
+                    first_recorded_at = recorded_at
+                delay = (recorded_at - first_recorded_at) / self.speed - (default_timer() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            ticks += 1
+            
+            if kind == DEPTH_SNAPSHOT or kind == DEPTH_DIFF:
+                bids, asks, last_update_id = data
+                book = self.books.get(symbol)
+                if book is None:
+                    book = self.books[symbol] = order_book()
+                if kind == DEPTH_SNAPSHOT:
+                    book.apply_snapshot({"lastUpdateId": last_update_id, "bids": bids, "asks": asks})
+                else:
+                    book.apply_diff(bids, asks, last_update_id)
+                if on_bids is not None and (bids or kind == DEPTH_SNAPSHOT):
+                    if on_bids(symbol, bids, kind == DEPTH_SNAPSHOT) is False:
+                        break
+                if on_book is not None and on_book(symbol, book.snapshot()) is False:
+                    break
+            elif kind == TICKER:
+                if on_ticker is not None and on_ticker(symbol, data) is False:
+                    break
+            elif kind == ORDER:
+                if on_order is not None and on_order(symbol, data) is False:
+                    break
+        return ticks
+
+def sell_into_bids(bids, alt_amount):
+    '''
+    :param bids: Levels from the highest price down, as [price, quantity] strings.
+    :param alt_amount: Fixed-point quantity to sell
+    :returns: The fixed-point BTC a market sell of alt_amount would receive before fees.
+    '''
+    btc = 0
+    for bid in bids:
+        if alt_amount <= 0:
+            break
+        quantity = min(alt_amount, fixed_point.parse(bid[1]))
+        btc += fixed_point.multiply(quantity, fixed_point.parse(bid[0]))
+        alt_amount -= quantity
+    return btc
+
+def replay_pump(filename, symbol, target_profit_percentage, stop_loss, btc_to_use, speed=None, trailing_stop=None):
+    '''
+    Runs a market entry pump over a recording with pumper's decisions, buying at the first recorded ask
+    and selling into the recorded bids.
+    
+    Unlike pump_session, which sells in slices as the bids above the threshold allow, it sells
+    everything at once: at the target once the bids above the threshold can take all of it, or at
+    the stop loss or the trailing stop into whatever bids there are.
+    
+    Pre: target_profit_percentage, stop_loss and btc_to_use are Decimals, stop_loss is negative
+    :param trailing_stop: optional, see pumper.trailing_stop
+    :returns: A dict with the action taken (SELL_PROFIT, SELL_STOP_LOSS, SELL_TRAILING or None if the recording
+              ended first), the BTC received, the ticks replayed and how long they took in seconds.
+    '''
+    replay = tick_replay(filename, symbol, speed)
+    pump = pumper()
+    result = {"action": None, "btc_received": Decimal(0)}
+    
+    def on_book(symbol, book):
+        if pump.starting_alt_value == 0:
+            if not book["asks"]:
+                return
+            # Enter at the lowest ask, like a market buy would.
+            starting_alt_value = Decimal(book["asks"][0][0])
+            pump.set_up(btc_to_use, target_profit_percentage, starting_alt_value, symbol)
+            pump.stop_loss = stop_loss
+            pump.trailing_stop = trailing_stop
+            pump.alt_holdings = btc_to_alt(btc_to_use, starting_alt_value)
+        action = pump.update_bids(book["bids"])
+        if action == SELL_STOP_LOSS or action == SELL_TRAILING or (action == SELL_PROFIT and pump.can_sell()):
+            result["action"] = action
+            result["btc_received"] = fixed_point.to_decimal(sell_into_bids(book["bids"], fixed_point.from_decimal(pump.alt_holdings)))
+            return False
+    
+    started = default_timer()
+    result["ticks"] = replay.run(on_book=on_book)
+    result["seconds"] = default_timer() - started
+    return result
+
+if __name__ == "__main__":
+    filename, symbol = sys.argv[1], sys.argv[2]
+    target_profit_percentage = Decimal(sys.argv[3]) / 100
+    stop_loss = Decimal(sys.argv[4]) / 100
+    btc_to_use = Decimal(sys.argv[5])
+    speed = float(sys.argv[6]) if len(sys.argv) > 6 else 0
+    trailing_stop = Decimal(sys.argv[7]) / 100 if len(sys.argv) > 7 else None
+    
+    result = replay_pump(filename, symbol, target_profit_percentage, stop_loss, btc_to_use, speed or None, trailing_stop)
+    if result["action"] == SELL_PROFIT:
+        print("Sold at the target for " + readable_btc_balance(result["btc_received"]) + ".")
+    elif result["action"] == SELL_STOP_LOSS:
+        print("Stop loss reached, sold for " + readable_btc_balance(result["btc_received"]) + ".")
+    elif result["action"] == SELL_TRAILING:
+        print("The bid fell from its peak, sold for " + readable_btc_balance(result["btc_received"]) + ".")
+    else:
+        print("The recording ended before the pump sold.")
+    print("%d ticks in %.3fs, %.0f ticks/s" % (result["ticks"], result["seconds"], result["ticks"] / max(result["seconds"], 1e-9)))
@@ -0,0 +1,43 @@
+from collections import deque
+from threading import Lock
+
+frames_per_second = 30
+
+class ui_event_queue(object):
+    '''
+    Hands updates from the trading threads to the thread running the Tk main loop, which is the
+    only one allowed to touch widgets. Trading threads only append an event and go back to the
+    book, the main loop applies every event once per frame.
+    
+    Events pushed with replace only keep the latest one per handler until the next frame, so a
+    profit update on every tick costs one redraw per frame.
+    '''
+    
+    def __init__(self):
+        self._events = deque() # (handler, args), appending and popping are thread-safe
+        self._latest = {} # Handler -> args
+        self._lock = Lock()
+    
+    def push(self, handler, *args):
+        '''
+        handler(*args) will be called from the main loop, after the events pushed before it.
+        '''
+        self._events.append((handler, args))
+    
+    def replace(self, handler, *args):
+        '''
+        handler(*args) will be called from the main loop unless it is replaced before the next frame.
+        '''
+        with self._lock:
+            self._latest[handler] = args
+    
+    def drain(self):
+        ''' Called from the main loop, calls the handlers of every event pushed since the last call. '''
+        events = self._events
+        while events:
+            handler, args = events.popleft()
+            handler(*args)
+        with self._lock:
+            latest, self._latest = self._latest, {}
+        for handler, args in latest.items():
+            handler(*args)
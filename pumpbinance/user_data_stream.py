@@ -0,0 +1,227 @@
+from decimal import Decimal
+from threading import Event, Lock, Thread
+from timeit import default_timer
+import json
+import logging
+import websocket
+from order_book import STREAM_URL
+import fixed_point
+
+keepalive_interval = 30 * 60 # Measured in seconds, listen keys expire 60 minutes after the last keepalive.
+reconnect_interval = 10 # Measured in seconds, how often a dropped stream is retried.
+
+class order_state(object):
+    '''
+    What the user data stream has reported about one order, kept in fixed-point integers.
+    '''
+    
+    def __init__(self, client_order_id, symbol, status="NEW"):
+        self.client_order_id = client_order_id
+        self.symbol = symbol
+        self.status = status
+        self.executed_quantity = 0
+        self.quote_quantity = 0 # BTC traded so far
+        self.commission = {} # Asset -> commission paid in it
+    
+    @property
+    def is_open(self):
+        return self.status == "NEW" or self.status == "PARTIALLY_FILLED"
+    
+    def _update(self, status, executed_quantity, quote_quantity):
+        '''
+        :returns: If it changed, a report older than what is known already does not change it.
+        '''
+        if executed_quantity < self.executed_quantity or (not self.is_open and status != self.status):
+            return False
+        changed = (status, executed_quantity, quote_quantity) != (self.status, self.executed_quantity, self.quote_quantity)
+        self.status = status
+        self.executed_quantity = executed_quantity
+        self.quote_quantity = quote_quantity
+        return changed
+    
+    def alt_received(self, alt_ticker):
+        '''
+        :returns: The alt bought so far after the commission was taken out of it, as a fixed-point integer.
+        '''
+        return self.executed_quantity - self.commission.get(alt_ticker, 0)
+    
+    def apply(self, report):
+        '''
+        :type report: executionReport event from the user data stream
+        '''
+        self._update(report["X"], fixed_point.parse(report["z"]), fixed_point.parse(report["Z"]))
+        # Every trade is reported once, its commission counts even if get_order already reported the trade.
+        if report["x"] == "TRADE" and report.get("N"):
+            self.commission[report["N"]] = self.commission.get(report["N"], 0) + fixed_point.parse(report["n"])
+    
+    def apply_order(self, order):
+        '''
+        :type order: dict from binance_api.get_order
+        :returns: If it changed.
+        '''
+        return self._update(order["status"], fixed_point.parse(order["executedQty"]), fixed_point.parse(order["cummulativeQuoteQty"]))
+
+class user_data_stream(object):
+    '''
+    Follows the account's user data stream so order fills and balances are known as soon as
+    they happen, without querying the order or the account.
+    https://github.com/binance-exchange/binance-official-api-docs/blob/master/user-data-stream.md
+    
+    The listen key is kept alive in the background and the stream reconnects with a new key
+    if it drops. While it is not connected, callers should fall back to the REST endpoints.
+    The reports sent while it was down are lost, so the watched orders are queried once it is back.
+    '''
+    
+    def __init__(self, api, on_balances=None, stream_url=STREAM_URL, recorder=None):
+        '''
+        :param api: Used to get and keep alive the listen key.
+        :type api: binance_api
+        :param on_balances: optional, called with a dict of asset -> free Decimal balance and the server time
+                            in milliseconds whenever balances change.
+        :param recorder: optional, records the execution reports.
+        :type recorder: tick_recorder
+        '''
+        self.api = api
+        self.on_balances = on_balances
+        self.stream_url = stream_url
+        self.recorder = recorder
+        self.connected = False
+        self._listen_key = None
+        self._ws = None
+        self._orders = {} # Client order id -> order_state
+        self._watchers = {} # Client order id -> callback
+        self._lock = Lock()
+        self._stopped = Event()
+    
+    def start(self):
+        try:
+            self._connect()
+        except Exception as e:
+            # The keepalive thread retries.
+            logging.debug("Could not start the user data stream: "+str(e))
+        keepalive_thread = Thread(target=self._keep_alive)
+        keepalive_thread.daemon = True
+        keepalive_thread.start()
+    
+    def stop(self):
+        self._stopped.set()
+        self._disconnect()
+    
+    def watch(self, client_order_id, symbol, on_execution):
+        '''
+        Calls on_execution(order_state) for every report on the order, starting with what is
+        already known about it since reports can arrive before the order's response.
+        
+        :returns: The order's order_state, updated in place as reports arrive.
+        '''
+        with self._lock:
+            state = self._orders.get(client_order_id)
+            if state is None:
+                state = self._orders[client_order_id] = order_state(client_order_id, symbol)
+            self._watchers[client_order_id] = on_execution
+            reported = state.executed_quantity or not state.is_open
+        if reported:
+            on_execution(state)
+        return state
+    
+    def unwatch(self, client_order_id):
+        with self._lock:
+            self._watchers.pop(client_order_id, None)
+            self._orders.pop(client_order_id, None)
+    
+    def on_event(self, event):
+        '''
+        :type event: dict decoded from the stream
+        '''
+        event_type = event["e"]
+        if event_type == "executionReport":
+            if self.recorder is not None:
+                self.recorder.record_order(event["s"], event)
+            # Cancels report the cancelled order's id as the original one.
+            client_order_id = event["C"] if event["x"] == "CANCELED" and event.get("C") else event["c"]
+            with self._lock:
+                state = self._orders.get(client_order_id)
+                if state is None:
+                    state = self._orders[client_order_id] = order_state(client_order_id, event["s"])
+                state.apply(event)
+                on_execution = self._watchers.get(client_order_id)
+            if on_execution is not None:
+                on_execution(state)
+        elif event_type == "outboundAccountPosition" or event_type == "outboundAccountInfo":
+            if self.on_balances is not None:
+                self.on_balances(dict((balance["a"], Decimal(balance["f"])) for balance in event["B"]), event["E"])
+    
+    def _connect(self):
+        self._listen_key = self.api.stream_get_listen_key()
+        self._ws = websocket.WebSocketApp(self.stream_url + '/' + self._listen_key,
+                                          on_open=self._on_open,
+                                          on_message=self._on_message,
+                                          on_error=self._on_error,
+                                          on_close=self._on_close)
+        stream_thread = Thread(target=self._ws.run_forever)
+        stream_thread.daemon = True
+        stream_thread.start()
+    
+    def _disconnect(self):
+        self.connected = False
+        if self._ws is not None:
+            self._ws.close()
+            self._ws = None
+        if self._listen_key is not None:
+            try:
+                self.api.stream_close(listenKey=self._listen_key)
+            except Exception as e:
+                logging.debug("Could not close the user data stream: "+str(e))
+            self._listen_key = None
+    
+    def _keep_alive(self):
+        kept_alive_at = default_timer()
+        while not self._stopped.wait(reconnect_interval):
+            try:
+                if not self.connected:
+                    logging.debug("User data stream is down, reconnecting.")
+                    self._disconnect()
+                    self._connect()
+                    kept_alive_at = default_timer()
+                elif default_timer() - kept_alive_at >= keepalive_interval:
+                    self.api.stream_keepalive(listenKey=self._listen_key)
+                    kept_alive_at = default_timer()
+            except Exception as e:
+                logging.debug("User data stream keepalive failed: "+str(e))
+    
+    def _on_open(self, ws):
+        if ws is self._ws:
+            self.connected = True
+            # On the stream's thread, so the reports that arrive meanwhile are applied after the queries.
+            self._query_watched_orders()
+    
+    def _query_watched_orders(self):
+        '''
+        Updates every open watched order from get_order, calling its watcher if it changed.
+        '''
+        with self._lock:
+            watched = [(self._orders[client_order_id], on_execution) for client_order_id, on_execution in self._watchers.items()
+                       if client_order_id in self._orders]
+        for state, on_execution in watched:
+            if not state.is_open:
+                continue
+            try:
+                order = self.api.get_order(symbol=state.symbol, origClientOrderId=state.client_order_id)
+            except Exception as e:
+                logging.debug("Could not query the order "+state.client_order_id+": "+str(e))
+                continue
+            with self._lock:
+                changed = state.apply_order(order)
+            if changed:
+                on_execution(state)
+    
+    def _on_message(self, ws, message):
+        self.on_event(json.loads(message))
+    
+    def _on_error(self, ws, error):
+        logging.debug("User data stream failed: "+str(error))
+    
+    def _on_close(self, ws, *args):
+        # A socket replaced by a reconnect can close after the new one opened.
+        if ws is self._ws:
+            self.connected = False